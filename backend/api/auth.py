@@ -2,6 +2,11 @@
 Authentication API endpoints.
 """
 
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Depends
@@ -9,14 +14,25 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from models.schemas import UserCreate, UserLogin, Token, TokenData
+from db.user_store import get_user_store
+from utils.metrics import record_cache
 import os
 
-# Mock user database - in production, use a real database
-fake_users_db = {}
-
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt costs ~100 ms of CPU per call; run it on a small dedicated pool
+# so it never blocks the event loop or starves the default executor
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", 2))
+_hash_executor = None
+
+# Decoded token claims are cached briefly so repeated requests with the
+# same bearer token skip signature verification
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
@@ -37,9 +53,22 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
+    return _hash_executor
+
+
+async def run_in_hash_pool(func, *args):
+    """Run a CPU-heavy password function on the hashing pool."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(get_hash_executor(), func, *args)
+
+
 def get_user(username: str) -> Optional[dict]:
     """Get user from database."""
-    return fake_users_db.get(username)
+    return get_user_store().get_user(username)
 
 
 def authenticate_user(username: str, password: str) -> Optional[dict]:
@@ -64,6 +93,36 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def decode_token(token: str) -> dict:
+    """
+    Decode and verify a JWT, reusing recently decoded claims.
+
+    A cached entry never outlives the token's own expiry.
+
+    Raises:
+        JWTError: If the token is invalid or expired.
+    """
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            claims, valid_until = cached
+            if now < valid_until:
+                _token_cache.move_to_end(token)
+                record_cache("token", 1, 0)
+                return claims
+            del _token_cache[token]
+
+    record_cache("token", 0, 1)
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    valid_until = min(now + TOKEN_CACHE_TTL, claims.get("exp", now))
+    with _token_cache_lock:
+        _token_cache[token] = (claims, valid_until)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return claims
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """Get current user from JWT token."""
     credentials_exception = HTTPException(
@@ -72,7 +131,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -80,7 +139,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     except JWTError:
         raise credentials_exception
     user = get_user(token_data.username)
-    if user is None:
+    if user is None or user["disabled"]:
         raise credentials_exception
     return user
 
@@ -97,18 +156,17 @@ async def register(user: UserCreate):
         JWT access token.
 
     Raises:
-        HTTPException: If user already exists.
+        HTTPException: If the username or email is already registered.
     """
-    if user.username in fake_users_db:
+    store = get_user_store()
+    # Cheap check first so taken usernames don't cost a bcrypt hash
+    if store.username_exists(user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    hashed_password = get_password_hash(user.password)
-    fake_users_db[user.username] = {
-        "username": user.username,
-        "email": user.email,
-        "hashed_password": hashed_password,
-        "disabled": False,
-    }
+    hashed_password = await run_in_hash_pool(get_password_hash, user.password)
+    taken = store.create_user(user.username, user.email, hashed_password)
+    if taken:
+        raise HTTPException(status_code=400, detail=f"{taken.capitalize()} already registered")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -131,7 +189,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     Raises:
         HTTPException: If authentication fails.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await run_in_hash_pool(authenticate_user, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=401,
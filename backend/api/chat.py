@@ -3,70 +3,144 @@ Chat API – Single PDF RAG (Stable & Safe)
 """
 
 from fastapi import APIRouter
-import os
-from models.schemas import ChatRequest, ChatResponse, Source
+from fastapi.responses import StreamingResponse
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio, os, time
+from models.schemas import ChatRequest, ChatResponse, Source, BatchChatRequest, BatchChatAnswer
+from utils.metrics import CHAT_STAGE_SECONDS, CONTEXT_COMPRESSION_RATIO
+from utils.tracing import bind_context
+from services.summaries import is_overview_question
+# Shared with upload so each process loads the embedding model only once
+from api.upload import get_embedding_service, get_pinecone_db, _services_lock
 
 router = APIRouter(tags=["chat"])
 
-_embedding_service = None
-_pinecone_db = None
 _llm_service = None
+_context_expander = None
+_retriever = None
+_context_compressor = None
 
 # 🔒 Safety limit to avoid huge prompts
 MAX_CONTEXT_CHARS = 2500
 
+# Neighbouring chunks added on each side of the top hits (0 disables)
+CONTEXT_EXPANSION_WINDOW = int(os.getenv("CONTEXT_EXPANSION_WINDOW", 1))
+CONTEXT_EXPANSION_TOP_N = int(os.getenv("CONTEXT_EXPANSION_TOP_N", 3))
 
-def get_embedding_service():
-    global _embedding_service
-    if _embedding_service is None:
-        from services.embeddings import EmbeddingService
-        _embedding_service = EmbeddingService()
-    return _embedding_service
+# Extractive compression: keep the sentences closest to the question, up to a token budget
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 300))
+# Retrieved text compressed down into MAX_CONTEXT_CHARS, as a multiple of it
+COMPRESSION_HEADROOM = int(os.getenv("COMPRESSION_HEADROOM", 4))
 
+# Summaries used to answer overview questions ("summarize this document")
+SUMMARY_TOP_K = int(os.getenv("SUMMARY_TOP_K", 3))
+# Similarity lead over the document summary that sends a question into one section's chunks
+SUMMARY_DRILL_DOWN_MARGIN = float(os.getenv("SUMMARY_DRILL_DOWN_MARGIN", 0.05))
 
-def get_pinecone_db():
-    global _pinecone_db
-    if _pinecone_db is None:
-        from db.pinecone_db import PineconeDatabase
-        _pinecone_db = PineconeDatabase()
-    return _pinecone_db
+# Multi-query retrieval: rewrites of the question searched concurrently, fused by rank
+MULTI_QUERY = os.getenv("MULTI_QUERY", "false").lower() == "true"
+MULTI_QUERY_LLM = os.getenv("MULTI_QUERY_LLM", "false").lower() == "true"
+MULTI_QUERY_MAX = int(os.getenv("MULTI_QUERY_MAX", 4))
+
+# Concurrent LLM calls per /chat/batch request
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", 4))
 
 
 def get_llm_service():
     global _llm_service
     if _llm_service is None:
-        from services.llm import LLMService
-        _llm_service = LLMService(api_key=os.getenv("GROQ_API_KEY", ""))
+        with _services_lock:
+            if _llm_service is None:
+                from services.llm import LLMService
+                _llm_service = LLMService(api_key=os.getenv("GROQ_API_KEY", ""))
     return _llm_service
 
 
-# -------------------------------------------------
-# CHAT ENDPOINT
-# -------------------------------------------------
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+def get_retriever():
+    global _retriever
+    if _retriever is None:
+        # Dependencies first: their getters take the same lock
+        pinecone_db, embedding_service = get_pinecone_db(), get_embedding_service()
+        llm = get_llm_service() if MULTI_QUERY_LLM else None
+        with _services_lock:
+            if _retriever is None:
+                from services.retriever import RetrieverService
+                _retriever = RetrieverService(pinecone_db, embedding_service, llm, max_queries=MULTI_QUERY_MAX)
+    return _retriever
+
+
+def get_context_expander():
+    global _context_expander
+    if _context_expander is None and CONTEXT_EXPANSION_WINDOW > 0:
+        from services.expansion import ContextExpander
+        from api.upload import get_dedup_registry
+        _context_expander = ContextExpander(
+            get_pinecone_db(), get_dedup_registry(),
+            window=CONTEXT_EXPANSION_WINDOW, top_n=CONTEXT_EXPANSION_TOP_N
+        )
+    return _context_expander
 
-    pinecone_db = get_pinecone_db()
-    llm = get_llm_service()
-    embedding_service = get_embedding_service()
 
-    # 1️⃣ Embed user query
-    query_embedding = embedding_service.encode([request.message])[0]
+def retrieval_chars() -> int:
+    """Characters of retrieved text kept for context building (compression shrinks it afterwards)."""
+    return MAX_CONTEXT_CHARS * COMPRESSION_HEADROOM if CONTEXT_COMPRESSION else MAX_CONTEXT_CHARS
 
-    # 2️⃣ Retrieve chunks
-    matches = pinecone_db.query(
-        query_embedding=query_embedding,
-        top_k=10
-    )
 
-    if not matches:
-        return ChatResponse(
-            response="No document uploaded yet.",
-            sources=[],
-            session_id="chat"
-        )
+def expand_matches(matches: List[Dict[str, Any]], max_chars: int = MAX_CONTEXT_CHARS) -> List[Dict[str, Any]]:
+    """Widen the top hits with neighbouring chunks, within max_chars. Blocking."""
+    expander = get_context_expander()
+    if expander is None or not matches:
+        return matches
+    with CHAT_STAGE_SECONDS.labels("expand").time():
+        return expander.expand(matches, max_chars)
+
+
+def get_context_compressor():
+    global _context_compressor
+    if _context_compressor is None and CONTEXT_COMPRESSION:
+        from services.compressor import ContextCompressor
+        _context_compressor = ContextCompressor(get_embedding_service(), token_budget=CONTEXT_TOKEN_BUDGET)
+    return _context_compressor
 
-    # 3️⃣ Build SAFE context
+
+def compress_matches(query_embedding: List[float],
+                     matches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+    """Cut matches down to their most relevant sentences; returns (matches, ratio). Blocking."""
+    compressor = get_context_compressor()
+    if compressor is None or not matches:
+        return matches, None
+    with CHAT_STAGE_SECONDS.labels("compress").time():
+        matches, stats = compressor.compress(query_embedding, matches)
+    CONTEXT_COMPRESSION_RATIO.labels().observe(stats["ratio"])
+    return matches, stats["ratio"]
+
+
+def document_filter(document_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Vector query filter scoping chunks to one document (None searches them all)."""
+    # document_ids, not document_id: a deduplicated chunk names only its first document there
+    return {"document_ids": {"$in": [document_id]}} if document_id else None
+
+
+def query_summaries(query_embedding: List[float], document_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Summary-level matches for an overview question; empty until they are built. Blocking."""
+    from api.upload import SUMMARY_INDEX, get_summary_index
+    if not SUMMARY_INDEX:
+        return []
+    with CHAT_STAGE_SECONDS.labels("summary_query").time():
+        return get_summary_index().query(query_embedding, SUMMARY_TOP_K, document_id)
+
+
+def drill_down_summaries(query_embedding: List[float], matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Chunks of the one section an overview question is about, if any. Blocking."""
+    from api.upload import get_summary_index
+    with CHAT_STAGE_SECONDS.labels("summary_drill_down").time():
+        return get_summary_index().drill_down(query_embedding, matches, SUMMARY_DRILL_DOWN_MARGIN)
+
+
+def build_context(matches: List[Dict[str, Any]]) -> Tuple[str, List[Source]]:
+    """Concatenate match texts in rank order up to MAX_CONTEXT_CHARS."""
     context = ""
     current_len = 0
     sources = []
@@ -85,57 +159,234 @@ async def chat(request: ChatRequest):
         sources.append(
             Source(
                 document_name="uploaded_document",
+                page_number=match.get("metadata", {}).get("page_number"),
                 content=text[:300],
                 score=round(match.get("score", 0.0), 3)
             )
         )
 
-    if not context.strip():
+    return context, sources
+
+
+# -------------------------------------------------
+# CHAT ENDPOINT
+# -------------------------------------------------
+@router.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    start_time = time.perf_counter()
+
+    pinecone_db = get_pinecone_db()
+    llm = get_llm_service()
+    embedding_service = get_embedding_service()
+
+    # Blocking model / network calls run in the executor so the event loop
+    # (and admission control in front of it) keeps serving other requests
+    loop = asyncio.get_event_loop()
+
+    # 1️⃣ Embed user query (with its rewrites, in the same call)
+    queries = [request.message]
+    if MULTI_QUERY:
+        queries = await loop.run_in_executor(
+            None, bind_context(get_retriever().query_variants, request.message, MULTI_QUERY_LLM)
+        )
+    with CHAT_STAGE_SECONDS.labels("embed").time():
+        query_embeddings = await loop.run_in_executor(
+            None, bind_context(embedding_service.encode, queries)
+        )
+    query_embedding = query_embeddings[0]
+
+    # 2️⃣ Overview questions are answered from the summary level
+    summarized = False
+    if is_overview_question(request.message):
+        matches = await loop.run_in_executor(
+            None, bind_context(query_summaries, query_embedding, request.document_id)
+        )
+        summarized = bool(matches)
+
+    # 3️⃣ Otherwise (or before summaries exist) drill down to the document's chunks
+    query_filter = document_filter(request.document_id)
+    if not summarized and len(query_embeddings) > 1:
+        matches = await loop.run_in_executor(
+            None, bind_context(get_retriever().search_fused, query_embeddings, 10, query_filter)
+        )
+    elif not summarized:
+        with CHAT_STAGE_SECONDS.labels("vector_query").time():
+            matches = await loop.run_in_executor(
+                None, partial(pinecone_db.query, query_embedding=query_embedding, top_k=10, filter=query_filter)
+            )
+
+    if not matches:
+        CHAT_STAGE_SECONDS.labels("total").observe(time.perf_counter() - start_time)
         return ChatResponse(
-            response="I don't know based on the uploaded document.",
+            response="No document uploaded yet.",
             sources=[],
             session_id="chat"
         )
 
-    # 4️⃣ Build prompt (STRICT RAG)
-    prompt = f"""
-Answer the question using ONLY the information below.
-If the answer is not present, say:
-"I don't know based on the uploaded document."
+    # 4️⃣ Build SAFE context: chunk hits widened to their neighbouring chunks,
+    # then cut down to the sentences closest to the question
+    compression_ratio = None
+    if not summarized:
+        matches = await loop.run_in_executor(None, bind_context(expand_matches, matches, retrieval_chars()))
+        matches, compression_ratio = await loop.run_in_executor(
+            None, bind_context(compress_matches, query_embedding, matches)
+        )
+    else:
+        # Summaries first, then the compressed chunks of a section the question singles out
+        chunks = await loop.run_in_executor(None, bind_context(drill_down_summaries, query_embedding, matches))
+        if chunks:
+            chunks, compression_ratio = await loop.run_in_executor(
+                None, bind_context(compress_matches, query_embedding, chunks)
+            )
+            matches = matches + chunks
+    with CHAT_STAGE_SECONDS.labels("context_build").time():
+        context, sources = build_context(matches)
 
-Context:
-{context}
+    if not context.strip():
+        CHAT_STAGE_SECONDS.labels("total").observe(time.perf_counter() - start_time)
+        return ChatResponse(
+            response="I don't know based on the uploaded document.",
+            sources=[],
+            session_id="chat"
+        )
 
-Question:
-{request.message}
+    # 5️⃣ Build prompt (STRICT RAG)
+    from services.llm import build_prompt
+    prompt = build_prompt(request.message, context)
 
-Instructions:
-- Answer in complete sentences
-- If summarizing, use bullet points
-"""
+    # 6️⃣ Generate answer
+    with CHAT_STAGE_SECONDS.labels("llm").time():
+        answer = await loop.run_in_executor(None, llm.generate, prompt)
 
-    # 5️⃣ Generate answer
-    answer = llm.generate(prompt)
+    CHAT_STAGE_SECONDS.labels("total").observe(time.perf_counter() - start_time)
 
     return ChatResponse(
         response=answer,
         sources=sources,
-        session_id="chat"
+        session_id="chat",
+        compression_ratio=compression_ratio
     )
 
 
+# -------------------------------------------------
+# BATCH CHAT (many questions, one document scope)
+# -------------------------------------------------
+@router.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """
+    Answer many questions at once, streaming NDJSON answers as they finish.
+
+    Repeated questions are answered once. All questions are embedded in one
+    call, their vector queries run concurrently and chunks retrieved by
+    several questions are held once. LLM calls run at most
+    BATCH_LLM_CONCURRENCY at a time. Each line is a BatchChatAnswer whose
+    index is the question's position in the request.
+    """
+    pinecone_db = get_pinecone_db()
+    llm = get_llm_service()
+    embedding_service = get_embedding_service()
+    loop = asyncio.get_event_loop()
+
+    # Identical questions share one embedding, query and answer
+    positions: Dict[str, List[int]] = {}
+    for index, question in enumerate(request.questions):
+        positions.setdefault(question.strip(), []).append(index)
+    questions = list(positions)
+    query_filter = document_filter(request.document_id)
+
+    # 1️⃣ One embedding call for the whole batch
+    with CHAT_STAGE_SECONDS.labels("embed").time():
+        embeddings = await loop.run_in_executor(
+            None, bind_context(embedding_service.encode, questions)
+        )
+
+    # 2️⃣ Vector queries in parallel
+    async def retrieve(embedding):
+        with CHAT_STAGE_SECONDS.labels("vector_query").time():
+            return await loop.run_in_executor(
+                None, partial(pinecone_db.query, query_embedding=embedding,
+                              top_k=request.top_k, filter=query_filter)
+            )
+
+    # A failed query is kept as its exception and reported on that question's line
+    all_matches = await asyncio.gather(*(retrieve(embedding) for embedding in embeddings),
+                                       return_exceptions=True)
+
+    # 3️⃣ Chunks retrieved by several questions are kept once for the whole batch
+    shared: Dict[str, Dict[str, Any]] = {}
+    all_matches = [
+        matches if isinstance(matches, Exception) else
+        [{"id": match["id"], "score": match["score"],
+          "metadata": shared.setdefault(match["id"], match.get("metadata") or {})} for match in matches]
+        for matches in all_matches
+    ]
+
+    # 4️⃣ LLM calls with bounded parallelism
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+    async def answer(question: str, embedding, matches) -> List[BatchChatAnswer]:
+        indexes = positions[question]
+        compression_ratio = None
+        try:
+            if isinstance(matches, Exception):
+                raise matches
+            if not matches:
+                response, sources = "No document uploaded yet.", []
+            else:
+                matches = await loop.run_in_executor(
+                    None, bind_context(expand_matches, matches, retrieval_chars())
+                )
+                matches, compression_ratio = await loop.run_in_executor(
+                    None, bind_context(compress_matches, embedding, matches)
+                )
+                context, sources = build_context(matches)
+                if not context.strip():
+                    response = "I don't know based on the uploaded document."
+                else:
+                    from services.llm import build_prompt
+                    async with semaphore:
+                        with CHAT_STAGE_SECONDS.labels("llm").time():
+                            response = await loop.run_in_executor(
+                                None, bind_context(llm.generate, build_prompt(question, context))
+                            )
+        except Exception as e:
+            return [BatchChatAnswer(index=i, question=question, error=str(e)) for i in indexes]
+        return [BatchChatAnswer(index=i, question=question, response=response, sources=sources,
+                                compression_ratio=compression_ratio)
+                for i in indexes]
+
+    tasks = [asyncio.ensure_future(answer(question, embedding, matches))
+             for question, embedding, matches in zip(questions, embeddings, all_matches)]
+
+    # 5️⃣ Stream each answer as soon as it is ready
+    async def stream():
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for result in await finished:
+                    yield result.model_dump_json() + "\n"
+        finally:
+            # Client went away: don't keep calling the LLM
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 # -------------------------------------------------
 # RESET CHAT (VERY IMPORTANT)
 # -------------------------------------------------
 @router.post("/reset-chat")
 def reset_chat():
-    from db.pinecone_db import PineconeDatabase
     import api.upload  # to reset upload flag
 
-    # Delete all vectors
-    PineconeDatabase().index.delete(delete_all=True)
+    # Delete all vectors; the registry goes first, so summaries still
+    # being built see their document is gone and are dropped
+    get_pinecone_db().delete_all()
+    api.upload.get_dedup_registry().clear()
+    if api.upload.SUMMARY_INDEX:
+        api.upload.get_summary_index().clear()
 
     # Reset upload state
-    api.upload.pdf_uploaded = False
+    api.upload.set_pdf_uploaded(False)
 
     return {"status": "chat reset"}
@@ -0,0 +1,36 @@
+"""
+Debug API – recent request traces (see utils/tracing.py)
+"""
+
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from utils.tracing import admin_token, recent_traces, find_trace
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def require_admin(token: Optional[str]):
+    expected = admin_token()
+    if not expected:
+        raise HTTPException(status_code=403, detail="TRACE_ADMIN_TOKEN is not configured")
+    # Constant-time comparison, so response timing doesn't reveal the token
+    if not hmac.compare_digest((token or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/traces")
+def list_traces(limit: int = 50, x_admin_token: Optional[str] = Header(None)):
+    """Summaries of the most recent traces in this worker, newest first."""
+    require_admin(x_admin_token)
+    return [trace.summary() for trace in recent_traces()[:limit]]
+
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Full span tree (and CPU profile, if captured) of one trace."""
+    require_admin(x_admin_token)
+    trace = find_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (evicted or served by another worker)")
+    return trace.to_dict()
@@ -4,46 +4,299 @@ Upload API – Single PDF per chat
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from pathlib import Path
-import asyncio, os
+from typing import List, Dict, Any, Optional, Tuple
+from functools import partial
+import asyncio, logging, os, threading, time, zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from models.schemas import DocumentUpload, DocumentChunk
-from utils.helpers import extract_text_from_file, chunk_text, clean_text, generate_unique_id
+from models.schemas import (
+    DocumentUpload, DocumentVersionUpdate, BulkUploadResult, BulkUploadResponse
+)
+from models.records import ChunkRecord
+from utils.helpers import (
+    extract_pages_from_file, is_paginated, chunk_document, extract_archive,
+    generate_unique_id, hash_bytes, hash_text
+)
+from utils.metrics import INGEST_STAGE_SECONDS, record_cache
+from utils.tracing import bind_context
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["upload"])
 
 _embedding_service = None
 _pinecone_db = None
+_dedup_registry = None
+_summary_index = None
+# Getters may race between the background warm-up and the first requests
+_services_lock = threading.Lock()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 UPLOAD_DIR = BASE_DIR / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# single PDF flag
-pdf_uploaded = False
+# Bulk ingestion limits
+BULK_EMBED_BATCH_SIZE = int(os.getenv("BULK_EMBED_BATCH_SIZE", 128))
+MAX_ARCHIVE_FILES = int(os.getenv("MAX_ARCHIVE_FILES", 500))
+MAX_ARCHIVE_BYTES = int(os.getenv("MAX_ARCHIVE_BYTES", 200 * 1024 * 1024))
+SUPPORTED_EXTENSIONS = {"pdf", "txt", "docx", "doc"}
+
+# Section/document summaries, built in the background after ingestion
+SUMMARY_INDEX = os.getenv("SUMMARY_INDEX", "true").lower() == "true"
+SUMMARY_SECTION_CHUNKS = int(os.getenv("SUMMARY_SECTION_CHUNKS", 6))
+# Summarizing shares the LLM with chat: one document at a time, with at most
+# SUMMARY_LLM_CONCURRENCY of its summary calls in flight
+SUMMARY_LLM_CONCURRENCY = int(os.getenv("SUMMARY_LLM_CONCURRENCY", 1))
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summaries")
+
+# single PDF flag (kept in the shared state store so every worker agrees)
+UPLOAD_STATE = "upload"
+# Per-document update leases, also shared, so PUTs from any worker apply in turn.
+# A lease expires after DOCUMENT_LOCK_SECONDS in case its worker dies mid-update.
+DOCUMENT_LOCKS = "document_locks"
+DOCUMENT_LOCK_SECONDS = float(os.getenv("DOCUMENT_LOCK_SECONDS", 300))
 
 
 def get_embedding_service():
     global _embedding_service
     if _embedding_service is None:
-        from services.embeddings import EmbeddingService
-        _embedding_service = EmbeddingService()
+        with _services_lock:
+            if _embedding_service is None:
+                from services.embeddings import EmbeddingService
+                _embedding_service = EmbeddingService()
     return _embedding_service
 
 
 def get_pinecone_db():
     global _pinecone_db
     if _pinecone_db is None:
-        from db.pinecone_db import PineconeDatabase
-        _pinecone_db = PineconeDatabase()
+        with _services_lock:
+            if _pinecone_db is None:
+                from db.vector_db import create_vector_database
+                _pinecone_db = create_vector_database()
     return _pinecone_db
 
 
+def is_pdf_uploaded() -> bool:
+    from db.state_store import get_state_store
+    return get_state_store().get(UPLOAD_STATE, "pdf_uploaded", False)
+
+
+def set_pdf_uploaded(value: bool):
+    from db.state_store import get_state_store
+    get_state_store().set(UPLOAD_STATE, "pdf_uploaded", value)
+
+
+def get_dedup_registry():
+    global _dedup_registry
+    if _dedup_registry is None:
+        from services.dedup import DedupRegistry
+        _dedup_registry = DedupRegistry()
+    return _dedup_registry
+
+
+def get_summary_index():
+    global _summary_index
+    if _summary_index is None:
+        # Dependencies first: their getters take the same lock
+        from api.chat import get_llm_service
+        embedding_service, llm_service = get_embedding_service(), get_llm_service()
+        pinecone_db, registry = get_pinecone_db(), get_dedup_registry()
+        with _services_lock:
+            if _summary_index is None:
+                from db.vector_db import create_vector_database
+                from services.summaries import SummaryIndex
+                _summary_index = SummaryIndex(
+                    embedding_service, create_vector_database(namespace="summaries"), llm_service,
+                    section_chunks=SUMMARY_SECTION_CHUNKS, max_workers=SUMMARY_LLM_CONCURRENCY,
+                    chunk_db=pinecone_db, registry=registry
+                )
+    return _summary_index
+
+
+def _build_summaries(document_id: str, filename: str, chunks: List[str]):
+    try:
+        get_summary_index().build(document_id, filename, chunks)
+    except Exception as e:
+        # Overview questions fall back to chunk retrieval
+        logger.error(f"Summarizing {document_id} failed: {e}")
+
+
+def schedule_summaries(document_id: str, filename: str, chunks: List[Dict[str, Any]]):
+    """Queue the summary level of a newly ingested document (see services/summaries.py)."""
+    if SUMMARY_INDEX:
+        _summary_executor.submit(
+            bind_context(_build_summaries, document_id, filename, [chunk["content"] for chunk in chunks])
+        )
+
+
+# -------------------------------------------------
+# Ingestion steps (shared by single and bulk upload)
+# -------------------------------------------------
+def prepare_chunks(filename: str, content: bytes) -> List[Dict[str, Any]]:
+    """
+    Extract, clean and chunk one file. Blocking – run in an executor.
+    """
+    with INGEST_STAGE_SECONDS.labels("extract").time():
+        pages = extract_pages_from_file(filename, content)
+    if not any(pages):
+        return []
+    with INGEST_STAGE_SECONDS.labels("chunk").time():
+        chunks = chunk_document(pages, chunk_size=500, overlap=100)
+    # Position in the document, for neighbour expansion at query time
+    for index, chunk in enumerate(chunks):
+        chunk["chunk_index"] = index
+    return chunks
+
+
+def find_document(file_hash: str):
+    """Registry lookup of a whole file, counted as a dedup cache hit or miss."""
+    existing = get_dedup_registry().find_document(file_hash)
+    record_cache("dedup_document", int(existing is not None), int(existing is None))
+    return existing
+
+
+def embed_texts(texts: List[str], **kwargs) -> List[List[float]]:
+    with INGEST_STAGE_SECONDS.labels("embed").time():
+        return get_embedding_service().encode(texts, **kwargs)
+
+
+def upsert_vectors(vectors: List[ChunkRecord]):
+    with INGEST_STAGE_SECONDS.labels("upsert").time():
+        get_pinecone_db().upsert_chunks(vectors)
+
+
+def select_new_chunks(
+    chunks: List[Dict[str, Any]],
+    pending_ids: Dict[str, str]
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+    """
+    Assign vector ids to chunks that are not indexed yet.
+
+    🔁 Identical chunks (boilerplate, repeated sections) reuse one vector,
+    whether it is already indexed or scheduled earlier in this request
+    (pending_ids: chunk hash -> vector id, updated in place).
+
+    Returns:
+        (new (id, chunk) pairs to embed, bytes of text skipped)
+    """
+    for chunk in chunks:
+        chunk["hash"] = hash_text(chunk["content"])
+    indexed = get_dedup_registry().find_chunks({chunk["hash"] for chunk in chunks})
+
+    new_chunks = []
+    bytes_saved = 0
+    for chunk in chunks:
+        chunk_hash = chunk["hash"]
+        if chunk_hash in indexed or chunk_hash in pending_ids:
+            bytes_saved += len(chunk["content"].encode("utf-8"))
+            continue
+        pending_ids[chunk_hash] = generate_unique_id()
+        new_chunks.append((pending_ids[chunk_hash], chunk))
+    record_cache("dedup_chunk", len(chunks) - len(new_chunks), len(new_chunks))
+    return new_chunks, bytes_saved
+
+
+def chunk_layout(chunks: List[Dict[str, Any]]) -> List[List[Any]]:
+    """
+    Ordered [hash, page_number, char_start, char_end, chunk_index] of a
+    document's chunks, as stored in its registry record (hashes set by
+    select_new_chunks).
+    """
+    return [
+        [chunk["hash"], chunk["page_number"], chunk["char_start"], chunk["char_end"], chunk["chunk_index"]]
+        for chunk in chunks
+    ]
+
+
+def position_metadata(
+    filename: str,
+    page_number: int,
+    char_start: int,
+    char_end: int,
+    chunk_index: Optional[int] = None
+) -> Dict[str, Any]:
+    metadata = {"char_start": char_start, "char_end": char_end}
+    if chunk_index is not None:
+        metadata["chunk_index"] = chunk_index
+    if is_paginated(filename):
+        metadata["page_number"] = page_number
+    return metadata
+
+
+def build_vector(
+    document_id: str,
+    filename: str,
+    chunk_id: str,
+    chunk: Dict[str, Any],
+    embedding: List[float]
+) -> ChunkRecord:
+    # document_id/filename name the first document a (shared) chunk came from;
+    # document_ids lists every document using it (see sync_chunk_owners)
+    metadata = {
+        "content": chunk["content"],
+        "document_id": document_id,
+        "document_ids": [document_id],
+        "filename": filename,
+        **position_metadata(
+            filename, chunk["page_number"], chunk["char_start"], chunk["char_end"], chunk.get("chunk_index")
+        )
+    }
+
+    return ChunkRecord(chunk_id, document_id, chunk["content"], metadata, embedding)
+
+
+def sync_chunk_owners(chunk_hashes, created_ids, updates: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """
+    Set document_ids on vectors whose referencing documents changed.
+    Blocking – run in an executor.
+
+    🔁 A reused chunk is not re-upserted, so its metadata only learns of a
+    new (or departed) document here. Vectors just created for a single
+    document already carry the right list. All changes go to the vector
+    database as one batched metadata update.
+
+    Args:
+        chunk_hashes: Hashes of chunks a registry change touched.
+        created_ids: Vector ids upserted by this request.
+        updates: Other metadata changes (vector id -> fields) to send in the same batch.
+
+    Returns:
+        Number of vectors updated.
+    """
+    updates = {vector_id: dict(fields) for vector_id, fields in (updates or {}).items()}
+    for vector_id, documents in get_dedup_registry().chunk_owners(chunk_hashes).items():
+        if documents and (vector_id not in created_ids or len(documents) > 1):
+            updates.setdefault(vector_id, {})["document_ids"] = documents
+    if updates:
+        get_pinecone_db().update_metadata_many(updates)
+    return len(updates)
+
+
 @router.post("/upload", response_model=DocumentUpload)
 async def upload_document(file: UploadFile = File(...)):
-    global pdf_uploaded
+    start_time = time.perf_counter()
+    content = await file.read()
+    file_hash = hash_bytes(content)
+    registry = get_dedup_registry()
+
+    # 🔁 Known file: nothing to extract, embed or upsert
+    existing = find_document(file_hash)
+    if existing:
+        registry.record_savings(len(content), existing["chunks_count"])
+        return DocumentUpload(
+            id=existing["id"],
+            filename=file.filename,
+            uploaded_at=datetime.utcnow(),
+            chunks_count=existing["chunks_count"],
+            version=existing["version"],
+            duplicate=True,
+            embeddings_saved=existing["chunks_count"],
+            bytes_saved=len(content)
+        )
 
-    if pdf_uploaded:
+    if is_pdf_uploaded():
         raise HTTPException(
             status_code=400,
             detail="A PDF is already uploaded. Please reset chat before uploading a new file."
@@ -51,7 +304,6 @@ async def upload_document(file: UploadFile = File(...)):
 
     file_path = None
     try:
-        content = await file.read()
         document_id = generate_unique_id()
 
         file_path = UPLOAD_DIR / f"{document_id}_{file.filename}"
@@ -59,47 +311,342 @@ async def upload_document(file: UploadFile = File(...)):
             f.write(content)
 
         loop = asyncio.get_event_loop()
-        text = await loop.run_in_executor(
-            None, extract_text_from_file, file.filename, content
+        chunks = await loop.run_in_executor(
+            None, bind_context(prepare_chunks, file.filename, content)
         )
 
-        text = clean_text(text)
-        if not text.strip():
+        if not chunks:
             raise HTTPException(status_code=400, detail="No readable text found")
 
-        chunks = chunk_text(text, chunk_size=500, overlap=100)
-
-        embeddings = await loop.run_in_executor(
-            None, get_embedding_service().encode, chunks
-        )
+        new_ids = {}
+        new_chunks, bytes_saved = select_new_chunks(chunks, new_ids)
 
-        pinecone_db = get_pinecone_db()
         vectors = []
-
-        for chunk_text_, vector in zip(chunks, embeddings):
-            vectors.append(
-                DocumentChunk(
-                    id=generate_unique_id(),
-                    document_id=document_id,
-                    content=chunk_text_,
-                    metadata={
-                        "content": chunk_text_
-                    },
-                    embedding=vector
-                )
+        if new_chunks:
+            embeddings = await loop.run_in_executor(
+                None, bind_context(embed_texts, [c["content"] for _, c in new_chunks])
             )
 
-        pinecone_db.upsert_chunks(vectors)
+            for (chunk_id, chunk), vector in zip(new_chunks, embeddings):
+                vectors.append(build_vector(document_id, file.filename, chunk_id, chunk, vector))
+
+            await loop.run_in_executor(None, bind_context(upsert_vectors, vectors))
 
-        pdf_uploaded = True
+        embeddings_saved = len(chunks) - len(vectors)
+        registry.register_chunks(new_ids)
+        registry.register_document(file_hash, {
+            "id": document_id,
+            "filename": file.filename,
+            "chunks_count": len(chunks),
+            "version": 1,
+            "chunks": chunk_layout(chunks)
+        })
+        await loop.run_in_executor(None, bind_context(
+            sync_chunk_owners, {chunk["hash"] for chunk in chunks} - new_ids.keys(), set(new_ids.values())
+        ))
+        registry.record_savings(bytes_saved, embeddings_saved)
+
+        set_pdf_uploaded(True)
+        schedule_summaries(document_id, file.filename, chunks)
+        INGEST_STAGE_SECONDS.labels("total").observe(time.perf_counter() - start_time)
 
         return DocumentUpload(
             id=document_id,
             filename=file.filename,
             uploaded_at=datetime.utcnow(),
-            chunks_count=len(chunks)
+            chunks_count=len(chunks),
+            embeddings_saved=embeddings_saved,
+            bytes_saved=bytes_saved
         )
 
     finally:
         if file_path and file_path.exists():
             os.remove(file_path)
+
+
+# -------------------------------------------------
+# NEW DOCUMENT VERSION (incremental re-indexing)
+# -------------------------------------------------
+@router.put("/upload/{document_id}", response_model=DocumentVersionUpdate)
+async def update_document(document_id: str, file: UploadFile = File(...)):
+    token = generate_unique_id()
+    # The current version is read under the lease, after any earlier PUT has been applied
+    while not _acquire_document_lock(document_id, token):
+        await asyncio.sleep(0.05)
+    try:
+        return await _update_document(document_id, file)
+    finally:
+        _release_document_lock(document_id, token)
+
+
+def _acquire_document_lock(document_id: str, token: str) -> bool:
+    """Take the document's update lease unless another unexpired one holds it."""
+    from db.state_store import get_state_store
+    store = get_state_store()
+    now = time.time()
+    with store.transaction():
+        held = store.get(DOCUMENT_LOCKS, document_id)
+        if held is not None and held["expires"] > now:
+            return False
+        store.set(DOCUMENT_LOCKS, document_id, {"token": token, "expires": now + DOCUMENT_LOCK_SECONDS})
+        return True
+
+
+def _release_document_lock(document_id: str, token: str):
+    from db.state_store import get_state_store
+    store = get_state_store()
+    with store.transaction():
+        held = store.get(DOCUMENT_LOCKS, document_id)
+        if held is not None and held["token"] == token:
+            store.delete(DOCUMENT_LOCKS, document_id)
+
+
+async def _update_document(document_id: str, file: UploadFile) -> DocumentVersionUpdate:
+    start_time = time.perf_counter()
+    registry = get_dedup_registry()
+    current = registry.get_document(document_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    content = await file.read()
+    file_hash = hash_bytes(content)
+
+    # 🔁 Same bytes as the current version: nothing to do
+    if file_hash == current["file_hash"]:
+        registry.record_savings(len(content), current["chunks_count"])
+        return DocumentVersionUpdate(
+            id=document_id,
+            filename=file.filename,
+            version=current["version"],
+            uploaded_at=datetime.utcnow(),
+            chunks_count=current["chunks_count"],
+            chunks_unchanged=current["chunks_count"],
+            embeddings_saved=current["chunks_count"],
+            bytes_saved=len(content)
+        )
+
+    other = find_document(file_hash)
+    if other:
+        raise HTTPException(
+            status_code=409,
+            detail=f"This file is already indexed as document {other['id']}"
+        )
+
+    loop = asyncio.get_event_loop()
+    chunks = await loop.run_in_executor(
+        None, bind_context(prepare_chunks, file.filename, content)
+    )
+
+    if not chunks:
+        raise HTTPException(status_code=400, detail="No readable text found")
+
+    # Only chunks whose text is new anywhere in the index are embedded
+    new_ids = {}
+    new_chunks, bytes_saved = select_new_chunks(chunks, new_ids)
+
+    if new_chunks:
+        embeddings = await loop.run_in_executor(
+            None, bind_context(embed_texts, [c["content"] for _, c in new_chunks])
+        )
+        await loop.run_in_executor(None, bind_context(upsert_vectors, [
+            build_vector(document_id, file.filename, chunk_id, chunk, vector)
+            for (chunk_id, chunk), vector in zip(new_chunks, embeddings)
+        ]))
+
+    # Kept chunks that moved (page, offsets or index) get a metadata-only update.
+    # A chunk another document also references keeps its vector metadata,
+    # which is that document's; this document's positions live in the layout.
+    layout = chunk_layout(chunks)
+    old_positions = {}
+    for chunk_hash, *position in current["chunks"]:
+        old_positions.setdefault(chunk_hash, position)
+    new_positions = {}
+    for chunk_hash, *position in layout:
+        new_positions.setdefault(chunk_hash, position)
+
+    kept = old_positions.keys() & new_positions.keys()
+    refs = registry.chunk_refs(kept)
+    kept_ids = registry.find_chunks(kept)
+    moved = {
+        kept_ids[chunk_hash]: position_metadata(file.filename, *position)
+        for chunk_hash, position in new_positions.items()
+        if chunk_hash in kept_ids and old_positions[chunk_hash] != position and refs.get(chunk_hash) == 1
+    }
+
+    # Swap the registry record first, then drop vectors nobody references
+    registry.register_chunks(new_ids)
+    version = current["version"] + 1
+    orphaned = registry.replace_document(document_id, file_hash, {
+        "id": document_id,
+        "filename": file.filename,
+        "chunks_count": len(chunks),
+        "version": version,
+        "chunks": layout
+    })
+    # Moved positions and changed owners go out as one batched update
+    await loop.run_in_executor(None, bind_context(
+        sync_chunk_owners, old_positions.keys() ^ new_positions.keys(), set(new_ids.values()), moved
+    ))
+    if orphaned:
+        await loop.run_in_executor(None, bind_context(get_pinecone_db().delete_vectors, orphaned))
+    schedule_summaries(document_id, file.filename, chunks)
+
+    embeddings_saved = len(chunks) - len(new_chunks)
+    registry.record_savings(bytes_saved, embeddings_saved)
+    INGEST_STAGE_SECONDS.labels("total").observe(time.perf_counter() - start_time)
+
+    return DocumentVersionUpdate(
+        id=document_id,
+        filename=file.filename,
+        version=version,
+        uploaded_at=datetime.utcnow(),
+        chunks_count=len(chunks),
+        chunks_added=len(new_chunks),
+        chunks_removed=len(old_positions.keys() - new_positions.keys()),
+        chunks_unchanged=len(old_positions.keys() & new_positions.keys()),
+        metadata_updates=len(moved),
+        embeddings_saved=embeddings_saved,
+        bytes_saved=bytes_saved
+    )
+
+
+# -------------------------------------------------
+# BULK UPLOAD (multiple files and/or ZIP archives)
+# -------------------------------------------------
+@router.post("/upload/batch", response_model=BulkUploadResponse)
+async def upload_documents(files: List[UploadFile] = File(...)):
+    start_time = time.time()
+    registry = get_dedup_registry()
+
+    # 1️⃣ Read everything, expanding archives into their documents
+    documents = []  # (filename, content, error)
+    for file in files:
+        content = await file.read()
+        if not file.filename.lower().endswith(".zip"):
+            documents.append((file.filename, content, None))
+            continue
+        try:
+            members = extract_archive(content, MAX_ARCHIVE_FILES, MAX_ARCHIVE_BYTES)
+        except (zipfile.BadZipFile, ValueError) as e:
+            documents.append((file.filename, b"", f"Invalid archive: {e}"))
+            continue
+        documents.extend((name, data, None) for name, data in members)
+
+    total_bytes = sum(len(content) for _, content, _ in documents)
+
+    # 2️⃣ Answer known files from the registry; collect the rest
+    results: List[BulkUploadResult] = []
+    pending = []  # (result position, filename, content, file_hash)
+    batch_hashes = set()
+    batch_copies = []  # (result, file_hash) of repeats within this batch
+    for filename, content, error in documents:
+        result = BulkUploadResult(filename=filename, error=error)
+        results.append(result)
+        if error:
+            continue
+        if filename.lower().split(".")[-1] not in SUPPORTED_EXTENSIONS:
+            result.error = "Unsupported file type"
+            continue
+
+        file_hash = hash_bytes(content)
+        existing = find_document(file_hash)
+        if existing or file_hash in batch_hashes:
+            result.duplicate = True
+            result.bytes_saved = len(content)
+            if existing:
+                result.id = existing["id"]
+                result.chunks_count = result.embeddings_saved = existing["chunks_count"]
+                registry.record_savings(result.bytes_saved, result.embeddings_saved)
+            else:
+                batch_copies.append((result, file_hash))
+            continue
+
+        batch_hashes.add(file_hash)
+        pending.append((len(results) - 1, filename, content, file_hash))
+
+    if pending and is_pdf_uploaded():
+        raise HTTPException(
+            status_code=400,
+            detail="A PDF is already uploaded. Please reset chat before uploading a new file."
+        )
+
+    # 3️⃣ Extract and chunk all new documents concurrently
+    loop = asyncio.get_event_loop()
+    prepared = await asyncio.gather(
+        *(loop.run_in_executor(None, bind_context(prepare_chunks, filename, content))
+          for _, filename, content, _ in pending),
+        return_exceptions=True
+    )
+
+    pending_ids = {}
+    new_chunks = []  # (document_id, filename, chunk_id, chunk)
+    ingested = []  # (result, file_hash, chunks, new chunks, layout)
+    for (position, filename, content, file_hash), chunks in zip(pending, prepared):
+        result = results[position]
+        if isinstance(chunks, Exception):
+            result.error = f"Extraction failed: {chunks}"
+            continue
+        if not chunks:
+            result.error = "No readable text found"
+            continue
+
+        result.id = generate_unique_id()
+        fresh, result.bytes_saved = select_new_chunks(chunks, pending_ids)
+        new_chunks.extend((result.id, filename, chunk_id, chunk) for chunk_id, chunk in fresh)
+        ingested.append((result, file_hash, chunks, len(fresh), chunk_layout(chunks)))
+
+    # 4️⃣ One shared embedding pass in large batches, then bulk upsert
+    if new_chunks:
+        encode = partial(embed_texts, batch_size=BULK_EMBED_BATCH_SIZE)
+        embeddings = await loop.run_in_executor(
+            None, bind_context(encode, [chunk["content"] for _, _, _, chunk in new_chunks])
+        )
+
+        vectors = [
+            build_vector(document_id, filename, chunk_id, chunk, vector)
+            for (document_id, filename, chunk_id, chunk), vector in zip(new_chunks, embeddings)
+        ]
+        await loop.run_in_executor(None, bind_context(upsert_vectors, vectors))
+
+    registry.register_chunks(pending_ids)
+    for result, file_hash, chunks, new_count, layout in ingested:
+        chunks_count = len(chunks)
+        result.chunks_count = chunks_count
+        result.embeddings_saved = chunks_count - new_count
+        registry.register_document(file_hash, {
+            "id": result.id,
+            "filename": result.filename,
+            "chunks_count": chunks_count,
+            "version": 1,
+            "chunks": layout
+        })
+        registry.record_savings(result.bytes_saved, result.embeddings_saved)
+        schedule_summaries(result.id, result.filename, chunks)
+    await loop.run_in_executor(None, bind_context(
+        sync_chunk_owners, {row[0] for *_, layout in ingested for row in layout}, set(pending_ids.values())
+    ))
+
+    # In-batch copies point at the document ingested for their first copy
+    for result, file_hash in batch_copies:
+        existing = registry.find_document(file_hash)
+        if existing:
+            result.id = existing["id"]
+            result.chunks_count = result.embeddings_saved = existing["chunks_count"]
+        registry.record_savings(result.bytes_saved, result.embeddings_saved)
+
+    if ingested:
+        set_pdf_uploaded(True)
+
+    elapsed = max(time.time() - start_time, 1e-6)
+    INGEST_STAGE_SECONDS.labels("total").observe(elapsed)
+    chunks_count = sum(len(chunks) for _, _, chunks, _, _ in ingested)
+    return BulkUploadResponse(
+        results=results,
+        files_count=len(documents),
+        chunks_count=chunks_count,
+        embeddings_count=len(new_chunks),
+        elapsed_seconds=round(elapsed, 3),
+        files_per_second=round(len(documents) / elapsed, 2),
+        chunks_per_second=round(chunks_count / elapsed, 2),
+        mb_per_second=round(total_bytes / (1024 * 1024) / elapsed, 3)
+    )
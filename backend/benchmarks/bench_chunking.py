@@ -0,0 +1,94 @@
+"""
+Throughput benchmark: offset-based chunk_document vs the legacy word-list chunker.
+
+Run from backend/:
+    python -m benchmarks.bench_chunking --sizes 1 4 16
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.helpers import chunk_document
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
+    """The previous implementation: split into words and re-join every window."""
+    if not text:
+        return []
+
+    words = text.split()
+    chunks = []
+
+    start = 0
+    while start < len(words):
+        end = start + chunk_size
+        chunks.append(" ".join(words[start:end]))
+        start = end - overlap
+
+        if start < 0:
+            start = 0
+
+    return chunks
+
+
+def generate_text(size_mb: float, seed: int = 42) -> str:
+    """Generate cleaned, sentence-structured text of roughly size_mb megabytes."""
+    rng = random.Random(seed)
+    vocabulary = [
+        "retrieval", "model", "vector", "document", "query", "index", "latency",
+        "the", "of", "and", "a", "to", "in", "is", "for", "embedding", "chunk",
+    ]
+    target = int(size_mb * 1024 * 1024)
+    sentences = []
+    length = 0
+    while length < target:
+        sentence = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 30)))
+        sentence = sentence.capitalize() + rng.choice([".", ".", ".", "?", "!"])
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def measure(func, *args):
+    """Return (result, seconds, peak traced bytes); timing runs without tracing."""
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16],
+                        help="Corpus sizes in MB")
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'impl':>8} {'chunks':>8} {'seconds':>9} {'MB/s':>8} {'peak MB':>9}")
+    for size_mb in args.sizes:
+        text = generate_text(size_mb)
+        mb = len(text) / (1024 * 1024)
+
+        for name, func, call_args in [
+            ("legacy", legacy_chunk_text, (text, 500, 100)),
+            ("offsets", chunk_document, ([text], 500, 100)),
+        ]:
+            chunks, elapsed, peak = measure(func, *call_args)
+            print(f"{size_mb:>5}M {name:>8} {len(chunks):>8} {elapsed:>9.3f} "
+                  f"{mb / elapsed:>8.1f} {peak / (1024 * 1024):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
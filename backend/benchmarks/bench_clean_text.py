@@ -0,0 +1,152 @@
+"""
+Equivalence check and micro-benchmark: single-pass clean_text vs the legacy version.
+
+Run from backend/:
+    python -m benchmarks.bench_clean_text --sizes 1 4 16
+
+Exits non-zero if the new implementation ever disagrees with the legacy one.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.helpers import clean_text, iter_clean_pages
+
+
+def legacy_clean_text(text: str) -> str:
+    """The previous implementation: eight str.replace passes plus an uncompiled regex."""
+    if not text:
+        return ""
+
+    replacements = {
+        "â¢": "•",
+        "â€“": "-",
+        "â€”": "-",
+        "â€œ": '"',
+        "â€�": '"',
+        "â€™": "'",
+        "â€˜": "'",
+        "â€¦": "...",
+    }
+
+    for bad, good in replacements.items():
+        text = text.replace(bad, good)
+
+    text = text.replace("\x00", " ")
+    text = re.sub(r"\s+", " ", text)
+
+    return text.strip()
+
+
+EDGE_CASES = [
+    "",
+    " ",
+    "\x00",
+    "plain text",
+    "  leading and trailing  ",
+    "tabs\tand\nnew\r\nlines\x0b\x0c",
+    "null\x00in\x00 \x00 the middle",
+    "â¢ bullet",
+    "â€“dashâ€”",
+    "â€œquotedâ€�",
+    "itâ€™s â€˜fineâ€˜",
+    "ellipsisâ€¦",
+    "ââ€“¢",
+    "â€â¢â€",
+    "â",
+    "â\x00¢",
+    "unicode nbsp em　ideographic line",
+    "​zero width stays",
+    "ends with mojibake â€¦",
+]
+
+ALPHABET = ["a", "b", "\x1c", "\x85", " ", "  ", "\n", "\t", "\x00", " ", "â", "€", "¢", "“", "”",
+            "œ", "�", "™", "˜", "¦", ".", "â€", "â¢", "â€™", "â€¦"]
+
+
+def check_equivalence(fuzz_cases: int = 20000, seed: int = 7) -> int:
+    """Compare both implementations on edge cases and random strings; return failures."""
+    rng = random.Random(seed)
+    cases = list(EDGE_CASES)
+    cases += ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+              for _ in range(fuzz_cases)]
+
+    failures = 0
+    for case in cases:
+        expected, actual = legacy_clean_text(case), clean_text(case)
+        if expected != actual:
+            failures += 1
+            if failures <= 10:
+                print(f"MISMATCH {case!r}: legacy={expected!r} new={actual!r}")
+
+    # Page-by-page cleaning joins to the same text as cleaning the whole document
+    for _ in range(500):
+        pages = ["".join(rng.choice(ALPHABET[:8]) for _ in range(rng.randint(0, 30)))
+                 for _ in range(rng.randint(1, 6))]
+        incremental = " ".join(p for p in iter_clean_pages(pages) if p)
+        if incremental != legacy_clean_text("\n".join(pages)):
+            failures += 1
+            print(f"PAGE MISMATCH {pages!r}")
+
+    print(f"Equivalence: {len(cases) + 500} cases, {failures} failures")
+    return failures
+
+
+def generate_text(size_mb: float, seed: int = 42) -> str:
+    """Generate raw extracted-looking text: line breaks, stray nulls, some mojibake."""
+    rng = random.Random(seed)
+    words = ["retrieval", "model", "vector", "document", "query", "the", "of", "and",
+             "index", "latency", "embedding", "chunk"]
+    damaged = ["itâ€™s", "â€œquotedâ€�", "â¢", "nulls\x00here", "endâ€¦"]
+    separators = [" ", " ", " ", " ", " ", "  ", "\n", " \n", "\t"]
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    while length < target:
+        word = rng.choice(damaged) if rng.random() < 0.02 else rng.choice(words)
+        part = word + rng.choice(separators)
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+def best_of(func, text: str, repeat: int = 3) -> float:
+    """Best wall time of several runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16],
+                        help="Corpus sizes in MB")
+    args = parser.parse_args()
+
+    if check_equivalence():
+        sys.exit(1)
+
+    print(f"{'size':>6} {'legacy s':>9} {'new s':>9} {'speedup':>8}")
+    for size_mb in args.sizes:
+        text = generate_text(size_mb)
+        if legacy_clean_text(text) != clean_text(text):
+            print(f"MISMATCH on generated {size_mb}MB corpus")
+            sys.exit(1)
+
+        legacy = best_of(legacy_clean_text, text)
+        new = best_of(clean_text, text)
+        print(f"{size_mb:>5}M {legacy:>9.3f} {new:>9.3f} {legacy / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
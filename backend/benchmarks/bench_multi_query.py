@@ -0,0 +1,82 @@
+"""
+Latency of multi-query retrieval against single-query retrieval.
+
+The local index answers in microseconds, so each query also waits
+--latency-ms to stand in for a Pinecone round-trip. With the variant
+queries running concurrently, multi-query retrieval should cost about one
+round-trip, not one per variant.
+
+Run from backend/:
+    python -m benchmarks.bench_multi_query --vectors 10000 --latency-ms 40
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.run import build_index, stub_embedding_service
+
+QUESTIONS = [
+    "What is the refund policy?",
+    "How does the model handle long documents and tables?",
+    "Who approved the budget and when?",
+    "limits",
+    "Which risks are listed for the migration and how are they mitigated?",
+]
+
+
+class SlowDatabase:
+    """Adds a fixed network delay to every query of the wrapped database."""
+
+    def __init__(self, db, latency: float):
+        self.db = db
+        self.latency = latency
+
+    def query(self, query_embedding, top_k=5, filter=None):
+        time.sleep(self.latency)
+        return self.db.query(query_embedding, top_k, filter)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--max-queries", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    from services.retriever import RetrieverService
+
+    embedding_service = stub_embedding_service()
+    db = SlowDatabase(build_index(args.vectors), args.latency_ms / 1000)
+    retriever = RetrieverService(db, embedding_service, max_queries=args.max_queries)
+
+    single, multi, fan_out = [], [], []
+    for _ in range(args.rounds):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            retriever.retrieve(embedding_service.encode_single(question), top_k=5, similarity_threshold=0.0)
+            single.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            retriever.retrieve_multi(question, top_k=5, similarity_threshold=0.0)
+            multi.append(time.perf_counter() - start)
+            fan_out.append(len(retriever.query_variants(question)))
+
+    print(f"variants per question: mean {statistics.mean(fan_out):.1f}, max {max(fan_out)} (cap {args.max_queries})")
+    print(f"{'mode':<8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, timings in (("single", single), ("multi", multi)):
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<8} {statistics.median(timings) * 1000:>8.1f} {p95 * 1000:>8.1f}")
+    added = (statistics.median(multi) - statistics.median(single)) * 1000
+    print(f"added p50 latency: {added:.1f} ms (one round-trip = {args.latency_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Snapshot and restore timings of the local vector index.
+
+For each index size: time a snapshot, then the time a fresh load needs to
+answer its first query (restore with and without checksum verification).
+
+Run from backend/:
+    python -m benchmarks.bench_snapshot --vectors 10000 100000
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.run import EMBEDDING_DIMENSION, build_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    from db.local_db import LocalVectorDatabase
+
+    query = np.random.default_rng(1).standard_normal(EMBEDDING_DIMENSION).tolist()
+    print(f"{'vectors':>8} {'snapshot s':>11} {'MB':>8} {'restore+query s':>16} {'unverified s':>13}")
+    for vectors in args.vectors:
+        db = build_index(vectors)
+        directory = tempfile.mkdtemp()
+        try:
+            start = time.perf_counter()
+            manifest = db.snapshot(directory)
+            snapshot_seconds = time.perf_counter() - start
+            size_mb = sum(file["bytes"] for file in manifest["files"].values()) / (1024 * 1024)
+
+            timings = []
+            for verify in (True, False):
+                start = time.perf_counter()
+                LocalVectorDatabase.restore(directory, verify=verify).query(query, 5)
+                timings.append(time.perf_counter() - start)
+
+            print(f"{vectors:>8} {snapshot_seconds:>11.3f} {size_mb:>8.1f} {timings[0]:>16.3f} {timings[1]:>13.3f}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
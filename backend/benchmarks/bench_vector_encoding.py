@@ -0,0 +1,111 @@
+"""
+Memory, query latency and recall of the local index's vector encodings.
+
+Builds the same synthetic corpus as float32, float16 and PQ indexes, with
+and without a full-precision rerank, and compares each with the exact
+float32 results. The corpus lies near a low-dimensional subspace (--rank),
+like sentence embeddings; full-rank random vectors are the worst case for
+product quantization. Memory is the vector storage only (codes, codebooks
+and rerank vectors), scaled to one million vectors; chunk text and
+metadata come on top and are the same for all.
+
+Run from backend/:
+    python -m benchmarks.bench_vector_encoding --vectors 100000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.run import EMBEDDING_DIMENSION
+
+CONFIGURATIONS = [
+    ("float32", False),
+    ("float16", False),
+    ("float16", True),
+    ("pq", False),
+    ("pq", True),
+]
+
+
+def embedding_like(count: int, basis: np.ndarray, noise: float, rng) -> np.ndarray:
+    """Vectors near a low-dimensional subspace, as sentence embeddings are."""
+    rank = len(basis)
+    latent = rng.standard_normal((count, rank)) @ basis
+    return (latent + noise * np.sqrt(rank) * rng.standard_normal((count, EMBEDDING_DIMENSION))).astype(np.float32)
+
+
+def vector_bytes(db) -> int:
+    """Bytes of vector storage actually in use (not spare capacity)."""
+    rows = len(db)
+    total = db._vectors[:rows].nbytes
+    if db._full is not None:
+        total += db._full[:rows].nbytes
+    if db._codebooks is not None:
+        total += db._codebooks.nbytes
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rank", type=int, default=32, help="Intrinsic dimension of the corpus")
+    parser.add_argument("--noise", type=float, default=0.1, help="Full-rank noise, relative to the signal")
+    parser.add_argument("--pq-subvectors", type=int, default=48)
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    args = parser.parse_args()
+
+    from db.local_db import LocalVectorDatabase
+    from models.records import ChunkRecord
+
+    rng = np.random.default_rng(0)
+    basis = rng.standard_normal((args.rank, EMBEDDING_DIMENSION))
+    vectors = embedding_like(args.vectors, basis, args.noise, rng)
+    queries = embedding_like(args.queries, basis, 0.0, rng).tolist()
+    records = [
+        ChunkRecord(f"chunk-{i}", "doc", "", {"document_id": "doc"}, vectors[i])
+        for i in range(args.vectors)
+    ]
+
+    exact = None
+    print(f"{'encoding':<16} {'MB / 1M vectors':>16} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+    for encoding, rerank in CONFIGURATIONS:
+        db = LocalVectorDatabase(dimension=EMBEDDING_DIMENSION, initial_capacity=args.vectors, encoding=encoding,
+                                 rerank=rerank, rerank_factor=args.rerank_factor,
+                                 pq_subvectors=args.pq_subvectors)
+        start = time.perf_counter()
+        db.upsert_chunks(records)
+        if db.storage_encoding != encoding:
+            # Fewer vectors than pq_train_size: train on what there is
+            db.train()
+        build = time.perf_counter() - start
+
+        timings, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            matches = db.query(query, args.top_k)
+            timings.append(time.perf_counter() - start)
+            results.append({match["id"] for match in matches})
+        if exact is None:
+            exact = results
+        recall = statistics.mean(len(found & truth) / args.top_k for found, truth in zip(results, exact))
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        mb_per_million = vector_bytes(db) / len(db) * 1_000_000 / (1024 * 1024)
+        name = encoding + ("+rerank" if rerank else "")
+        print(f"{name:<16} {mb_per_million:>16.1f} {build:>8.2f} {statistics.median(timings) * 1000:>8.2f} "
+              f"{p95 * 1000:>8.2f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Multi-worker scaling: per-worker memory and requests/sec from 1 to N workers.
+
+Starts `gunicorn -c gunicorn.conf.py main:app` with each worker count,
+drives it with concurrent keep-alive clients and reads RSS/PSS of every
+worker from /proc (Linux). PSS splits shared pages between the processes
+sharing them, so a low PSS next to a high RSS shows that copy-on-write
+sharing of the preloaded model is working.
+
+Run from backend/:
+    python -m benchmarks.bench_workers --max-workers 4 --path /health
+"""
+
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def read_memory_kb(pid: int) -> Dict[str, int]:
+    """Return Rss and Pss (kB) of a process from /proc/<pid>/smaps_rollup."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                memory[name] = int(rest.split()[0])
+    return memory
+
+
+def child_pids(parent: int) -> List[int]:
+    """Direct children of a process, from /proc/<pid>/stat."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            children.append(int(entry))
+    return children
+
+
+def wait_ready(port: int, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+def drive_load(port: int, method: str, path: str, body: str, clients: int, seconds: float) -> Dict[str, float]:
+    """Run keep-alive clients for a fixed time; return requests/sec and error count."""
+    counts = [0] * clients
+    errors = [0] * clients
+    stop = time.time() + seconds
+    headers = {"Content-Type": "application/json"} if body else {}
+
+    def client(i: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.time() < stop:
+            try:
+                conn.request(method, path, body=body or None, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors[i] += 1
+                counts[i] += 1
+            except OSError:
+                errors[i] += 1
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    return {"rps": sum(counts) / elapsed, "errors": sum(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--body", default="", help="JSON body, e.g. for POST /chat")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--state-db", default="/tmp/bench_workers_state.db")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'req/s':>9} {'errors':>7} {'RSS/worker MB':>14} "
+          f"{'PSS/worker MB':>14} {'total PSS MB':>13}")
+    baseline_rps = None
+    for workers in range(1, args.max_workers + 1):
+        env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(args.port),
+                   STATE_STORE="sqlite", STATE_DB_PATH=args.state_db)
+        server = subprocess.Popen(
+            ["gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(args.port)
+            load = drive_load(args.port, args.method, args.path, args.body, args.clients, args.seconds)
+
+            pids = child_pids(server.pid)
+            memory = [read_memory_kb(pid) for pid in pids]
+            master = read_memory_kb(server.pid)
+            rss = sum(m["Rss"] for m in memory) / len(memory) / 1024
+            pss = sum(m["Pss"] for m in memory) / len(memory) / 1024
+            total_pss = (sum(m["Pss"] for m in memory) + master["Pss"]) / 1024
+
+            baseline_rps = baseline_rps or load["rps"]
+            print(f"{workers:>7} {load['rps']:>9.1f} {load['errors']:>7} {rss:>14.1f} "
+                  f"{pss:>14.1f} {total_pss:>13.1f}   ({load['rps'] / baseline_rps:.2f}x)")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Import-time budget check for the app module.
+
+Imports main in fresh interpreters (WARMUP=off, so nothing loads in the
+background) and fails when the fastest run exceeds the budget or when any
+heavy dependency was imported eagerly. Those belong to first use or the
+post-startup warm-up, so /health can answer as soon as the port is bound.
+
+Run from backend/ (exit status 1 on failure):
+    python -m benchmarks.check_import_time --budget 2.0
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Must not be imported by `import main`
+HEAVY_MODULES = [
+    "sentence_transformers", "torch", "transformers", "pinecone", "groq",
+    "pdfplumber", "docx", "jose", "passlib", "bcrypt",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def run_probe(env) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    # The app prints its own startup lines; the report is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top: int):
+    """Cumulative -X importtime entries of the slowest top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET", 2.0)),
+                        help="Seconds allowed for `import main` (default IMPORT_TIME_BUDGET or 2.0)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WARMUP="off", PRELOAD_MODEL="false", ENABLE_AUTH="false")
+    probes = [run_probe(env) for _ in range(args.runs)]
+    seconds = min(probe["seconds"] for probe in probes)
+    heavy = sorted({module for probe in probes for module in probe["heavy"]})
+
+    print(f"import main: {seconds:.3f}s (fastest of {args.runs}), budget {args.budget:.3f}s")
+    print("\nslowest imports (cumulative ms):")
+    for cumulative, name in slowest_imports(env, args.top):
+        print(f"{cumulative / 1000:>10.1f}  {name}")
+
+    failures = []
+    if seconds > args.budget:
+        failures.append(f"import time {seconds:.3f}s exceeds the {args.budget:.3f}s budget")
+    if heavy:
+        failures.append(f"heavy modules imported eagerly: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Equivalence check of the vectorized retrieval sweep against evaluation/metrics.py.
+
+Feeds the sweep random candidate lists (sorted scores, documents repeated
+across chunks, queries with no relevant document) from an in-memory
+database, then recomputes every (k, threshold) setting the way the
+evaluator does: keep the first k candidates scoring at least the
+threshold, take their document names and apply precision_at_k,
+recall_at_k, mean_reciprocal_rank and average_precision.
+
+Run from backend/ (exit status 1 on any mismatch):
+    python -m benchmarks.check_retrieval_sweep --queries 500
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from evaluation.evaluator import EvaluationSample
+from evaluation.metrics import precision_at_k, recall_at_k, mean_reciprocal_rank, average_precision
+from evaluation.retrieval_sweep import RetrievalSweep
+
+
+class CannedEmbeddings:
+    """Embeds query i as [i], so the database can look its candidates up."""
+
+    def encode(self, texts):
+        return [[float(i)] for i in range(len(texts))]
+
+
+class CannedDatabase:
+    """Returns a fixed candidate list per query."""
+
+    def __init__(self, candidates):
+        self.candidates = candidates
+
+    def query(self, query_embedding, top_k=5, filter=None):
+        return self.candidates[int(query_embedding[0])][:top_k]
+
+
+def random_case(queries: int, max_k: int, documents: int, rng):
+    samples, candidates = [], []
+    for i in range(queries):
+        relevant = set(f"doc-{d}" for d in rng.choice(documents, size=rng.integers(0, 4), replace=False))
+        count = int(rng.integers(0, max_k + 1))
+        scores = np.sort(np.round(rng.random(count), 2))[::-1]
+        candidates.append([
+            {"id": f"q{i}-c{j}", "score": float(score),
+             "metadata": {"filename": f"doc-{rng.integers(documents)}"}}
+            for j, score in enumerate(scores)
+        ])
+        samples.append(EvaluationSample(f"query {i}", relevant))
+    return samples, candidates
+
+
+def brute_force(samples, candidates, ks, thresholds):
+    """Each setting scored one query at a time with the metrics.py functions."""
+    grid = {name: np.zeros((len(ks), len(thresholds))) for name in ("precision", "recall", "mrr", "map")}
+    for i, k in enumerate(ks):
+        for j, threshold in enumerate(thresholds):
+            for sample, matches in zip(samples, candidates):
+                docs = [match["metadata"]["filename"] for match in matches[:k] if match["score"] >= threshold]
+                grid["precision"][i, j] += precision_at_k(docs, sample.relevant_docs, k)
+                grid["recall"][i, j] += recall_at_k(docs, sample.relevant_docs, k)
+                grid["mrr"][i, j] += mean_reciprocal_rank(docs, sample.relevant_docs)
+                grid["map"][i, j] += average_precision(docs, sample.relevant_docs)
+    return {name: values / len(samples) for name, values in grid.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--documents", type=int, default=6, help="Few documents, so chunks repeat them")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ks = [1, 2, 3, 5, 8, 10]
+    thresholds = [0.0, 0.25, 0.5, 0.75, 0.9]
+    rng = np.random.default_rng(args.seed)
+    samples, candidates = random_case(args.queries, max(ks), args.documents, rng)
+
+    sweep = RetrievalSweep(CannedEmbeddings(), CannedDatabase(candidates))
+    sweep.collect(samples, max(ks))
+    grid = sweep.evaluate_grid(ks, thresholds)
+    expected = brute_force(samples, candidates, ks, thresholds)
+
+    failed = False
+    for name, values in expected.items():
+        error = float(np.abs(grid[name] - values).max())
+        ok = np.allclose(grid[name], values, rtol=0, atol=1e-9)
+        failed |= not ok
+        print(f"{name:<10} max abs difference {error:.2e}  {'ok' if ok else 'MISMATCH'}")
+    if failed:
+        sys.exit(1)
+    print(f"Sweep matches evaluation/metrics.py on {len(ks) * len(thresholds)} settings x {args.queries} queries")
+
+
+if __name__ == "__main__":
+    main()
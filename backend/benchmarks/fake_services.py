@@ -0,0 +1,172 @@
+"""
+Local stand-ins for the Pinecone data plane and the Groq chat API.
+
+They speak the HTTP endpoints the official clients call, so the app runs
+unchanged against them with:
+    PINECONE_HOST=http://127.0.0.1:9101    (PineconeDatabase)
+    GROQ_BASE_URL=http://127.0.0.1:9102    (LLMService)
+
+Every request first waits a latency drawn from a log-normal distribution
+(median --latency-ms, spread --latency-sigma) and then fails with
+--error-status at rate --error-rate, so tail latency and retries can be
+load-tested without paying for or being rate-limited by the real services.
+
+Run from backend/:
+    python -m benchmarks.fake_services pinecone --port 9101 --latency-ms 25
+    python -m benchmarks.fake_services groq --port 9102 --latency-ms 400 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from db.local_db import LocalVectorDatabase
+from models.records import ChunkRecord
+
+
+class FaultInjector:
+    """Log-normal latency plus random error responses."""
+
+    def __init__(self, latency_ms: float, latency_sigma: float, error_rate: float,
+                 error_status: int, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+
+    async def __call__(self, request: Request, call_next):
+        if self.latency_ms > 0:
+            delay = self.latency_ms * self.rng.lognormvariate(0.0, self.latency_sigma)
+            await asyncio.sleep(delay / 1000)
+        if self.rng.random() < self.error_rate:
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "fake_service_error"}},
+                status_code=self.error_status
+            )
+        return await call_next(request)
+
+
+# -------------------------------------------------
+# Pinecone data plane
+# -------------------------------------------------
+def create_pinecone_app(dimension: int = 384) -> FastAPI:
+    app = FastAPI(title="Fake Pinecone index")
+    db = LocalVectorDatabase(dimension=dimension)
+
+    @app.post("/vectors/upsert")
+    async def upsert(body: Dict[str, Any]):
+        vectors = body.get("vectors", [])
+        db.upsert_chunks([
+            ChunkRecord(v["id"], "", "", v.get("metadata") or {}, v["values"])
+            for v in vectors
+        ])
+        return {"upsertedCount": len(vectors)}
+
+    @app.post("/query")
+    async def query(body: Dict[str, Any]):
+        matches = db.query(body["vector"], body.get("topK", 10), body.get("filter"))
+        if not body.get("includeMetadata"):
+            for match in matches:
+                match.pop("metadata")
+        return {"matches": matches, "namespace": body.get("namespace", "")}
+
+    @app.post("/vectors/delete")
+    async def delete(body: Dict[str, Any]):
+        if body.get("deleteAll"):
+            db.delete_all()
+        else:
+            db.delete_vectors(body.get("ids", []))
+        return {}
+
+    @app.post("/vectors/update")
+    async def update(body: Dict[str, Any]):
+        db.update_metadata(body["id"], body.get("setMetadata") or {})
+        return {}
+
+    @app.get("/vectors/fetch")
+    async def fetch(request: Request):
+        ids = request.query_params.getlist("ids")
+        return {"vectors": db.fetch(ids), "namespace": ""}
+
+    @app.api_route("/describe_index_stats", methods=["GET", "POST"])
+    async def describe_index_stats():
+        return {
+            "namespaces": {"": {"vectorCount": len(db)}},
+            "dimension": dimension,
+            "indexFullness": 0.0,
+            "totalVectorCount": len(db),
+        }
+
+    return app
+
+
+# -------------------------------------------------
+# Groq (OpenAI-compatible) chat completions
+# -------------------------------------------------
+def create_groq_app() -> FastAPI:
+    app = FastAPI(title="Fake Groq")
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        prompt = body["messages"][-1]["content"]
+        answer = f"Fake answer based on {len(prompt)} characters of prompt."
+        prompt_tokens = sum(len(m["content"].split()) for m in body["messages"])
+        completion_tokens = len(answer.split())
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def build_app(service: str, latency_ms: float = 0.0, latency_sigma: float = 0.5,
+              error_rate: float = 0.0, error_status: int = 503, dimension: int = 384) -> FastAPI:
+    app = create_pinecone_app(dimension) if service == "pinecone" else create_groq_app()
+    app.middleware("http")(FaultInjector(latency_ms, latency_sigma, error_rate, error_status))
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=["pinecone", "groq"])
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Median injected latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--dimension", type=int, default=384)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = build_app(args.service, args.latency_ms, args.latency_sigma,
+                    args.error_rate, args.error_status, args.dimension)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+End-to-end load test of /upload -> /chat against local Pinecone and Groq stand-ins.
+
+Starts the two fake services (benchmarks/fake_services.py) and the app
+under gunicorn (as in production), ingests a document, then replays an
+open-loop mixed workload at a target request rate:
+- chat:     POST /chat with a random question
+- update:   PUT /upload/{id} with a new revision of the document
+- reupload: POST /upload of an already indexed file (dedup fast path)
+
+Open loop means requests are sent on schedule whether or not earlier ones
+finished, so queueing shows up in the latencies. Reports p50/p95/p99,
+throughput and error rate per endpoint.
+
+Run from backend/:
+    python -m benchmarks.load_test --rps 20 --duration 60 --llm-latency-ms 400 --llm-error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.bench_chunking import generate_text
+from evaluation.metrics import percentile
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+QUESTIONS = [
+    "What does the document say about retrieval latency?",
+    "Summarize the section on vector indexes.",
+    "How is the embedding model used for queries?",
+    "Which documents mention chunk size?",
+    "What is the role of the index?",
+]
+
+
+def wait_port(port: int, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+class Recorder:
+    """Latency and status per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+
+    def record(self, endpoint: str, seconds: float, status: str):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        summary = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+            summary[endpoint] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": dict(statuses),
+            }
+        return summary
+
+
+class Workload:
+    """Generates the mixed requests and keeps the document revision state."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, document_id: str,
+                 base_text: str, reference: bytes, seed: int = 0):
+        self.client = client
+        self.recorder = recorder
+        self.document_id = document_id
+        self.base_text = base_text
+        self.reference = reference
+        self.revision = 0
+        self.rng = random.Random(seed)
+
+    async def timed(self, endpoint: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.recorder.record(endpoint, time.perf_counter() - start, status)
+
+    def chat(self):
+        return self.timed("POST /chat", self.client.post(
+            "/chat", json={"message": self.rng.choice(QUESTIONS)}
+        ))
+
+    def update(self):
+        # A unique trailing sentence keeps every revision distinct
+        self.revision += 1
+        text = f"{self.base_text} Revision {self.revision} changes this closing sentence."
+        return self.timed("PUT /upload/{id}", self.client.put(
+            f"/upload/{self.document_id}",
+            files={"file": ("document.txt", text.encode(), "text/plain")}
+        ))
+
+    def reupload(self):
+        return self.timed("POST /upload", self.client.post(
+            "/upload", files={"file": ("reference.txt", self.reference, "text/plain")}
+        ))
+
+
+async def run_load(base_url: str, rps: float, duration: float, weights: Dict[str, float],
+                   document_mb: float, max_in_flight: int, seed: int) -> Dict[str, Dict]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        # Ingest the document to update and a reference file to re-upload
+        base_text = generate_text(document_mb, seed)
+        reference = generate_text(document_mb, seed + 1).encode()
+        await client.post("/reset-chat")
+        response = await client.post("/upload/batch", files=[
+            ("files", ("document.txt", base_text.encode(), "text/plain")),
+            ("files", ("reference.txt", reference, "text/plain")),
+        ])
+        response.raise_for_status()
+        document_id = response.json()["results"][0]["id"]
+
+        workload = Workload(client, recorder, document_id, base_text, reference, seed)
+        operations = list(weights)
+        rng = random.Random(seed)
+        in_flight = set()
+
+        start = time.perf_counter()
+        for i in range(int(rps * duration)):
+            # Open loop: fixed schedule, independent of completions
+            delay = start + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= max_in_flight:
+                recorder.dropped += 1
+                continue
+            operation = rng.choices(operations, weights=[weights[o] for o in operations])[0]
+            task = asyncio.ensure_future(getattr(workload, operation)())
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        elapsed = time.perf_counter() - start
+
+    summary = recorder.report(elapsed)
+    summary["_total"] = {"elapsed_seconds": round(elapsed, 2), "client_dropped": recorder.dropped}
+    return summary
+
+
+def start(cmd: List[str], env: Dict[str, str], port: int) -> subprocess.Popen:
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_port(port)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=10.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--chat-weight", type=float, default=0.85)
+    parser.add_argument("--update-weight", type=float, default=0.10)
+    parser.add_argument("--reupload-weight", type=float, default=0.05)
+    parser.add_argument("--document-mb", type=float, default=0.2)
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--pinecone-port", type=int, default=9101)
+    parser.add_argument("--groq-port", type=int, default=9102)
+    parser.add_argument("--vector-latency-ms", type=float, default=20.0)
+    parser.add_argument("--vector-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="Also write the report here")
+    args = parser.parse_args()
+
+    fake = [sys.executable, "-m", "benchmarks.fake_services"]
+    state_db = Path(tempfile.mkdtemp()) / "state.db"
+    app_env = dict(
+        os.environ,
+        PORT=str(args.app_port),
+        WEB_CONCURRENCY=str(args.workers),
+        STATE_STORE="sqlite",
+        STATE_DB_PATH=str(state_db),
+        VECTOR_DB="pinecone",
+        PINECONE_API_KEY="fake-key",
+        PINECONE_INDEX_NAME="load-test",
+        PINECONE_HOST=f"http://127.0.0.1:{args.pinecone_port}",
+        GROQ_API_KEY="fake-key",
+        GROQ_BASE_URL=f"http://127.0.0.1:{args.groq_port}",
+    )
+
+    processes = []
+    try:
+        processes.append(start(fake + [
+            "pinecone", "--port", str(args.pinecone_port),
+            "--latency-ms", str(args.vector_latency_ms), "--latency-sigma", str(args.latency_sigma),
+            "--error-rate", str(args.vector_error_rate),
+        ], dict(os.environ), args.pinecone_port))
+        processes.append(start(fake + [
+            "groq", "--port", str(args.groq_port),
+            "--latency-ms", str(args.llm_latency_ms), "--latency-sigma", str(args.latency_sigma),
+            "--error-rate", str(args.llm_error_rate),
+        ], dict(os.environ), args.groq_port))
+        processes.append(start(["gunicorn", "-c", "gunicorn.conf.py", "main:app"], app_env, args.app_port))
+
+        weights = {"chat": args.chat_weight, "update": args.update_weight, "reupload": args.reupload_weight}
+        summary = asyncio.run(run_load(
+            f"http://127.0.0.1:{args.app_port}", args.rps, args.duration,
+            {name: weight for name, weight in weights.items() if weight > 0},
+            args.document_mb, args.max_in_flight, args.seed
+        ))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+    print(f"{'endpoint':<18} {'requests':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'errors':>7}  statuses")
+    for endpoint, stats in summary.items():
+        if endpoint.startswith("_"):
+            continue
+        print(f"{endpoint:<18} {stats['requests']:>8} {stats['throughput_rps']:>7.2f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+              f"{stats['error_rate']:>7.2%}  {stats['statuses']}")
+    print(f"elapsed {summary['_total']['elapsed_seconds']}s, "
+          f"client-side drops {summary['_total']['client_dropped']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Offline micro-benchmark suite for the hot functions, with a saved baseline.
+
+Covers clean_text, chunk_text, chunk_document, EmbeddingService.encode
+(with a stub model, so no weights are loaded), the per-chunk vector
+records built at ingest, and RetrieverService.retrieve over a
+LocalVectorDatabase, on generated corpora of several sizes. Each case
+records throughput (best of --repeat runs) and peak traced memory.
+
+Run from backend/:
+    python -m benchmarks.run --save-baseline        # record a baseline
+    python -m benchmarks.run                        # compare against it
+
+Exits non-zero if any case is slower, or uses more memory, than the
+baseline by more than --threshold (default 25%). Baselines are machine
+specific; record one on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.helpers import clean_text, chunk_text, chunk_document
+from benchmarks.bench_chunking import generate_text
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+EMBEDDING_DIMENSION = 384
+
+# Memory below this is noise (interpreter allocations), not a regression
+MEMORY_FLOOR_MB = 1.0
+
+
+class StubEmbeddingModel:
+    """Stands in for SentenceTransformer: cheap deterministic random vectors."""
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, seed: int = 0):
+        self.dimension = dimension
+        self.rng = np.random.default_rng(seed)
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True):
+        return self.rng.standard_normal((len(texts), self.dimension)).astype(np.float32)
+
+
+def stub_embedding_service():
+    """EmbeddingService with the stub model, skipping the model download."""
+    from services.embeddings import EmbeddingService
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model = StubEmbeddingModel()
+    return service
+
+
+def noisy_text(size_mb: float, seed: int = 42) -> str:
+    """Corpus with the whitespace and mojibake clean_text has to fix."""
+    rng = random.Random(seed)
+    words = generate_text(size_mb, seed).split(" ")
+    noise = [" ", " ", " ", " ", "  ", "\n", "\t", " \x00 ", "â€™"]
+    return "".join(word + rng.choice(noise) for word in words)
+
+
+def build_index(vectors: int, seed: int = 0):
+    """LocalVectorDatabase filled with random vectors and retriever metadata."""
+    from db.local_db import LocalVectorDatabase
+    from models.records import ChunkRecord
+
+    rng = np.random.default_rng(seed)
+    db = LocalVectorDatabase(dimension=EMBEDDING_DIMENSION, initial_capacity=vectors)
+    embeddings = rng.standard_normal((vectors, EMBEDDING_DIMENSION)).astype(np.float32)
+    db.upsert_chunks([
+        ChunkRecord(
+            id=f"chunk-{i}",
+            document_id=f"doc-{i // 100}",
+            content=f"content of chunk {i}",
+            metadata={"document_id": f"doc-{i // 100}", "filename": f"doc-{i // 100}.pdf",
+                      "chunk_index": i % 100, "content": f"content of chunk {i}"},
+            embedding=embeddings[i].tolist()
+        )
+        for i in range(vectors)
+    ])
+    return db
+
+
+def run_case(func: Callable[[], Any], work: float, repeat: int) -> Dict[str, float]:
+    """Best-of-repeat throughput (work units/s) and peak traced MB of one run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"throughput": work / best, "seconds": best, "peak_mb": peak / (1024 * 1024)}
+
+
+def collect_cases(sizes: List[float], index_sizes: List[int], queries: int) -> Dict[str, tuple]:
+    """name -> (function, work units, unit)."""
+    cases = {}
+    for size_mb in sizes:
+        raw = noisy_text(size_mb)
+        text = clean_text(raw)
+        mb = len(raw) / (1024 * 1024)
+        pages = [text[i:i + 3000] for i in range(0, len(text), 3000)]
+        cases[f"clean_text@{size_mb}MB"] = (lambda raw=raw: clean_text(raw), mb, "MB/s")
+        cases[f"chunk_text@{size_mb}MB"] = (lambda text=text: chunk_text(text, 500, 100), mb, "MB/s")
+        cases[f"chunk_document@{size_mb}MB"] = (lambda pages=pages: chunk_document(pages, 500, 100), mb, "MB/s")
+
+        service = stub_embedding_service()
+        chunks = chunk_text(text, 500, 100)
+        cases[f"embed_encode@{size_mb}MB"] = (lambda chunks=chunks: service.encode(chunks), len(chunks), "chunks/s")
+
+        # Ingest bookkeeping per chunk: one vector record with metadata and embedding
+        from api.upload import build_vector
+        document = chunk_document(pages, 500, 100)
+        embeddings = service.encode([chunk["content"] for chunk in document])
+
+        def build_vectors(document=document, embeddings=embeddings):
+            return [
+                build_vector("doc", "doc.pdf", f"chunk-{i}", chunk, embedding)
+                for i, (chunk, embedding) in enumerate(zip(document, embeddings))
+            ]
+
+        cases[f"build_vectors@{size_mb}MB"] = (build_vectors, len(document), "chunks/s")
+
+    from services.retriever import RetrieverService
+    rng = np.random.default_rng(1)
+    for vectors in index_sizes:
+        retriever = RetrieverService(build_index(vectors))
+        query_vectors = rng.standard_normal((queries, EMBEDDING_DIMENSION)).astype(np.float32).tolist()
+
+        def retrieve_all(retriever=retriever, query_vectors=query_vectors, top_k=5):
+            for vector in query_vectors:
+                retriever.retrieve(vector, top_k=top_k, similarity_threshold=0.0)
+
+        cases[f"retrieve@{vectors}"] = (retrieve_all, queries, "queries/s")
+        # 50 candidates per query: per-candidate record overhead dominates
+        cases[f"retrieve_k25@{vectors}"] = (partial(retrieve_all, top_k=25), queries, "queries/s")
+    return cases
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Return a description of each case that regressed against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {result['throughput']:.1f} < baseline {base['throughput']:.1f}")
+        if result["peak_mb"] > max(base["peak_mb"] * (1 + threshold), MEMORY_FLOOR_MB):
+            regressions.append(f"{name}: peak {result['peak_mb']:.1f} MB > baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.25, 1, 4],
+                        help="Corpus sizes in MB")
+    parser.add_argument("--index-sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="Vector counts for the retriever benchmark")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default="", help="Run only cases whose name contains this")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed fractional slowdown / memory growth")
+    args = parser.parse_args()
+
+    cases = collect_cases(args.sizes, args.index_sizes, args.queries)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+
+    results = {}
+    print(f"{'case':<28} {'throughput':>14} {'unit':>10} {'peak MB':>9} {'vs base':>8}")
+    for name, (func, work, unit) in cases.items():
+        if args.only not in name:
+            continue
+        result = run_case(func, work, args.repeat)
+        result["unit"] = unit
+        results[name] = result
+        ratio = f"{result['throughput'] / baseline[name]['throughput']:.2f}x" if name in baseline else "-"
+        print(f"{name:<28} {result['throughput']:>14.1f} {unit:>10} {result['peak_mb']:>9.1f} {ratio:>8}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2, sort_keys=True))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,659 @@
+"""
+Local in-process vector database (NumPy).
+
+Same interface as PineconeDatabase, for offline development, benchmarks
+and tests. Vectors are L2-normalized on insert so a query is one
+matrix-vector product (cosine similarity, like the Pinecone index).
+
+An index can be snapshotted to disk and restored by a new process without
+re-embedding anything. A snapshot directory holds one subdirectory per
+snapshot plus a CURRENT file naming the latest complete one:
+
+    CURRENT
+    snapshot-<timestamp>/
+        manifest.json   format version, dimension, count, encoding, sha256 of each file
+        vectors.npy     stored vectors: float32 or float16 [count, dimension],
+                        normalized, or uint8 PQ codes [count, subvectors]
+        codebooks.npy   PQ only: float32 [subvectors, centroids, dimension / subvectors]
+        full.npy        float32 [count, dimension], only kept for a reranked compressed index
+        ids.json        vector ids, row order
+        chunks.jsonl    metadata (with chunk text) per row
+        offsets.npy     int64 [count + 1] byte offsets into chunks.jsonl
+
+Restoring memory-maps vectors.npy and full.npy (copy-on-write) and
+chunks.jsonl and decodes a row's metadata only when it is first returned
+or filtered on. Workers restoring the same snapshot share its pages
+through the OS page cache.
+
+Vectors can be stored compressed, at 384 dimensions:
+
+    float32   1536 bytes per vector, exact
+    float16    768 bytes per vector, scores within ~1e-3; NumPy has no
+                half-precision BLAS, so scoring converts blocks to float32
+                and is several times slower than float32
+    pq          48 bytes per vector (48 subvectors of 8 dims, 256 centroids
+                each), scored by asymmetric distance computation (ADC):
+                the full-precision query against the code centroids, one
+                table lookup per code byte
+
+With rerank, a compressed index also keeps the float32 vectors and
+re-scores its best rerank_factor * top_k candidates exactly. Only those
+rows are read, so after a restore the full vectors stay on disk
+(memory-mapped) and cost page cache for the rows touched, not RAM.
+See benchmarks/bench_vector_encoding.py for memory, latency and recall.
+A PQ index stores float32 until pq_train_size vectors have arrived, then
+trains its codebooks on them (k-means per subvector) and switches to codes.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+from models.records import ChunkRecord
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "rag-local-index"
+# v2: vector encodings (codebooks.npy, full.npy)
+SNAPSHOT_FORMAT_VERSION = 2
+
+ENCODINGS = ("float32", "float16", "pq")
+
+# Rows scored per block when decoding compressed vectors, to bound temporaries
+SCORE_BLOCK_ROWS = 8192
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the Pinecone metadata filter subset used here ($eq/$ne/$in/$nin/$and/$or)."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        # A list value matches when any of its elements does, as in Pinecone
+        values = value if isinstance(value, list) else [value]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq" and operand not in values:
+                return False
+            if op == "$ne" and operand in values:
+                return False
+            if op == "$in" and not any(v in operand for v in values):
+                return False
+            if op == "$nin" and any(v in operand for v in values):
+                return False
+    return True
+
+
+def _record_bytes(metadata: Any) -> int:
+    """Approximate memory of a decoded metadata row; rows still in the chunk store count there."""
+    if isinstance(metadata, dict):
+        # Text plus a rough per-record overhead for the dict and its keys
+        return len(metadata.get("content", "")) + 400
+    return 0
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def train_codebooks(vectors: np.ndarray, subvectors: int, centroids: int = 256,
+                    iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Train product quantization codebooks with k-means on each subvector.
+
+    Args:
+        vectors: float32 [n, dimension] training vectors.
+        subvectors: Number of subvectors; must divide the dimension.
+        centroids: Centroids per subvector (at most 256, codes are uint8).
+        iterations: k-means iterations.
+        seed: Random seed for the initial centroids.
+
+    Returns:
+        float32 [subvectors, centroids, dimension / subvectors]; fewer
+        centroids if there are fewer training vectors.
+    """
+    count, dimension = vectors.shape
+    if dimension % subvectors:
+        raise ValueError(f"{subvectors} subvectors do not divide dimension {dimension}")
+    step = dimension // subvectors
+    centroids = min(centroids, 256, count)
+    rng = np.random.default_rng(seed)
+    codebooks = np.empty((subvectors, centroids, step), dtype=np.float32)
+    for j in range(subvectors):
+        part = np.ascontiguousarray(vectors[:, j * step:(j + 1) * step], dtype=np.float32)
+        center = part[rng.choice(count, centroids, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = _nearest(part, center)
+            sums = np.zeros_like(center)
+            np.add.at(sums, assignment, part)
+            counts = np.bincount(assignment, minlength=centroids)
+            filled = counts > 0
+            center[filled] = sums[filled] / counts[filled, None]
+            # Empty clusters restart at random points
+            if not filled.all():
+                center[~filled] = part[rng.choice(count, int((~filled).sum()))]
+        codebooks[j] = center
+    return codebooks
+
+
+def _nearest(part: np.ndarray, center: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid of each row (squared L2)."""
+    distances = (center * center).sum(axis=1)[None, :] - 2.0 * part @ center.T
+    return distances.argmin(axis=1)
+
+
+def pq_encode(vectors: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """uint8 PQ codes [n, subvectors] of float32 vectors."""
+    subvectors, _, step = codebooks.shape
+    codes = np.empty((len(vectors), subvectors), dtype=np.uint8)
+    for j in range(subvectors):
+        codes[:, j] = _nearest(vectors[:, j * step:(j + 1) * step], codebooks[j])
+    return codes
+
+
+def pq_decode(codes: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Approximate float32 vectors [n, dimension] from PQ codes."""
+    subvectors = codebooks.shape[0]
+    return np.concatenate([codebooks[j][codes[:, j]] for j in range(subvectors)], axis=1)
+
+
+class _ChunkStore:
+    """Read-only, memory-mapped chunks.jsonl of a restored snapshot."""
+
+    def __init__(self, path: Path, offsets: np.ndarray):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets = offsets
+
+    def raw(self, index: int) -> bytes:
+        # Each record ends with a newline, which is not part of the JSON
+        return self._data[int(self._offsets[index]):int(self._offsets[index + 1]) - 1]
+
+    def load(self, index: int) -> Dict[str, Any]:
+        return json.loads(self.raw(index))
+
+
+class LocalVectorDatabase:
+    """
+    Vectors in a growable matrix (in their storage encoding), metadata in a
+    parallel list.
+
+    Deleting swaps the last row into the freed slot, so rows stay dense and
+    a query never scans dead vectors. After a restore, a metadata entry may
+    still be an int: the record number in the snapshot's chunk store,
+    decoded on first use.
+    """
+
+    def __init__(self, dimension: int = 384, initial_capacity: int = 1024, encoding: str = "float32",
+                 rerank: bool = False, rerank_factor: int = 10, pq_subvectors: int = 48,
+                 pq_train_size: int = 4096):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimension: Embedding dimension.
+            initial_capacity: Rows allocated up front.
+            encoding: Vector storage: "float32", "float16" or "pq".
+            rerank: Keep float32 vectors and re-score the final candidates
+                of a compressed index exactly.
+            rerank_factor: Candidates re-scored per result.
+            pq_subvectors: PQ code bytes per vector; must divide dimension.
+            pq_train_size: Vectors collected before PQ codebooks are trained.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown vector encoding {encoding!r}, expected one of {ENCODINGS}")
+        self.dimension = dimension
+        self.encoding = encoding
+        self.rerank = rerank and encoding != "float32"
+        self.rerank_factor = rerank_factor
+        self.pq_subvectors = pq_subvectors
+        self.pq_train_size = pq_train_size
+        self._codebooks: Optional[np.ndarray] = None
+        self._vectors = np.zeros((initial_capacity, *self._row_shape()), dtype=self._storage_dtype())
+        self._full: Optional[np.ndarray] = (
+            np.zeros((initial_capacity, dimension), dtype=np.float32) if self.rerank else None
+        )
+        self._ids: List[str] = []
+        self._metadata: List[Any] = []
+        # Sum of _record_bytes over _metadata, kept up to date so memory_bytes() is O(1)
+        self._metadata_bytes = 0
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._chunk_store: Optional[_ChunkStore] = None
+        # Bumped on every write; background snapshots skip unchanged indexes
+        self._generation = 0
+        self._snapshot_generation = 0
+        self._snapshot_executor: Optional[ThreadPoolExecutor] = None
+        # Held from copying the state to publishing CURRENT, so snapshots publish in order
+        self._snapshot_lock = threading.Lock()
+        # (directory, manifest) of the last snapshot written
+        self._published: Optional[Tuple[Path, Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def storage_encoding(self) -> str:
+        """Encoding of the stored rows: a PQ index stores float32 until it is trained."""
+        if self.encoding == "pq" and self._codebooks is None:
+            return "float32"
+        return self.encoding
+
+    def _storage_dtype(self):
+        return {"float32": np.float32, "float16": np.float16, "pq": np.uint8}[self.storage_encoding]
+
+    def _row_shape(self) -> tuple:
+        return (self.pq_subvectors,) if self.storage_encoding == "pq" else (self.dimension,)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Normalized float32 vectors in the storage encoding."""
+        if self.storage_encoding == "pq":
+            return pq_encode(vectors, self._codebooks)
+        return vectors.astype(self._storage_dtype(), copy=False)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        """Stored rows back to (approximate) float32 vectors."""
+        if self.storage_encoding == "pq":
+            return pq_decode(rows, self._codebooks)
+        return rows.astype(np.float32)
+
+    def train(self, sample: Optional[np.ndarray] = None):
+        """
+        Train the PQ codebooks and re-encode every stored vector.
+
+        Called automatically once pq_train_size vectors are stored; call
+        it directly to train on a chosen sample (or on fewer vectors).
+
+        Args:
+            sample: float32 [n, dimension] training vectors; defaults to
+                (up to pq_train_size of) the stored vectors.
+        """
+        if self.encoding != "pq":
+            return
+        with self._lock:
+            start = time.time()
+            count = len(self._ids)
+            current = self._decode(self._vectors[:count])
+            if sample is None:
+                rows = np.random.default_rng(0).permutation(count)[:self.pq_train_size]
+                sample = current[np.sort(rows)]
+            self._codebooks = train_codebooks(self._normalize(np.asarray(sample, dtype=np.float32)),
+                                              self.pq_subvectors)
+            codes = np.zeros((max(len(self._vectors), count), self.pq_subvectors), dtype=np.uint8)
+            codes[:count] = pq_encode(current, self._codebooks)
+            self._vectors = codes
+            self._generation += 1
+            logger.info(f"Trained PQ codebooks on {len(sample)} vectors in {time.time() - start:.2f}s")
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the index changed since its last snapshot (or restore)."""
+        return self._generation != self._snapshot_generation
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held: vector storage plus chunk text and metadata."""
+        with self._lock:
+            total = self._vectors.nbytes
+            if self._full is not None:
+                total += self._full.nbytes
+            if self._codebooks is not None:
+                total += self._codebooks.nbytes
+            if self._chunk_store is not None:
+                total += len(self._chunk_store._data)
+            return total + self._metadata_bytes
+
+    def _meta(self, row: int) -> Dict[str, Any]:
+        """Metadata of a row, decoding it from the chunk store on first use."""
+        metadata = self._metadata[row]
+        if isinstance(metadata, int):
+            metadata = self._chunk_store.load(metadata)
+            self._metadata[row] = metadata
+            self._metadata_bytes += _record_bytes(metadata)
+        return metadata
+
+    def _ensure_capacity(self, rows: int):
+        if rows > len(self._vectors):
+            capacity = max(rows, 2 * len(self._vectors))
+            grown = np.zeros((capacity, *self._row_shape()), dtype=self._storage_dtype())
+            grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+            self._vectors = grown
+        if self._full is not None and rows > len(self._full):
+            grown = np.zeros((max(rows, 2 * len(self._full)), self.dimension), dtype=np.float32)
+            grown[:len(self._ids)] = self._full[:len(self._ids)]
+            self._full = grown
+
+    def upsert_chunks(self, chunks: List[ChunkRecord], batch_size: int = 100):
+        if not chunks:
+            return
+        vectors = self._normalize(np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32))
+        with self._lock:
+            self._ensure_capacity(len(self._ids) + len(chunks))
+            encoded = self._encode(vectors)
+            for chunk, vector, stored in zip(chunks, vectors, encoded):
+                row = self._rows.get(chunk.id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[chunk.id] = row
+                    self._ids.append(chunk.id)
+                    self._metadata.append(dict(chunk.metadata))
+                else:
+                    self._metadata_bytes -= _record_bytes(self._metadata[row])
+                    self._metadata[row] = dict(chunk.metadata)
+                self._metadata_bytes += _record_bytes(self._metadata[row])
+                self._vectors[row] = stored
+                if self._full is not None:
+                    self._full[row] = vector
+            self._generation += 1
+            if self.storage_encoding != self.encoding and len(self._ids) >= self.pq_train_size:
+                self.train()
+
+    def delete_vectors(self, ids: List[str], batch_size: int = 1000):
+        with self._lock:
+            for id in ids:
+                row = self._rows.pop(id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                self._metadata_bytes -= _record_bytes(self._metadata[row])
+                if row != last:
+                    self._vectors[row] = self._vectors[last]
+                    if self._full is not None:
+                        self._full[row] = self._full[last]
+                    self._ids[row] = self._ids[last]
+                    self._metadata[row] = self._metadata[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._metadata.pop()
+            self._generation += 1
+
+    def delete_all(self):
+        with self._lock:
+            self._ids.clear()
+            self._metadata.clear()
+            self._metadata_bytes = 0
+            self._rows.clear()
+            self._generation += 1
+
+    def update_metadata(self, id: str, metadata: Dict[str, Any]):
+        self.update_metadata_many({id: metadata})
+
+    def update_metadata_many(self, updates: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for id, metadata in updates.items():
+                row = self._rows.get(id)
+                if row is not None:
+                    # Replaced, not updated in place: a snapshot being written may hold the old dict
+                    old = self._meta(row)
+                    self._metadata[row] = {**old, **metadata}
+                    self._metadata_bytes += _record_bytes(self._metadata[row]) - _record_bytes(old)
+            self._generation += 1
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {id: {"id", "values", "metadata"}} for the ids that exist (values approximate if compressed)."""
+        with self._lock:
+            rows = [self._rows[id] for id in ids if id in self._rows]
+            if self._full is not None:
+                values = np.asarray(self._full[rows], dtype=np.float32)
+            else:
+                values = self._decode(np.asarray(self._vectors[rows]))
+            return {
+                self._ids[row]: {"id": self._ids[row], "values": vector.tolist(), "metadata": dict(self._meta(row))}
+                for row, vector in zip(rows, values)
+            }
+
+    def _scores(self, query: np.ndarray, count: int) -> np.ndarray:
+        """Similarity of the query to every stored row (caller holds the lock)."""
+        encoding = self.storage_encoding
+        if encoding == "float32":
+            return self._vectors[:count] @ query
+        if encoding == "pq":
+            # ADC: one table of query-subvector x centroid products, then a lookup per code
+            subvectors, _, step = self._codebooks.shape
+            table = np.einsum("mcs,ms->mc", self._codebooks, query.reshape(subvectors, step))
+        scores = np.zeros(count, dtype=np.float32)
+        for start in range(0, count, SCORE_BLOCK_ROWS):
+            block = self._vectors[start:min(start + SCORE_BLOCK_ROWS, count)]
+            if encoding == "pq":
+                out = scores[start:start + len(block)]
+                for j in range(subvectors):
+                    out += table[j].take(block[:, j])
+            else:
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def query(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+    ):
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or top_k <= 0:
+                return []
+            scores = self._scores(query, count)
+            if filter:
+                mask = np.fromiter(
+                    (matches_filter(self._meta(row), filter) for row in range(count)),
+                    dtype=bool, count=count
+                )
+                scores = np.where(mask, scores, -np.inf)
+
+            k = min(top_k, count)
+            if self._full is not None:
+                # Re-score the best compressed candidates at full precision
+                candidates = min(k * self.rerank_factor, count)
+                top = np.argpartition(-scores, candidates - 1)[:candidates]
+                top = top[scores[top] != -np.inf]
+                scores = np.full(count, -np.inf, dtype=np.float32)
+                scores[top] = np.asarray(self._full[top], dtype=np.float32) @ query
+                k = min(k, len(top)) or 1
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                {"id": self._ids[row], "score": float(scores[row]), "metadata": dict(self._meta(row))}
+                for row in top if scores[row] != -np.inf
+            ]
+
+    # -------------------------------------------------
+    # Snapshot / restore
+    # -------------------------------------------------
+    def snapshot(self, directory: str, keep: int = 2) -> Dict[str, Any]:
+        """
+        Write a snapshot and make it the CURRENT one.
+
+        The index is locked only while its state is copied; files are
+        written afterwards, so queries and writes continue meanwhile.
+        Snapshots run one at a time, so a later one is always published
+        last; if the index has not changed since the last snapshot to this
+        directory, nothing is written.
+
+        Args:
+            directory: Snapshot directory (created if missing).
+            keep: Number of most recent snapshots to keep.
+
+        Returns:
+            The snapshot manifest (the published one if nothing changed).
+        """
+        directory = Path(directory).resolve()
+        with self._snapshot_lock:
+            with self._lock:
+                generation = self._generation
+                published = self._published
+                if published and published[0] == directory and generation == self._snapshot_generation:
+                    return published[1]
+                state = self._snapshot_state()
+            manifest = self._write_snapshot(directory, *state, generation, keep)
+            self._published = (directory, manifest)
+            return manifest
+
+    def _snapshot_state(self) -> Tuple[Dict[str, np.ndarray], str, List[str], List[Any], Optional[_ChunkStore]]:
+        """Copy what a snapshot writes (caller holds the lock)."""
+        count = len(self._ids)
+        arrays = {"vectors.npy": np.array(self._vectors[:count])}
+        if self._codebooks is not None:
+            arrays["codebooks.npy"] = self._codebooks
+        if self._full is not None:
+            arrays["full.npy"] = np.array(self._full[:count])
+        # Shallow copy is enough: metadata dicts are replaced, never mutated
+        return arrays, self.storage_encoding, list(self._ids), list(self._metadata), self._chunk_store
+
+    def snapshot_async(self, directory: str, keep: int = 2) -> Future:
+        """Take a snapshot on a background thread; snapshots never overlap."""
+        if self._snapshot_executor is None:
+            self._snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-snapshot")
+        return self._snapshot_executor.submit(self.snapshot, directory, keep)
+
+    def start_snapshots(self, directory: str, interval: float, keep: int = 2):
+        """Snapshot in the background every `interval` seconds while the index changes."""
+        def run():
+            while True:
+                time.sleep(interval)
+                if self.dirty:
+                    try:
+                        self.snapshot(directory, keep)
+                    except Exception as e:
+                        logger.error(f"Index snapshot failed: {e}")
+
+        threading.Thread(target=run, name="index-snapshots", daemon=True).start()
+
+    def _write_snapshot(self, directory: Path, arrays: Dict[str, np.ndarray], encoding: str, ids: List[str],
+                        metadata: List[Any], chunk_store: Optional[_ChunkStore], generation: int,
+                        keep: int) -> Dict[str, Any]:
+        start = time.time()
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"snapshot-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}"
+        tmp = directory / f".{name}.tmp"
+        tmp.mkdir()
+
+        for file, array in arrays.items():
+            np.save(tmp / file, array)
+        (tmp / "ids.json").write_text(json.dumps(ids))
+        offsets = np.zeros(len(metadata) + 1, dtype=np.int64)
+        with open(tmp / "chunks.jsonl", "wb") as f:
+            position = 0
+            for row, entry in enumerate(metadata):
+                # Rows never decoded since the last restore are copied as raw bytes
+                record = chunk_store.raw(entry) if isinstance(entry, int) else json.dumps(entry).encode()
+                f.write(record + b"\n")
+                position += len(record) + 1
+                offsets[row + 1] = position
+        np.save(tmp / "offsets.npy", offsets)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "created_at": time.time(),
+            "index_type": "pq" if encoding == "pq" else "flat",
+            "encoding": encoding,
+            "options": self._options(),
+            "dimension": self.dimension,
+            "count": len(ids),
+            "files": {
+                file: {"sha256": _sha256(tmp / file), "bytes": (tmp / file).stat().st_size}
+                for file in (*arrays, "ids.json", "chunks.jsonl", "offsets.npy")
+            },
+        }
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        os.rename(tmp, directory / name)
+
+        # Publish atomically: a reader sees the old or the new CURRENT, never a partial one
+        current_tmp = directory / f".CURRENT.{name}.tmp"
+        current_tmp.write_text(name)
+        os.replace(current_tmp, directory / "CURRENT")
+        self._snapshot_generation = generation
+
+        snapshots = sorted(path for path in directory.glob("snapshot-*") if path.is_dir())
+        for old in snapshots[:-keep] if keep > 0 else []:
+            shutil.rmtree(old, ignore_errors=True)
+
+        logger.info(f"Snapshot {name}: {len(ids)} vectors in {time.time() - start:.3f}s")
+        return manifest
+
+    def _options(self) -> Dict[str, Any]:
+        """Constructor options a restore needs to rebuild this index."""
+        return {"encoding": self.encoding, "rerank": self.rerank, "rerank_factor": self.rerank_factor,
+                "pq_subvectors": self.pq_subvectors, "pq_train_size": self.pq_train_size}
+
+    @classmethod
+    def restore(cls, directory: str, verify: bool = True) -> "LocalVectorDatabase":
+        """
+        Load the CURRENT snapshot of a directory.
+
+        Args:
+            directory: Snapshot directory written by snapshot().
+            verify: Check every file against its manifest checksum.
+
+        Returns:
+            A LocalVectorDatabase serving the snapshot's vectors.
+
+        Raises:
+            FileNotFoundError: If the directory has no snapshot.
+            ValueError: If the snapshot format is unknown or a checksum does not match.
+        """
+        start = time.time()
+        directory = Path(directory)
+        path = directory / (directory / "CURRENT").read_text().strip()
+        manifest = json.loads((path / "manifest.json").read_text())
+
+        if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("format_version", 0) > SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format in {path}: "
+                             f"{manifest.get('format')} v{manifest.get('format_version')}")
+        if verify:
+            for file, expected in manifest["files"].items():
+                if _sha256(path / file) != expected["sha256"]:
+                    raise ValueError(f"Checksum mismatch for {path / file}")
+
+        count = manifest["count"]
+        db = cls(dimension=manifest["dimension"], initial_capacity=0, **manifest.get("options", {}))
+        if "codebooks.npy" in manifest["files"]:
+            db._codebooks = np.load(path / "codebooks.npy")
+            db._vectors = np.zeros((0, *db._row_shape()), dtype=db._storage_dtype())
+        if count:
+            # Copy-on-write: the files are never modified, writes stay private to this process
+            db._vectors = np.load(path / "vectors.npy", mmap_mode="c")
+            if db._full is not None:
+                db._full = np.load(path / "full.npy", mmap_mode="c")
+        db._ids = json.loads((path / "ids.json").read_text())
+        db._rows = {id: row for row, id in enumerate(db._ids)}
+        db._chunk_store = _ChunkStore(path / "chunks.jsonl", np.load(path / "offsets.npy"))
+        db._metadata = list(range(count))
+
+        if len(db._ids) != count or db._vectors.shape[0] < count:
+            raise ValueError(f"Snapshot {path} is inconsistent with its manifest")
+
+        logger.info(f"Restored {count} vectors from {path} in {time.time() - start:.3f}s")
+        return db
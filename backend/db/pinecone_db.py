@@ -5,15 +5,22 @@ Pinecone database service.
 import os
 from typing import List, Optional, Dict, Any
 from pinecone import Pinecone
-from models.schemas import DocumentChunk
+from models.records import ChunkRecord
 
 
 class PineconeDatabase:
-    def __init__(self):
+    def __init__(self, namespace: Optional[str] = None):
+        # Separate namespaces keep e.g. summary vectors out of chunk queries
+        self.namespace = namespace
         self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        self.index = self.pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+        # PINECONE_HOST skips the control-plane lookup (and allows a local stand-in)
+        host = os.getenv("PINECONE_HOST")
+        if host:
+            self.index = self.pc.Index(os.getenv("PINECONE_INDEX_NAME"), host=host)
+        else:
+            self.index = self.pc.Index(os.getenv("PINECONE_INDEX_NAME"))
 
-    def upsert_chunks(self, chunks: List[DocumentChunk]):
+    def upsert_chunks(self, chunks: List[ChunkRecord], batch_size: int = 100):
         vectors = [
             {
                 "id": chunk.id,
@@ -22,7 +29,37 @@ class PineconeDatabase:
             }
             for chunk in chunks
         ]
-        self.index.upsert(vectors=vectors)
+        # Pinecone caps request size; send large ingests in batches
+        for start in range(0, len(vectors), batch_size):
+            self.index.upsert(vectors=vectors[start:start + batch_size], namespace=self.namespace)
+
+    def delete_vectors(self, ids: List[str], batch_size: int = 1000):
+        for start in range(0, len(ids), batch_size):
+            self.index.delete(ids=ids[start:start + batch_size], namespace=self.namespace)
+
+    def delete_all(self):
+        self.index.delete(delete_all=True, namespace=self.namespace)
+
+    def update_metadata(self, id: str, metadata: Dict[str, Any]):
+        self.index.update(id=id, set_metadata=metadata, namespace=self.namespace)
+
+    def update_metadata_many(self, updates: Dict[str, Dict[str, Any]], batch_size: int = 100):
+        """Merge metadata into many vectors: a fetch and an upsert per batch instead of an update per id."""
+        ids = list(updates)
+        for start in range(0, len(ids), batch_size):
+            records = self.fetch(ids[start:start + batch_size])
+            self.index.upsert(vectors=[
+                {"id": id, "values": record["values"], "metadata": {**record["metadata"], **updates[id]}}
+                for id, record in records.items()
+            ], namespace=self.namespace)
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {id: {"id", "values", "metadata"}} for the ids that exist."""
+        response = self.index.fetch(ids=ids, namespace=self.namespace)
+        return {
+            id: {"id": id, "values": vector["values"], "metadata": vector.get("metadata") or {}}
+            for id, vector in response["vectors"].items()
+        }
 
     def query(
         self,
@@ -35,5 +72,6 @@ class PineconeDatabase:
             top_k=top_k,
             include_metadata=True,
             filter=filter,
+            namespace=self.namespace,
         )
         return response["matches"]
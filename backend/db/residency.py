@@ -0,0 +1,424 @@
+"""
+Per-tenant local vector indexes with LRU residency under a byte budget.
+
+Each tenant (a document, or a session's documents) gets its own
+LocalVectorDatabase, persisted as a snapshot directory under the root.
+Recently used indexes stay in memory while their total size fits the
+budget; the least recently used ones are written back and dropped, and
+are restored (memory-mapped, see db/local_db.py) on their next use.
+
+ResidentVectorDatabase puts this behind the PineconeDatabase interface:
+vectors are partitioned by the documents in metadata["document_ids"] (or
+metadata["document_id"]); a deduplicated chunk shared by several documents
+is stored in each of their indexes. A query filtered on document_id(s)
+only touches those tenants. Unfiltered queries fan out to every tenant,
+loading the cold ones, and are refused (UnscopedQueryError) once all of
+them would not fit in the budget, rather than cycling the whole LRU.
+
+One manager (and budget) can serve several namespaces: a namespace's
+tenants are kept under "<namespace>:<tenant>" keys.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Iterator, Set
+
+from db.local_db import LocalVectorDatabase
+from db.vector_db import UnscopedQueryError
+from models.records import ChunkRecord
+from utils.metrics import INDEX_LOAD_SECONDS, record_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "_default"
+
+
+class _Resident:
+    __slots__ = ("db", "bytes", "pins")
+
+    def __init__(self, db: LocalVectorDatabase):
+        self.db = db
+        self.bytes = db.memory_bytes()
+        self.pins = 0
+
+
+class IndexResidencyManager:
+    """
+    Keeps hot per-tenant indexes in memory and evicts cold ones LRU.
+
+    An index in use is pinned and never evicted, so the budget can be
+    exceeded briefly while more tenants than fit are being queried.
+    """
+
+    def __init__(self, root: str, budget_bytes: int, dimension: int = 384, keep_snapshots: int = 1,
+                 index_options: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the manager.
+
+        Args:
+            root: Directory holding one snapshot directory per tenant.
+            budget_bytes: Memory allowed for resident indexes.
+            dimension: Embedding dimension of new indexes.
+            keep_snapshots: Snapshots kept per tenant on write-back.
+            index_options: LocalVectorDatabase arguments for new indexes
+                (e.g. encoding); overrides dimension.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = budget_bytes
+        self.index_options = {"dimension": dimension, **(index_options or {})}
+        self.dimension = self.index_options["dimension"]
+        self.keep_snapshots = keep_snapshots
+        self._resident: "OrderedDict[str, _Resident]" = OrderedDict()
+        # Evicted but still being written back; reused instead of reloaded
+        self._evicting: Dict[str, LocalVectorDatabase] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._known = {
+            (path / "TENANT").read_text() for path in self.root.iterdir() if (path / "TENANT").exists()
+        }
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_seconds: deque = deque(maxlen=1000)
+
+    def tenant_dir(self, tenant: str) -> Path:
+        # Ids are usually safe already; anything else is hashed into a safe name
+        if re.fullmatch(r"[A-Za-z0-9_-]{1,100}", tenant):
+            return self.root / tenant
+        return self.root / hashlib.sha256(tenant.encode()).hexdigest()
+
+    def tenants(self) -> List[str]:
+        """Every tenant with an index, resident or on disk."""
+        with self._lock:
+            return sorted(self._known)
+
+    @contextmanager
+    def index(self, tenant: str, create: bool = False) -> Iterator[Optional[LocalVectorDatabase]]:
+        """
+        Use a tenant's index, loading it if it is not resident.
+
+        Args:
+            tenant: Tenant key.
+            create: Create an empty index if the tenant has none.
+
+        Yields:
+            The index, or None if the tenant has none and create is False.
+        """
+        entry = self._acquire(tenant, create)
+        if entry is None:
+            yield None
+            return
+        try:
+            yield entry.db
+        finally:
+            # Writes change the size; re-measure (O(1), outside the manager lock) and rebalance
+            size = entry.db.memory_bytes()
+            with self._lock:
+                entry.pins -= 1
+                entry.bytes = size
+                victims = self._select_victims()
+            self._write_back(victims)
+
+    def _acquire(self, tenant: str, create: bool) -> Optional[_Resident]:
+        with self._lock:
+            entry = self._hit(tenant)
+            if entry:
+                return entry
+            loading = self._loading.setdefault(tenant, threading.Lock())
+
+        with loading:
+            with self._lock:
+                # Someone else may have loaded it while we waited
+                entry = self._hit(tenant)
+                if entry:
+                    return entry
+                db = self._evicting.get(tenant)
+
+            start = time.perf_counter()
+            path = self.tenant_dir(tenant)
+            if db is None and (path / "CURRENT").exists():
+                db = LocalVectorDatabase.restore(str(path))
+            elif db is None and create:
+                path.mkdir(parents=True, exist_ok=True)
+                (path / "TENANT").write_text(tenant)
+                db = LocalVectorDatabase(**self.index_options)
+                with self._lock:
+                    self._known.add(tenant)
+            elif db is None:
+                return None
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.misses += 1
+                self._load_seconds.append(elapsed)
+                entry = _Resident(db)
+                entry.pins = 1
+                self._resident[tenant] = entry
+                victims = self._select_victims()
+        INDEX_LOAD_SECONDS.labels().observe(elapsed)
+        record_cache("tenant_index", 0, 1)
+        self._write_back(victims)
+        return entry
+
+    def _hit(self, tenant: str) -> Optional[_Resident]:
+        """Pin a resident index and count the hit (caller holds the lock)."""
+        entry = self._resident.get(tenant)
+        if entry is None:
+            return None
+        self._resident.move_to_end(tenant)
+        entry.pins += 1
+        self.hits += 1
+        record_cache("tenant_index", 1, 0)
+        return entry
+
+    def _select_victims(self) -> List[tuple]:
+        """Drop least recently used, unpinned indexes until within budget (caller holds the lock)."""
+        victims = []
+        total = sum(entry.bytes for entry in self._resident.values())
+        for tenant in list(self._resident):
+            if total <= self.budget_bytes:
+                break
+            entry = self._resident[tenant]
+            if entry.pins:
+                continue
+            del self._resident[tenant]
+            self._evicting[tenant] = entry.db
+            total -= entry.bytes
+            self.evictions += 1
+            victims.append((tenant, entry.db))
+        return victims
+
+    def _write_back(self, victims: List[tuple]):
+        """Snapshot evicted indexes that changed since they were loaded (outside the lock)."""
+        for tenant, db in victims:
+            try:
+                if db.dirty:
+                    db.snapshot(str(self.tenant_dir(tenant)), keep=self.keep_snapshots)
+            except Exception as e:
+                logger.error(f"Write-back of tenant index {tenant} failed: {e}")
+                # Keep it in memory rather than lose writes
+                with self._lock:
+                    self._evicting.pop(tenant, None)
+                    self._resident.setdefault(tenant, _Resident(db))
+                continue
+            with self._lock:
+                if self._evicting.get(tenant) is db:
+                    del self._evicting[tenant]
+
+    def flush(self):
+        """Snapshot every resident index that has unsaved writes."""
+        with self._lock:
+            resident = [(tenant, entry.db) for tenant, entry in self._resident.items()]
+        for tenant, db in resident:
+            if db.dirty:
+                db.snapshot(str(self.tenant_dir(tenant)), keep=self.keep_snapshots)
+
+    def fits(self, tenants: List[str]) -> bool:
+        """
+        Whether these tenants' indexes fit in the budget all at once.
+
+        Resident indexes count at their measured size, others at the size
+        of their latest snapshot on disk.
+        """
+        with self._lock:
+            sizes = {tenant: entry.bytes for tenant, entry in self._resident.items()}
+        total = 0
+        for tenant in tenants:
+            if tenant in sizes:
+                total += sizes[tenant]
+            else:
+                path = self.tenant_dir(tenant)
+                if (path / "CURRENT").exists():
+                    snapshot = path / (path / "CURRENT").read_text().strip()
+                    total += sum(file.stat().st_size for file in snapshot.iterdir() if file.is_file())
+            if total > self.budget_bytes:
+                return False
+        return True
+
+    def drop(self, tenant: str):
+        """Delete a tenant's index from memory and disk."""
+        with self._lock:
+            self._resident.pop(tenant, None)
+            self._evicting.pop(tenant, None)
+            self._known.discard(tenant)
+        shutil.rmtree(self.tenant_dir(tenant), ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, load latency and memory use of the resident indexes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            loads = sorted(self._load_seconds)
+            resident_bytes = sum(entry.bytes for entry in self._resident.values())
+            return {
+                "resident": len(self._resident),
+                "resident_bytes": resident_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "load_p50_ms": round(loads[len(loads) // 2] * 1000, 3) if loads else 0.0,
+                "load_p95_ms": round(loads[min(len(loads) - 1, int(len(loads) * 0.95))] * 1000, 3) if loads else 0.0,
+                "load_max_ms": round(loads[-1] * 1000, 3) if loads else 0.0,
+            }
+
+
+def _chunk_tenants(metadata: Dict[str, Any]) -> List[str]:
+    """Tenants holding a chunk: every document using it."""
+    return metadata.get("document_ids") or [metadata.get("document_id") or DEFAULT_TENANT]
+
+
+def _filter_tenants(filter: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+    """Tenants a query filter restricts document_id(s) to, or None for all."""
+    key = next((key for key in ("document_ids", "document_id") if key in (filter or {})), None)
+    if key is None:
+        return None
+    condition = filter[key]
+    if not isinstance(condition, dict):
+        return [condition]
+    if "$eq" in condition:
+        return [condition["$eq"]]
+    if "$in" in condition:
+        return list(condition["$in"])
+    return None
+
+
+class ResidentVectorDatabase:
+    """PineconeDatabase interface over per-document indexes (see module docstring)."""
+
+    def __init__(self, manager: IndexResidencyManager, namespace: Optional[str] = None):
+        self.manager = manager
+        self.namespace = namespace
+        self._prefix = f"{namespace}:" if namespace else ""
+        self._lock = threading.Lock()
+        # Vector id -> tenants holding it, for deletes and metadata updates by id
+        self._tenant_of: Dict[str, Set[str]] = {}
+        for tenant in self._tenants():
+            path = manager.tenant_dir(self._key(tenant))
+            if (path / "CURRENT").exists():
+                snapshot = path / (path / "CURRENT").read_text().strip()
+                for id in json.loads((snapshot / "ids.json").read_text()):
+                    self._tenant_of.setdefault(id, set()).add(tenant)
+
+    def _key(self, tenant: str) -> str:
+        """Manager key of one of this namespace's tenants."""
+        return self._prefix + tenant
+
+    def _tenants(self) -> List[str]:
+        """This namespace's tenants, resident or on disk."""
+        keys = self.manager.tenants()
+        if self._prefix:
+            return [key[len(self._prefix):] for key in keys if key.startswith(self._prefix)]
+        return [key for key in keys if ":" not in key]
+
+    def upsert_chunks(self, chunks: List[ChunkRecord], batch_size: int = 100):
+        by_tenant: Dict[str, List[ChunkRecord]] = {}
+        stale: Dict[str, List[str]] = {}
+        with self._lock:
+            for chunk in chunks:
+                tenants = _chunk_tenants(chunk.metadata)
+                for tenant in tenants:
+                    by_tenant.setdefault(tenant, []).append(chunk)
+                for tenant in self._tenant_of.get(chunk.id, set()) - set(tenants):
+                    stale.setdefault(tenant, []).append(chunk.id)
+        for tenant, tenant_chunks in by_tenant.items():
+            with self.manager.index(self._key(tenant), create=True) as db:
+                db.upsert_chunks(tenant_chunks, batch_size)
+            with self._lock:
+                for chunk in tenant_chunks:
+                    self._tenant_of.setdefault(chunk.id, set()).add(tenant)
+        self._delete_from(stale)
+
+    def _group_ids(self, ids: List[str]) -> Dict[str, List[str]]:
+        by_tenant: Dict[str, List[str]] = {}
+        with self._lock:
+            for id in ids:
+                for tenant in self._tenant_of.get(id, ()):
+                    by_tenant.setdefault(tenant, []).append(id)
+        return by_tenant
+
+    def _delete_from(self, by_tenant: Dict[str, List[str]], batch_size: int = 1000):
+        for tenant, tenant_ids in by_tenant.items():
+            with self.manager.index(self._key(tenant)) as db:
+                if db is not None:
+                    db.delete_vectors(tenant_ids, batch_size)
+            with self._lock:
+                for id in tenant_ids:
+                    tenants = self._tenant_of.get(id)
+                    if tenants is not None:
+                        tenants.discard(tenant)
+                        if not tenants:
+                            del self._tenant_of[id]
+
+    def delete_vectors(self, ids: List[str], batch_size: int = 1000):
+        self._delete_from(self._group_ids(ids), batch_size)
+
+    def delete_all(self):
+        for tenant in self._tenants():
+            self.manager.drop(self._key(tenant))
+        with self._lock:
+            self._tenant_of.clear()
+
+    def update_metadata(self, id: str, metadata: Dict[str, Any]):
+        self.update_metadata_many({id: metadata})
+
+    def update_metadata_many(self, updates: Dict[str, Dict[str, Any]]):
+        moved = [id for id, metadata in updates.items() if "document_ids" in metadata]
+        if moved:
+            # The chunks' documents changed: copy them into new ones, drop them from departed ones
+            chunks = []
+            for id, record in self.fetch(moved).items():
+                merged = {**record["metadata"], **updates[id]}
+                chunks.append(ChunkRecord(id, merged.get("document_id"), merged.get("content", ""),
+                                          merged, record["values"]))
+            self.upsert_chunks(chunks)
+        in_place = [id for id in updates if "document_ids" not in updates[id]]
+        for tenant, tenant_ids in self._group_ids(in_place).items():
+            with self.manager.index(self._key(tenant)) as db:
+                if db is not None:
+                    db.update_metadata_many({id: updates[id] for id in tenant_ids})
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for tenant, tenant_ids in self._group_ids(ids).items():
+            missing = [id for id in tenant_ids if id not in found]
+            if missing:
+                with self.manager.index(self._key(tenant)) as db:
+                    if db is not None:
+                        found.update(db.fetch(missing))
+        return found
+
+    def query(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+    ):
+        tenants = _filter_tenants(filter)
+        if tenants is None:
+            tenants = self._tenants()
+            if not self.manager.fits([self._key(tenant) for tenant in tenants]):
+                raise UnscopedQueryError(
+                    f"Searching all {len(tenants)} documents at once exceeds the index memory budget; "
+                    "filter the query to a document"
+                )
+        matches: Dict[str, Dict[str, Any]] = {}
+        for tenant in tenants:
+            with self.manager.index(self._key(tenant)) as db:
+                if db is not None:
+                    # A shared chunk is found once per tenant holding it
+                    for match in db.query(query_embedding, top_k, filter):
+                        matches.setdefault(match["id"], match)
+        return sorted(matches.values(), key=lambda match: match["score"], reverse=True)[:top_k]
+
+    def residency_stats(self) -> Dict[str, Any]:
+        return self.manager.stats()
@@ -0,0 +1,238 @@
+"""
+Shared application state store.
+
+Process-local globals give wrong answers once several workers serve the
+app, so mutable state (upload flag, dedup registry, conversation memory)
+goes through a StateStore. The in-memory store is the single-process
+default; the SQLite store is shared by every worker on the host.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Tuple
+
+_state_store = None
+
+
+class StateStore(ABC):
+    """Namespaced key/value store for JSON-serializable values."""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the stored values for the keys that exist."""
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    def set_many(self, namespace: str, values: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        ...
+
+    @abstractmethod
+    def delete_many(self, namespace: str, keys: Iterable[str]):
+        ...
+
+    @abstractmethod
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        ...
+
+    @abstractmethod
+    def clear(self, namespace: str):
+        ...
+
+    @abstractmethod
+    def transaction(self) -> ContextManager[None]:
+        """Group reads and writes so no other thread or worker interleaves."""
+        ...
+
+
+class MemoryStateStore(StateStore):
+    """Process-local store. Values are kept as-is; callers set() after mutating."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(namespace, {}).get(key, default)
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        with self._lock:
+            bucket = self._data.get(namespace, {})
+            return {key: bucket[key] for key in keys if key in bucket}
+
+    def set(self, namespace: str, key: str, value: Any):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+
+    def set_many(self, namespace: str, values: Dict[str, Any]):
+        with self._lock:
+            self._data.setdefault(namespace, {}).update(values)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def delete_many(self, namespace: str, keys: Iterable[str]):
+        with self._lock:
+            bucket = self._data.get(namespace, {})
+            for key in keys:
+                bucket.pop(key, None)
+
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        with self._lock:
+            return list(self._data.get(namespace, {}).items())
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._data.pop(namespace, None)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            yield
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Store backed by a local SQLite file in WAL mode, shared across processes.
+
+    Connections are per thread and per process, so a connection opened
+    before a fork is never reused by the forked worker.
+    """
+
+    # Keep IN (...) lists under SQLite's bound-parameter limit
+    _BATCH = 500
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.depth = 0
+        return self._local.conn
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(keys), self._BATCH):
+            batch = keys[start:start + self._BATCH]
+            rows = conn.execute(
+                f"SELECT key, value FROM state WHERE namespace = ? "
+                f"AND key IN ({','.join('?' * len(batch))})",
+                (namespace, *batch)
+            )
+            found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def set(self, namespace: str, key: str, value: Any):
+        self.set_many(namespace, {key: value})
+
+    def set_many(self, namespace: str, values: Dict[str, Any]):
+        with self.transaction():
+            self._connection().executemany(
+                "INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)",
+                [(namespace, key, json.dumps(value)) for key, value in values.items()]
+            )
+
+    def delete(self, namespace: str, key: str):
+        self.delete_many(namespace, [key])
+
+    def delete_many(self, namespace: str, keys: Iterable[str]):
+        with self.transaction():
+            self._connection().executemany(
+                "DELETE FROM state WHERE namespace = ? AND key = ?",
+                [(namespace, key) for key in keys]
+            )
+
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT key, value FROM state WHERE namespace = ?", (namespace,)
+        )
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def clear(self, namespace: str):
+        with self.transaction():
+            self._connection().execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        conn = self._connection()
+        if self._local.depth:
+            # Nested: already inside the outer transaction
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        # IMMEDIATE takes the write lock up front, so read-modify-write
+        # sequences from different workers cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+
+def get_state_store() -> StateStore:
+    """
+    Return the process-wide state store.
+
+    STATE_STORE=memory (default) keeps state in this process;
+    STATE_STORE=sqlite shares it through STATE_DB_PATH across workers.
+    """
+    global _state_store
+    if _state_store is None:
+        backend = os.getenv("STATE_STORE", "memory").lower()
+        if backend == "sqlite":
+            default_path = Path(__file__).resolve().parent.parent / "state.db"
+            _state_store = SQLiteStateStore(os.getenv("STATE_DB_PATH", str(default_path)))
+        elif backend == "memory":
+            _state_store = MemoryStateStore()
+        else:
+            raise ValueError(f"Unknown STATE_STORE backend: {backend}")
+    return _state_store
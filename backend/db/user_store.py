@@ -0,0 +1,92 @@
+"""
+Persistent user store for authentication.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+_user_store = None
+
+
+class UserStore:
+    """
+    Users in a local SQLite file.
+
+    Lookups by username go through the primary key and email uniqueness is
+    enforced by an index, so both stay O(log n) as the table grows.
+    Connections are per thread and per process, like SQLiteStateStore.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " username TEXT PRIMARY KEY,"
+            " email TEXT NOT NULL,"
+            " hashed_password TEXT NOT NULL,"
+            " disabled INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email)")
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """Return a user record, or None if the username is unknown."""
+        row = self._connection().execute(
+            "SELECT username, email, hashed_password, disabled FROM users WHERE username = ?",
+            (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "username": row[0],
+            "email": row[1],
+            "hashed_password": row[2],
+            "disabled": bool(row[3]),
+        }
+
+    def create_user(self, username: str, email: str, hashed_password: str) -> Optional[str]:
+        """
+        Insert a new user.
+
+        Returns:
+            None on success, or "username" / "email" naming the field that
+            is already taken.
+        """
+        try:
+            self._connection().execute(
+                "INSERT INTO users (username, email, hashed_password, disabled, created_at) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (username, email, hashed_password, time.time())
+            )
+        except sqlite3.IntegrityError as e:
+            return "email" if "email" in str(e) else "username"
+        return None
+
+    def username_exists(self, username: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM users WHERE username = ?", (username,)
+        ).fetchone() is not None
+
+
+def get_user_store() -> UserStore:
+    """Return the process-wide user store (USER_DB_PATH, default backend/users.db)."""
+    global _user_store
+    if _user_store is None:
+        default_path = Path(__file__).resolve().parent.parent / "users.db"
+        _user_store = UserStore(os.getenv("USER_DB_PATH", str(default_path)))
+    return _user_store
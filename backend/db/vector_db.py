@@ -0,0 +1,83 @@
+"""
+Vector database selection.
+"""
+
+import os
+import threading
+from typing import Optional
+
+# VECTOR_DB=tenant: one residency manager (and memory budget) for every namespace
+_residency_manager = None
+_residency_lock = threading.Lock()
+
+
+class UnscopedQueryError(Exception):
+    """A query without a document filter would load more indexes than fit in memory."""
+
+
+def create_vector_database(namespace: Optional[str] = None):
+    """
+    Build the vector database named by VECTOR_DB.
+
+    VECTOR_DB=pinecone (default) uses the hosted index; VECTOR_DB=local
+    keeps vectors in this process (LocalVectorDatabase), for offline use.
+    With LOCAL_INDEX_PATH set, the local index is restored from its latest
+    snapshot there and snapshotted in the background every
+    LOCAL_SNAPSHOT_INTERVAL seconds (default 60) while it changes.
+    VECTOR_DB=tenant keeps one local index per document under
+    TENANT_INDEX_PATH, with at most RESIDENT_INDEX_MB of them in memory
+    across all namespaces; a query without a document filter raises
+    UnscopedQueryError once every document's index would not fit.
+    Local indexes store vectors as LOCAL_VECTOR_ENCODING (float32, float16
+    or pq; default float32), with LOCAL_RERANK=true keeping full-precision
+    vectors to re-score the final candidates of a compressed index.
+
+    A namespace gives an independent set of vectors: a Pinecone namespace,
+    or a separate local index stored next to the main one.
+    """
+    backend = os.getenv("VECTOR_DB", "pinecone").lower()
+    index_options = {
+        "dimension": int(os.getenv("EMBEDDING_DIMENSION", 384)),
+        "encoding": os.getenv("LOCAL_VECTOR_ENCODING", "float32").lower(),
+        "rerank": os.getenv("LOCAL_RERANK", "false").lower() == "true",
+    }
+    if backend == "pinecone":
+        from db.pinecone_db import PineconeDatabase
+        return PineconeDatabase(namespace=namespace)
+    if backend == "local":
+        from db.local_db import LocalVectorDatabase
+        path = os.getenv("LOCAL_INDEX_PATH")
+        if path and namespace:
+            path = f"{path.rstrip('/')}-{namespace}"
+        if not path:
+            return LocalVectorDatabase(**index_options)
+        if os.path.exists(os.path.join(path, "CURRENT")):
+            db = LocalVectorDatabase.restore(path)
+        else:
+            db = LocalVectorDatabase(**index_options)
+        db.start_snapshots(path, float(os.getenv("LOCAL_SNAPSHOT_INTERVAL", 60)))
+        return db
+    if backend == "tenant":
+        from db.residency import ResidentVectorDatabase
+        return ResidentVectorDatabase(_get_residency_manager(index_options), namespace=namespace)
+    raise ValueError(f"Unknown VECTOR_DB backend: {backend}")
+
+
+def _get_residency_manager(index_options):
+    global _residency_manager
+    if _residency_manager is None:
+        with _residency_lock:
+            if _residency_manager is None:
+                import atexit
+                from pathlib import Path
+                from db.residency import IndexResidencyManager
+                root = os.getenv("TENANT_INDEX_PATH", str(Path(__file__).resolve().parent.parent / "tenant_indexes"))
+                manager = IndexResidencyManager(
+                    root,
+                    budget_bytes=int(float(os.getenv("RESIDENT_INDEX_MB", 512)) * 1024 * 1024),
+                    index_options=index_options,
+                )
+                # Resident indexes with unsaved writes are written back on shutdown
+                atexit.register(manager.flush)
+                _residency_manager = manager
+    return _residency_manager
@@ -3,16 +3,31 @@ RAG Evaluator for measuring system performance.
 """
 
 import csv
+import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Set, Optional
 from pathlib import Path
 from services.rag import RAGService
 from models.schemas import ChatRequest
-from evaluation.metrics import precision_at_k, recall_at_k, mean_reciprocal_rank, average_precision
+from evaluation.metrics import (
+    precision_at_k, recall_at_k, mean_reciprocal_rank, average_precision, percentile
+)
 
 logger = logging.getLogger(__name__)
 
+# Pipeline stages timed by RAGService.process_query_timed
+STAGES = ["embed", "vector_query", "context_build", "llm"]
+
+RESULT_FIELDS = [
+    "index", "query", "role", "retrieved_docs", "relevant_docs", "response",
+    "end_to_end_latency", *[f"{stage}_latency" for stage in STAGES], "token_usage",
+    "precision@1", "precision@3", "precision@5", "recall@1", "recall@3", "recall@5",
+    "mrr", "map", "top_k", "similarity_threshold", "error"
+]
+
 
 class EvaluationSample:
     """Represents a single evaluation sample."""
@@ -23,6 +38,32 @@ class EvaluationSample:
         self.role = role
 
 
+class ResultWriter:
+    """Appends results to a CSV or JSONL file (by suffix) as they complete."""
+
+    def __init__(self, filepath: str):
+        path = Path(filepath)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.jsonl = path.suffix.lower() == ".jsonl"
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._lock = threading.Lock()
+        if not self.jsonl:
+            self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            self._writer.writeheader()
+
+    def write(self, result: Dict[str, Any]):
+        with self._lock:
+            if self.jsonl:
+                self._file.write(json.dumps(result) + "\n")
+            else:
+                self._writer.writerow(result)
+            # Flush so partial results survive an interrupted run
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
 class RAGEvaluator:
     """Evaluator for RAG system performance."""
     
@@ -35,15 +76,18 @@ class RAGEvaluator:
         """
         self.rag_service = rag_service
         self.results: List[Dict[str, Any]] = []
+        self._results_lock = threading.Lock()
     
-    def evaluate_sample(self, sample: EvaluationSample, top_k: int = 5, similarity_threshold: float = 0.5) -> Dict[str, Any]:
+    def evaluate_sample(self, sample: EvaluationSample, top_k: int = 5, similarity_threshold: float = 0.5,
+                        index: int = 0) -> Dict[str, Any]:
         """
-        Evaluate a single sample.
+        Evaluate a single sample. Safe to call from several threads.
         
         Args:
             sample: EvaluationSample to test.
             top_k: Number of top results to retrieve.
             similarity_threshold: Similarity threshold for retrieval.
+            index: Position of the sample in its dataset.
             
         Returns:
             Dictionary with evaluation metrics.
@@ -58,7 +102,7 @@ class RAGEvaluator:
         
         # Measure latency
         start_time = time.time()
-        response = self.rag_service.process_query(request)
+        response, timings = self.rag_service.process_query_timed(request)
         end_to_end_latency = time.time() - start_time
         
         # Extract retrieved document IDs
@@ -80,12 +124,14 @@ class RAGEvaluator:
         token_usage = getattr(response, 'token_usage', 0)
         
         result = {
+            "index": index,
             "query": sample.query,
             "role": sample.role,
             "retrieved_docs": retrieved_docs,
             "relevant_docs": list(sample.relevant_docs),
             "response": response.response,
             "end_to_end_latency": round(end_to_end_latency, 3),
+            **{f"{stage}_latency": round(timings[stage], 3) for stage in STAGES},
             "token_usage": token_usage,
             "precision@1": round(p_at_1, 3),
             "precision@3": round(p_at_3, 3),
@@ -96,30 +142,60 @@ class RAGEvaluator:
             "mrr": round(mrr, 3),
             "map": round(ap, 3),
             "top_k": top_k,
-            "similarity_threshold": similarity_threshold
+            "similarity_threshold": similarity_threshold,
+            "error": None
         }
         
-        self.results.append(result)
-        logger.info(f"Evaluated query: {sample.query[:50]}... P@5: {p_at_1:.3f}, Latency: {end_to_end_latency:.3f}s")
+        with self._results_lock:
+            self.results.append(result)
+        logger.info(f"Evaluated query: {sample.query[:50]}... P@5: {p_at_5:.3f}, Latency: {end_to_end_latency:.3f}s")
         
         return result
     
-    def evaluate_dataset(self, samples: List[EvaluationSample], top_k: int = 5, similarity_threshold: float = 0.5) -> Dict[str, float]:
+    def evaluate_dataset(self, samples: List[EvaluationSample], top_k: int = 5, similarity_threshold: float = 0.5,
+                         max_workers: int = 4, output_path: Optional[str] = None) -> Dict[str, float]:
         """
-        Evaluate a dataset of samples.
+        Evaluate a dataset of samples concurrently.
         
         Args:
             samples: List of EvaluationSample instances.
             top_k: Number of top results to retrieve.
             similarity_threshold: Similarity threshold for retrieval.
+            max_workers: Samples evaluated in parallel (1 = sequential).
+            output_path: Optional .csv or .jsonl file results are streamed to
+                as they finish.
             
         Returns:
-            Dictionary with average metrics.
+            Dictionary with average IR metrics, latency percentiles
+            and per-stage latencies.
         """
         self.results = []
-        
-        for sample in samples:
-            self.evaluate_sample(sample, top_k, similarity_threshold)
+        writer = ResultWriter(output_path) if output_path else None
+        failed = 0
+        start_time = time.time()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self.evaluate_sample, sample, top_k, similarity_threshold, index): (index, sample)
+                    for index, sample in enumerate(samples)
+                }
+                for future in as_completed(futures):
+                    index, sample = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Evaluation failed for query: {sample.query[:50]}... {e}")
+                        result = {"index": index, "query": sample.query, "role": sample.role, "error": str(e)}
+                    if writer:
+                        writer.write(result)
+        finally:
+            if writer:
+                writer.close()
+
+        wall_time = time.time() - start_time
+        self.results.sort(key=lambda r: r["index"])
         
         # Calculate averages
         if not self.results:
@@ -132,6 +208,19 @@ class RAGEvaluator:
         for key in metric_keys:
             values = [r[key] for r in self.results if key in r]
             avg_metrics[f"avg_{key}"] = round(sum(values) / len(values), 3) if values else 0.0
+
+        latencies = [r["end_to_end_latency"] for r in self.results]
+        for q in (50, 95, 99):
+            avg_metrics[f"p{q}_end_to_end_latency"] = round(percentile(latencies, q), 3)
+        for stage in STAGES:
+            values = [r[f"{stage}_latency"] for r in self.results]
+            avg_metrics[f"avg_{stage}_latency"] = round(sum(values) / len(values), 3)
+            avg_metrics[f"p95_{stage}_latency"] = round(percentile(values, 95), 3)
+
+        avg_metrics["samples"] = len(self.results)
+        avg_metrics["failed"] = failed
+        avg_metrics["wall_time"] = round(wall_time, 3)
+        avg_metrics["samples_per_second"] = round(len(self.results) / wall_time, 3) if wall_time else 0.0
         
         logger.info(f"Dataset evaluation complete. Avg P@5: {avg_metrics.get('avg_precision@5', 0):.3f}")
         
@@ -152,8 +241,7 @@ class RAGEvaluator:
         
         with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
             if self.results:
-                fieldnames = self.results[0].keys()
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer = csv.DictWriter(csvfile, fieldnames=RESULT_FIELDS, extrasaction="ignore")
                 writer.writeheader()
                 writer.writerows(self.results)
         
@@ -2,6 +2,7 @@
 Example evaluation script for the RAG system.
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -9,23 +10,28 @@ from pathlib import Path
 # Add backend to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from dotenv import load_dotenv
 from services.rag import RAGService
 from services.embeddings import EmbeddingService
-from services.retriever import RetrieverService
 from services.llm import LLMService
-from db.faiss_db import FAISSDatabase
+from db.vector_db import create_vector_database
 from evaluation.evaluator import RAGEvaluator, EvaluationSample
 
 
 def main():
     """Run example evaluation."""
-    
-    # Initialize services
+    parser = argparse.ArgumentParser(description="Evaluate the RAG pipeline on example queries.")
+    parser.add_argument("--workers", type=int, default=4, help="Samples evaluated in parallel")
+    parser.add_argument("--output", default="evaluation_results.jsonl", help=".csv or .jsonl results file")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    # Initialize services (VECTOR_DB selects Pinecone or the local store)
     embedding_service = EmbeddingService()
-    faiss_db = FAISSDatabase()
-    retriever_service = RetrieverService(faiss_db)
-    llm_service = LLMService(api_key=os.getenv("OPENAI_API_KEY", ""))
-    rag_service = RAGService(embedding_service, retriever_service, llm_service)
+    vector_db = create_vector_database()
+    llm_service = LLMService(api_key=os.getenv("GROQ_API_KEY", ""))
+    rag_service = RAGService(embedding_service, vector_db, llm_service)
     
     # Create evaluator
     evaluator = RAGEvaluator(rag_service)
@@ -61,20 +67,20 @@ def main():
     ]
     
     print("Running RAG evaluation...")
-    print(f"Evaluating {len(samples)} samples...")
+    print(f"Evaluating {len(samples)} samples with {args.workers} workers...")
     
-    # Evaluate dataset
-    avg_metrics = evaluator.evaluate_dataset(samples, top_k=5, similarity_threshold=0.5)
+    # Evaluate dataset, streaming each result to the output file
+    avg_metrics = evaluator.evaluate_dataset(
+        samples, top_k=5, similarity_threshold=0.5,
+        max_workers=args.workers, output_path=args.output
+    )
     
     print("\nEvaluation Results:")
     print("=" * 50)
     for metric, value in avg_metrics.items():
         print(f"{metric}: {value}")
     
-    # Export results
-    output_path = "evaluation_results.csv"
-    evaluator.export_to_csv(output_path)
-    print(f"\nDetailed results exported to {output_path}")
+    print(f"\nDetailed results written to {args.output}")
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ Evaluation metrics for RAG system.
 """
 
 from typing import List, Set
+import math
 import time
 
 
@@ -86,4 +87,22 @@ def average_precision(retrieved_docs: List[str], relevant_docs: Set[str]) -> flo
             precision_at_i = relevant_found / (i + 1)
             precision_sum += precision_at_i
     
-    return precision_sum / len(relevant_docs) if relevant_docs else 0.0
\ No newline at end of file
+    return precision_sum / len(relevant_docs) if relevant_docs else 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Calculate the q-th percentile (nearest rank).
+
+    Args:
+        values: Observed values (any order).
+        q: Percentile in [0, 100].
+
+    Returns:
+        Percentile value, or 0.0 for no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
@@ -0,0 +1,257 @@
+"""
+Retrieval-only evaluation with a top_k / similarity_threshold sweep.
+
+Every query is embedded once (one batched encode call) and the largest
+candidate set is fetched from the vector database once. Each (k, threshold)
+setting then keeps the first k candidates scoring at least the threshold,
+which is exactly what RAGService does. So precision/recall/MRR/MAP for the
+whole grid come from vectorized NumPy over the cached scores, with no LLM
+calls and no further queries.
+
+The grid uses the definitions in evaluation/metrics.py, as the evaluator
+applies them to the retrieved chunks' document names: precision divides
+by k (not by the number retrieved), precision and recall count each
+document once, and average precision counts every relevant chunk, so a
+document retrieved twice adds twice. benchmarks/check_retrieval_sweep.py
+checks the grid against those functions.
+
+Run from backend/:
+    python -m evaluation.retrieval_sweep --dataset samples.jsonl --metric recall --target 0.8
+
+The dataset is JSONL, one {"query": ..., "relevant_docs": [...]} per line.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from evaluation.evaluator import EvaluationSample
+
+logger = logging.getLogger(__name__)
+
+METRICS = ["precision", "recall", "mrr", "map"]
+
+
+def load_samples(filepath: str) -> List[EvaluationSample]:
+    """
+    Load evaluation samples from a JSONL file.
+
+    Args:
+        filepath: File with one {"query", "relevant_docs", "role"?} object per line.
+
+    Returns:
+        List of EvaluationSample instances.
+    """
+    samples = []
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append(EvaluationSample(
+                    record["query"], set(record["relevant_docs"]), record.get("role", "researcher")
+                ))
+    return samples
+
+
+class RetrievalSweep:
+    """Caches candidate scores once, then scores any grid of retrieval settings."""
+
+    def __init__(self, embedding_service, db_service, doc_key: str = "filename"):
+        """
+        Initialize the sweep.
+
+        Args:
+            embedding_service: Embedding service instance.
+            db_service: Vector database (PineconeDatabase or LocalVectorDatabase).
+            doc_key: Metadata key naming the document a chunk belongs to.
+        """
+        self.embedding_service = embedding_service
+        self.db_service = db_service
+        self.doc_key = doc_key
+        self.scores: Optional[np.ndarray] = None  # [queries, max_k], -inf padded
+        self.first_hits: Optional[np.ndarray] = None  # [queries, max_k], first chunk of a relevant doc
+        self.hits: Optional[np.ndarray] = None        # [queries, max_k], any chunk of a relevant doc
+        self.relevant_counts: Optional[np.ndarray] = None
+
+    def collect(self, samples: List[EvaluationSample], max_k: int, max_workers: int = 8):
+        """
+        Embed all queries once and fetch max_k candidates per query once.
+
+        Args:
+            samples: Evaluation samples.
+            max_k: Largest top_k that will be swept.
+            max_workers: Concurrent vector queries.
+        """
+        start = time.time()
+        embeddings = self.embedding_service.encode([sample.query for sample in samples])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            all_matches = list(executor.map(
+                lambda embedding: self.db_service.query(embedding, max_k), embeddings
+            ))
+
+        self.scores = np.full((len(samples), max_k), -np.inf)
+        self.first_hits = np.zeros((len(samples), max_k))
+        self.hits = np.zeros((len(samples), max_k))
+        self.relevant_counts = np.array([len(sample.relevant_docs) for sample in samples], dtype=float)
+        for row, (sample, matches) in enumerate(zip(samples, all_matches)):
+            seen = set()
+            for col, match in enumerate(matches[:max_k]):
+                self.scores[row, col] = match["score"]
+                doc = match["metadata"].get(self.doc_key)
+                if doc in sample.relevant_docs:
+                    self.hits[row, col] = 1.0
+                    # Set semantics for precision_at_k / recall_at_k: a document counts once
+                    if doc not in seen:
+                        self.first_hits[row, col] = 1.0
+                seen.add(doc)
+
+        logger.info(f"Collected candidates for {len(samples)} queries in {time.time() - start:.3f}s")
+
+    def evaluate_grid(self, ks: Sequence[int], thresholds: Sequence[float]) -> Dict[str, np.ndarray]:
+        """
+        Score every (k, threshold) setting from the cached candidates.
+
+        Args:
+            ks: top_k values (each at most the collected max_k).
+            thresholds: similarity_threshold values.
+
+        Returns:
+            Dictionary of [len(ks), len(thresholds)] arrays averaged over
+            queries: precision, recall, mrr, map and avg_retrieved.
+        """
+        if self.scores is None:
+            raise RuntimeError("Call collect() before evaluate_grid()")
+
+        ks = np.asarray(ks)
+        thresholds = np.asarray(thresholds, dtype=float)
+        queries, max_k = self.scores.shape
+        if ks.max() > max_k:
+            raise ValueError(f"k={ks.max()} exceeds the {max_k} collected candidates")
+
+        # Retrieved count per (query, k, threshold): scores are sorted, so the
+        # kept results are a prefix of the candidate list
+        above = (self.scores[:, None, :] >= thresholds[None, :, None]).sum(axis=2)  # [Q, T]
+        retrieved = np.minimum(ks[None, :, None], above[:, None, :])                 # [Q, K, T]
+        index = retrieved.reshape(queries, -1)
+
+        zero = np.zeros((queries, 1))
+        cum_docs = np.hstack([zero, np.cumsum(self.first_hits, axis=1)])
+        cum_hits = np.cumsum(self.hits, axis=1)
+        ranks = np.arange(1, max_k + 1)
+        cum_precision = np.hstack([zero, np.cumsum(self.hits * cum_hits / ranks, axis=1)])
+        first_hit = np.where(self.hits.any(axis=1), self.hits.argmax(axis=1) + 1, max_k + 1)
+
+        docs = np.take_along_axis(cum_docs, index, axis=1).reshape(retrieved.shape)
+        precision_sum = np.take_along_axis(cum_precision, index, axis=1).reshape(retrieved.shape)
+        relevant = np.maximum(self.relevant_counts, 1)[:, None, None]
+
+        precision = docs / np.maximum(ks, 1)[None, :, None]
+        recall = docs / relevant
+        mrr = np.where(first_hit[:, None, None] <= retrieved, 1.0 / first_hit[:, None, None], 0.0)
+        average_precision = precision_sum / relevant
+
+        return {
+            "precision": precision.mean(axis=0),
+            "recall": recall.mean(axis=0),
+            "mrr": mrr.mean(axis=0),
+            "map": average_precision.mean(axis=0),
+            "avg_retrieved": retrieved.mean(axis=0),
+        }
+
+    @staticmethod
+    def cheapest_setting(grid: Dict[str, np.ndarray], ks: Sequence[int], thresholds: Sequence[float],
+                         metric: str, target: float) -> Optional[Dict[str, Any]]:
+        """
+        Pick the setting meeting the target with the fewest chunks sent to the LLM.
+
+        Ties go to the smaller k, then the higher threshold.
+
+        Returns:
+            The setting with all its metrics, or None if no setting meets the target.
+        """
+        feasible = np.argwhere(grid[metric] >= target)
+        if len(feasible) == 0:
+            return None
+        i, j = min(
+            feasible,
+            key=lambda ij: (grid["avg_retrieved"][ij[0], ij[1]], ks[ij[0]], -thresholds[ij[1]])
+        )
+        return {
+            "top_k": int(ks[i]),
+            "similarity_threshold": float(thresholds[j]),
+            **{name: round(float(values[i, j]), 4) for name, values in grid.items()},
+        }
+
+
+def parse_thresholds(spec: List[str]) -> List[float]:
+    """Accept explicit values and/or start:stop:step ranges (stop inclusive)."""
+    values = []
+    for item in spec:
+        if ":" in item:
+            start, stop, step = (float(part) for part in item.split(":"))
+            values.extend(np.round(np.arange(start, stop + step / 2, step), 6).tolist())
+        else:
+            values.append(float(item))
+    return sorted(set(values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", required=True, help="JSONL evaluation samples")
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 2, 3, 4, 5, 6, 8, 10, 15, 20])
+    parser.add_argument("--thresholds", nargs="+", default=["0.0:0.9:0.05"])
+    parser.add_argument("--metric", choices=METRICS, default="recall")
+    parser.add_argument("--target", type=float, default=0.8)
+    parser.add_argument("--doc-key", default="filename", help="Metadata key naming the document")
+    parser.add_argument("--output", help="Optional JSON file for the full grid")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from services.embeddings import EmbeddingService
+    from db.vector_db import create_vector_database
+
+    load_dotenv()
+    samples = load_samples(args.dataset)
+    ks = sorted(set(args.ks))
+    thresholds = parse_thresholds(args.thresholds)
+
+    sweep = RetrievalSweep(EmbeddingService(), create_vector_database(), args.doc_key)
+    sweep.collect(samples, max(ks))
+    start = time.time()
+    grid = sweep.evaluate_grid(ks, thresholds)
+    print(f"Scored {len(ks) * len(thresholds)} settings x {len(samples)} queries "
+          f"in {(time.time() - start) * 1000:.1f} ms")
+
+    print(f"\n{args.metric} by top_k (rows) and similarity_threshold (columns)")
+    print("k \\ t " + " ".join(f"{t:>5.2f}" for t in thresholds))
+    for i, k in enumerate(ks):
+        print(f"{k:>5} " + " ".join(f"{v:>5.2f}" for v in grid[args.metric][i]))
+
+    best = RetrievalSweep.cheapest_setting(grid, ks, thresholds, args.metric, args.target)
+    if best:
+        print(f"\nCheapest setting with {args.metric} >= {args.target}: {best}")
+    else:
+        print(f"\nNo setting reaches {args.metric} >= {args.target}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "ks": ks,
+            "thresholds": thresholds,
+            "grid": {name: values.round(4).tolist() for name, values in grid.items()},
+            "best": best,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for multi-worker serving.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+WEB_CONCURRENCY sets the worker count. With more than one worker, shared
+state defaults to the SQLite state store (STATE_STORE / STATE_DB_PATH).
+"""
+
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))
+
+# Import the app's module graph once in the master so forked workers share
+# those pages. The embedding model still warms up in each worker's background
+# task, so /health and /startup answer as soon as the port binds;
+# PRELOAD_MODEL=true loads it in the master instead (shared pages, but the
+# port only binds once the model is loaded).
+preload_app = True
+
+# Workers must agree on upload, dedup and conversation state
+if workers > 1:
+    os.environ.setdefault("STATE_STORE", "sqlite")
+
+
+def when_ready(server):
+    # Runs in the master after preload, before workers fork. Frozen objects
+    # are skipped by the GC, so collections in workers don't write to (and
+    # un-share) the preloaded pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # N workers each using every core for intra-op threads oversubscribe the CPU
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(int(os.getenv("TORCH_THREADS", 1)))
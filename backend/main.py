@@ -2,24 +2,38 @@
 Main FastAPI application for AI Research & Knowledge Assistant.
 """
 
+import time
+_import_start = time.perf_counter()
+
 print("✅ FastAPI app loading")
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from api.auth import router as auth_router
+from fastapi.responses import JSONResponse, Response
 from api.upload import router as upload_router
 from api.chat import router as chat_router
+from api.debug import router as debug_router
+from db.vector_db import UnscopedQueryError
+from utils.admission import AdmissionMiddleware, get_admission_controller
+from utils.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from utils.tracing import TracingMiddleware
 
 import os
 import asyncio
+import logging
 
+logger = logging.getLogger(__name__)
 
 
 # Configuration
 PORT = int(os.getenv("PORT", 8000))
+# Auth pulls in jose/passlib/bcrypt; only import it when it is served
+ENABLE_AUTH = os.getenv("ENABLE_AUTH", "false").lower() == "true"
+# background: load heavy dependencies after startup; off: load on first use
+WARMUP = os.getenv("WARMUP", "background").lower()
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*")
 origins = ALLOWED_ORIGINS.split(",") if ALLOWED_ORIGINS != "*" else ["*"]
 
@@ -29,6 +43,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Admission control: shed /chat and /upload load before it piles up.
+# Added before CORS so CORS stays outermost and rejections still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
+# Opt-in request traces (admin header or sampling); wraps admission so queue wait shows up
+app.add_middleware(TracingMiddleware)
+
+# Request latency / error metrics, wrapping admission so shed requests count too
+app.add_middleware(MetricsMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,9 +63,76 @@ app.add_middleware(
 )
 
 # Include routers
-# app.include_router(auth_router, tags=["auth"])
+if ENABLE_AUTH:
+    from api.auth import router as auth_router
+    app.include_router(auth_router, tags=["auth"])
 app.include_router(upload_router, tags=["upload"])
 app.include_router(chat_router, tags=["chat"])
+app.include_router(debug_router)
+
+
+@app.exception_handler(UnscopedQueryError)
+async def unscoped_query_handler(request: Request, exc: UnscopedQueryError):
+    # Too many per-document indexes to search at once (VECTOR_DB=tenant)
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# Multi-worker mode: load the embedding model before gunicorn forks so all
+# workers share its memory pages copy-on-write (see gunicorn.conf.py)
+if os.getenv("PRELOAD_MODEL", "false").lower() == "true":
+    from api.upload import get_embedding_service
+    get_embedding_service()
+
+# -------------------------------------------------
+# Startup: heavy dependencies warm up after the port is bound
+# -------------------------------------------------
+startup_report = {
+    "import_seconds": None,
+    "warmup": WARMUP,
+    "warmup_done": False,
+    "components": {},
+}
+
+
+def _warm_up():
+    """Import and initialise heavy dependencies so the first requests don't pay for them."""
+    from api.upload import get_embedding_service, get_pinecone_db
+    from api.chat import get_llm_service
+
+    def parsers():
+        import pdfplumber  # noqa: F401
+        import docx  # noqa: F401
+
+    def embedding_model():
+        # One tiny encode also initialises the model's kernels
+        get_embedding_service().encode(["warm up"])
+
+    components = [("embedding_model", embedding_model), ("vector_db", get_pinecone_db),
+                  ("llm_client", get_llm_service), ("document_parsers", parsers)]
+    for name, load in components:
+        start = time.perf_counter()
+        try:
+            load()
+        except Exception as e:
+            # Lazy loading still retries on first use
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            startup_report["components"][name] = {"error": str(e)}
+            continue
+        startup_report["components"][name] = {"seconds": round(time.perf_counter() - start, 3)}
+    startup_report["warmup_done"] = True
+    logger.info(f"Warm-up finished: {startup_report['components']}")
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    if WARMUP == "background":
+        # Not awaited: the server starts accepting requests right away
+        asyncio.get_event_loop().run_in_executor(None, _warm_up)
+
+
+@app.get("/startup")
+def startup_stats():
+    """App import time and background warm-up progress of this worker."""
+    return startup_report
 
 @app.get("/")
 async def root():
@@ -56,12 +147,42 @@ def health():
 def ping():
     return {"ok": True}
 
+@app.get("/admission")
+def admission_stats():
+    """Queue depth, in-flight and shed counts per limited endpoint."""
+    return get_admission_controller().stats()
+
+@app.get("/residency")
+def residency_stats():
+    """Hit rate, load latency and memory of per-tenant indexes (VECTOR_DB=tenant)."""
+    from api.upload import get_pinecone_db
+    db = get_pinecone_db()
+    return db.residency_stats() if hasattr(db, "residency_stats") else {"enabled": False}
+
+def _admission_gauge(field: str):
+    def collect():
+        return {(name,): stats[field] for name, stats in get_admission_controller().stats().items()}
+    return collect
+
+
+for _field in ("active", "queued"):
+    REGISTRY.gauge_callback(
+        f"rag_admission_{_field}", f"Requests {_field} per limited endpoint.", ("endpoint",),
+        _admission_gauge(_field)
+    )
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/cors-test")
 def cors_test():
     return {"status": "cors ok"}
 
 
-print("✅ FastAPI app ready")
+startup_report["import_seconds"] = round(time.perf_counter() - _import_start, 3)
+print(f"✅ FastAPI app ready (imported in {startup_report['import_seconds']}s)")
 
 
 if __name__ == "__main__":
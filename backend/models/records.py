@@ -0,0 +1,62 @@
+"""
+Lightweight internal records for the ingest and query hot paths.
+
+Pydantic models validate and copy every field, which adds up when each
+query builds a model per candidate and each ingest one per chunk. These
+records are plain __slots__ objects; Pydantic models (models/schemas.py)
+are only built at the API boundary.
+"""
+
+from typing import List, Optional, Dict, Any
+
+from models.schemas import DocumentChunk
+
+
+class ChunkRecord:
+    """A chunk (with its embedding) on its way to the vector database."""
+
+    __slots__ = ("id", "document_id", "content", "metadata", "embedding")
+
+    def __init__(self, id: str, document_id: str, content: str, metadata: Dict[str, Any],
+                 embedding: Optional[List[float]] = None):
+        self.id = id
+        self.document_id = document_id
+        self.content = content
+        self.metadata = metadata
+        self.embedding = embedding
+
+    def to_model(self) -> DocumentChunk:
+        """Validated Pydantic copy, for API responses."""
+        return DocumentChunk(id=self.id, document_id=self.document_id, content=self.content,
+                             metadata=self.metadata, embedding=self.embedding)
+
+    def __repr__(self) -> str:
+        return f"ChunkRecord(id={self.id!r}, document_id={self.document_id!r})"
+
+
+class Candidate:
+    """A retrieved chunk: vector database match plus its similarity score."""
+
+    __slots__ = ("id", "document_id", "content", "metadata", "score")
+
+    def __init__(self, id: str, document_id: str, content: str, metadata: Dict[str, Any], score: float):
+        self.id = id
+        self.document_id = document_id
+        self.content = content
+        self.metadata = metadata
+        self.score = score
+
+    @classmethod
+    def from_match(cls, match: Dict[str, Any]) -> "Candidate":
+        """Wrap a vector database match without copying its metadata."""
+        metadata = match["metadata"]
+        return cls(match["id"], metadata.get("document_id", ""), metadata.get("content", ""),
+                   metadata, match["score"])
+
+    def to_model(self) -> DocumentChunk:
+        """Validated Pydantic copy, for API responses (no embedding)."""
+        return DocumentChunk(id=self.id, document_id=self.document_id, content=self.content,
+                             metadata=self.metadata)
+
+    def __repr__(self) -> str:
+        return f"Candidate(id={self.id!r}, score={self.score:.3f})"
@@ -48,6 +48,48 @@ class DocumentUpload(BaseModel):
     filename: str
     uploaded_at: datetime
     chunks_count: int
+    version: int = 1
+    duplicate: bool = False
+    embeddings_saved: int = 0
+    bytes_saved: int = 0
+
+
+class DocumentVersionUpdate(BaseModel):
+    """Model for incremental re-indexing of a new document version."""
+    id: str
+    filename: str
+    version: int
+    uploaded_at: datetime
+    chunks_count: int
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    chunks_unchanged: int = 0
+    metadata_updates: int = 0
+    embeddings_saved: int = 0
+    bytes_saved: int = 0
+
+
+class BulkUploadResult(BaseModel):
+    """Per-file outcome of a bulk upload."""
+    filename: str
+    id: Optional[str] = None
+    chunks_count: int = 0
+    duplicate: bool = False
+    embeddings_saved: int = 0
+    bytes_saved: int = 0
+    error: Optional[str] = None
+
+
+class BulkUploadResponse(BaseModel):
+    """Model for bulk upload response with aggregate throughput."""
+    results: List[BulkUploadResult]
+    files_count: int
+    chunks_count: int
+    embeddings_count: int
+    elapsed_seconds: float
+    files_per_second: float
+    chunks_per_second: float
+    mb_per_second: float
 
 
 class DocumentChunk(BaseModel):
@@ -89,6 +131,24 @@ class ChatResponse(BaseModel):
     response: str
     sources: List[Source] = []
     session_id: str
+    compression_ratio: Optional[float] = None   # context tokens kept / retrieved
+
+
+class BatchChatRequest(BaseModel):
+    """Model for many questions about one document scope."""
+    questions: List[str] = Field(..., min_length=1, max_length=100)
+    document_id: Optional[str] = None
+    top_k: Optional[int] = Field(10, ge=1, le=20)
+
+
+class BatchChatAnswer(BaseModel):
+    """One streamed answer of a batch (index is the question's position)."""
+    index: int
+    question: str
+    response: Optional[str] = None
+    sources: List[Source] = []
+    compression_ratio: Optional[float] = None
+    error: Optional[str] = None
 
 
 # ----------------------------
@@ -0,0 +1,122 @@
+"""
+Extractive context compression.
+
+Most sentences of a retrieved 500-word chunk do not bear on the question,
+yet each one costs prompt tokens and LLM latency. The compressor splits
+the retrieved chunks into sentences, embeds them all in one batched call,
+scores each against the query embedding and keeps the best ones up to a
+token budget. Kept sentences stay in their own chunk, in document order,
+so every piece of context still carries its source (id, page, score).
+"""
+
+import logging
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from utils.helpers import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Joins the sentences kept from one chunk where text was dropped between them
+GAP = " … "
+
+
+def _count_tokens(text: str) -> int:
+    """Cheap whitespace token estimate."""
+    return text.count(" ") + 1
+
+
+class ContextCompressor:
+    """Keeps the sentences of retrieved chunks that are closest to the question."""
+
+    def __init__(self, embedding_service, token_budget: int = 300, min_sentences: int = 1):
+        """
+        Initialize the compressor.
+
+        Args:
+            embedding_service: Embedding service used for the sentences.
+            token_budget: Tokens of context kept per question.
+            min_sentences: Sentences always kept, even over the budget.
+        """
+        self.embedding_service = embedding_service
+        self.token_budget = token_budget
+        self.min_sentences = min_sentences
+
+    def compress(self, query_embedding: List[float],
+                 matches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Reduce matches to their most relevant sentences.
+
+        Args:
+            query_embedding: Question embedding.
+            matches: Vector database matches, best first.
+
+        Returns:
+            Tuple of (matches, stats). Matches keep their id, score and
+            metadata, with content reduced to the kept sentences; matches
+            with nothing kept are dropped. Stats hold tokens_before,
+            tokens_after, sentences_before, sentences_after and ratio
+            (tokens_after / tokens_before).
+        """
+        # (match position, sentence); overlapping chunks repeat sentences, keep the first
+        sentences: List[Tuple[int, str]] = []
+        seen = set()
+        tokens_before = 0
+        for position, match in enumerate(matches):
+            content = match.get("metadata", {}).get("content", "")
+            tokens_before += _count_tokens(content) if content else 0
+            for sentence in split_sentences(content):
+                if sentence not in seen:
+                    seen.add(sentence)
+                    sentences.append((position, sentence))
+
+        if not sentences:
+            return matches, {"tokens_before": tokens_before, "tokens_after": tokens_before,
+                             "sentences_before": 0, "sentences_after": 0, "ratio": 1.0}
+
+        # One batched encode for every sentence of every chunk
+        vectors = np.asarray(self.embedding_service.encode([sentence for _, sentence in sentences]),
+                             dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = vectors @ query / np.where(norms == 0, 1.0, norms)
+
+        # Best sentences first; ties go to the better ranked chunk
+        order = sorted(range(len(sentences)), key=lambda i: (-scores[i], sentences[i][0]))
+        kept = set()
+        used = 0
+        for i in order:
+            tokens = _count_tokens(sentences[i][1])
+            if used + tokens > self.token_budget and len(kept) >= self.min_sentences:
+                continue
+            kept.add(i)
+            used += tokens
+
+        # Rebuild each chunk from its kept sentences, in their original order
+        pieces: Dict[int, List[str]] = {}
+        previous: Dict[int, int] = {}
+        for i, (position, sentence) in enumerate(sentences):
+            if i in kept:
+                parts = pieces.setdefault(position, [])
+                if parts and previous[position] != i - 1:
+                    parts.append(GAP)
+                elif parts:
+                    parts.append(" ")
+                parts.append(sentence)
+                previous[position] = i
+
+        compressed = [
+            {"id": match["id"], "score": match["score"],
+             "metadata": {**match.get("metadata", {}), "content": "".join(pieces[position])}}
+            for position, match in enumerate(matches) if position in pieces
+        ]
+        stats = {
+            "tokens_before": tokens_before,
+            "tokens_after": used,
+            "sentences_before": len(sentences),
+            "sentences_after": len(kept),
+            "ratio": round(used / tokens_before, 4) if tokens_before else 1.0,
+        }
+        logger.debug(f"Compressed context {tokens_before} -> {used} tokens")
+        return compressed, stats
@@ -0,0 +1,243 @@
+"""
+Content-hash deduplication registry for document ingestion.
+"""
+
+import logging
+from typing import Dict, Any, Iterable, List, Optional
+from db.state_store import StateStore, get_state_store
+
+logger = logging.getLogger(__name__)
+
+# State store namespaces
+DOCUMENTS = "dedup_documents"        # file hash -> document record
+DOCUMENT_IDS = "dedup_document_ids"  # document id -> file hash
+CHUNKS = "dedup_chunks"              # chunk hash -> {"id", "refs", "docs"}
+TOTALS = "dedup_totals"              # "savings" -> cumulative counters
+CHUNK_ORDER = "dedup_chunk_order"    # document id -> vector ids in document order
+
+
+class DedupRegistry:
+    """
+    Tracks content hashes of ingested files and chunks.
+
+    Two levels are kept:
+    - file hash -> document record, so re-uploading a known file skips ingestion.
+    - chunk hash -> vector id, so identical chunks reuse an existing vector.
+
+    Each document record lists its chunks in order as
+    [chunk_hash, page_number, char_start, char_end, chunk_index], and every
+    chunk counts and lists the documents referencing it, so a new document
+    version can be diffed, vectors no document uses any more can be deleted
+    and a shared vector's metadata can name all of its documents. The
+    vector ids of each document in chunk order are kept too, so retrieval
+    can look up a hit's neighbours without another vector query.
+
+    State lives in a StateStore so every worker process sees the same registry.
+    """
+
+    def __init__(self, store: Optional[StateStore] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            store: State store to keep the registry in (defaults to the shared one).
+        """
+        self.store = store or get_state_store()
+
+    def find_document(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previously ingested document by its file hash.
+
+        Args:
+            file_hash: Hash of the raw uploaded bytes.
+
+        Returns:
+            Stored document record, or None if unknown.
+        """
+        return self.store.get(DOCUMENTS, file_hash)
+
+    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the current version of a document by its id.
+
+        Args:
+            document_id: Document id returned at upload.
+
+        Returns:
+            Stored document record (including its file_hash), or None.
+        """
+        with self.store.transaction():
+            file_hash = self.store.get(DOCUMENT_IDS, document_id)
+            if file_hash is None:
+                return None
+            return dict(self.store.get(DOCUMENTS, file_hash), file_hash=file_hash)
+
+    def register_document(self, file_hash: str, record: Dict[str, Any]):
+        """
+        Remember an ingested document and reference its chunks.
+
+        Args:
+            file_hash: Hash of the raw uploaded bytes.
+            record: Document record (id, filename, chunks_count, version, chunks).
+        """
+        with self.store.transaction():
+            self.store.set(DOCUMENTS, file_hash, record)
+            self.store.set(DOCUMENT_IDS, record["id"], file_hash)
+            self._add_refs({chunk[0] for chunk in record.get("chunks", [])}, record["id"], 1)
+            self._set_order(record)
+
+    def replace_document(self, document_id: str, file_hash: str, record: Dict[str, Any]) -> List[str]:
+        """
+        Swap in a new version of a document.
+
+        Args:
+            document_id: Id of the document being updated.
+            file_hash: Hash of the new version's raw bytes.
+            record: New document record.
+
+        Returns:
+            Vector ids no longer referenced by any document.
+        """
+        with self.store.transaction():
+            old_hash = self.store.get(DOCUMENT_IDS, document_id)
+            old_record = self.store.get(DOCUMENTS, old_hash)
+            self.store.delete(DOCUMENTS, old_hash)
+
+            self.store.set(DOCUMENTS, file_hash, record)
+            self.store.set(DOCUMENT_IDS, document_id, file_hash)
+            new_hashes = {chunk[0] for chunk in record["chunks"]}
+            old_hashes = {chunk[0] for chunk in old_record["chunks"]}
+            # Chunks both versions use keep their reference (and owner entry) as is
+            self._add_refs(new_hashes - old_hashes, document_id, 1)
+            self._set_order(record)
+            return self._add_refs(old_hashes - new_hashes, document_id, -1)
+
+    def _set_order(self, record: Dict[str, Any]):
+        """Store the document's vector ids in chunk order (chunks must be registered)."""
+        hashes = [chunk[0] for chunk in record.get("chunks", [])]
+        ids = self.find_chunks(set(hashes))
+        self.store.set(CHUNK_ORDER, record["id"], [ids.get(h) for h in hashes])
+
+    def chunk_order(self, document_id: str) -> Optional[List[Optional[str]]]:
+        """
+        Vector ids of a document's chunks, in document order.
+
+        Args:
+            document_id: Document id returned at upload.
+
+        Returns:
+            Ids indexed by chunk_index, or None for an unknown document.
+        """
+        return self.store.get(CHUNK_ORDER, document_id)
+
+    def _add_refs(self, chunk_hashes: Iterable[str], document_id: str, delta: int) -> List[str]:
+        """Add (+1) or remove (-1) a referencing document; drop and return ids of chunks left unreferenced."""
+        entries = self.store.get_many(CHUNKS, chunk_hashes)
+        orphaned = {h: entry["id"] for h, entry in entries.items() if entry["refs"] + delta <= 0}
+        updated = {}
+        for h, entry in entries.items():
+            if h in orphaned:
+                continue
+            # Chunks registered before owners were tracked start with an empty list
+            docs = [doc for doc in entry.get("docs", []) if doc != document_id]
+            updated[h] = {"id": entry["id"], "refs": entry["refs"] + delta,
+                          "docs": docs + [document_id] if delta > 0 else docs}
+        self.store.set_many(CHUNKS, updated)
+        self.store.delete_many(CHUNKS, orphaned)
+        return list(orphaned.values())
+
+    def find_chunks(self, chunk_hashes: Iterable[str]) -> Dict[str, str]:
+        """
+        Look up the vector ids of already indexed chunks.
+
+        Args:
+            chunk_hashes: Hashes of chunk texts.
+
+        Returns:
+            Mapping of chunk hash to vector id for the chunks that exist.
+        """
+        return {h: entry["id"] for h, entry in self.store.get_many(CHUNKS, chunk_hashes).items()}
+
+    def chunk_owners(self, chunk_hashes: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        List the documents referencing each chunk.
+
+        Args:
+            chunk_hashes: Hashes of chunk texts.
+
+        Returns:
+            Mapping of vector id to referencing document ids (oldest first)
+            for the chunks that exist.
+        """
+        return {entry["id"]: entry.get("docs", []) for entry in self.store.get_many(CHUNKS, chunk_hashes).values()}
+
+    def chunk_refs(self, chunk_hashes: Iterable[str]) -> Dict[str, int]:
+        """
+        Count the documents referencing each chunk.
+
+        Args:
+            chunk_hashes: Hashes of chunk texts.
+
+        Returns:
+            Mapping of chunk hash to reference count for the chunks that exist.
+        """
+        return {h: entry["refs"] for h, entry in self.store.get_many(CHUNKS, chunk_hashes).items()}
+
+    def find_chunk(self, chunk_hash: str) -> Optional[str]:
+        """
+        Look up the vector id of an already indexed chunk.
+
+        Args:
+            chunk_hash: Hash of the chunk text.
+
+        Returns:
+            Existing vector id, or None if the chunk is new.
+        """
+        return self.find_chunks([chunk_hash]).get(chunk_hash)
+
+    def register_chunks(self, chunk_ids: Dict[str, str]):
+        """
+        Remember newly indexed chunks.
+
+        Args:
+            chunk_ids: Mapping of chunk hash to vector id.
+        """
+        with self.store.transaction():
+            existing = self.store.get_many(CHUNKS, chunk_ids)
+            self.store.set_many(CHUNKS, {
+                chunk_hash: {"id": vector_id, "refs": 0, "docs": []}
+                for chunk_hash, vector_id in chunk_ids.items()
+                if chunk_hash not in existing
+            })
+
+    def record_savings(self, bytes_saved: int, embeddings_saved: int):
+        """
+        Accumulate the work avoided by deduplication.
+
+        Args:
+            bytes_saved: Bytes that did not need to be processed.
+            embeddings_saved: Embeddings that did not need to be computed.
+        """
+        if not bytes_saved and not embeddings_saved:
+            return
+        with self.store.transaction():
+            totals = self.store.get(TOTALS, "savings", {"bytes_saved": 0, "embeddings_saved": 0})
+            totals["bytes_saved"] += bytes_saved
+            totals["embeddings_saved"] += embeddings_saved
+            self.store.set(TOTALS, "savings", totals)
+        logger.info(f"Dedup saved {bytes_saved} bytes and {embeddings_saved} embeddings")
+
+    def stats(self) -> Dict[str, int]:
+        """Return registry size and cumulative savings."""
+        totals = self.store.get(TOTALS, "savings", {"bytes_saved": 0, "embeddings_saved": 0})
+        return {
+            "documents": len(self.store.items(DOCUMENTS)),
+            "chunks": len(self.store.items(CHUNKS)),
+            **totals,
+        }
+
+    def clear(self):
+        """Forget all documents and chunks (e.g. after the index is wiped)."""
+        with self.store.transaction():
+            for namespace in (DOCUMENTS, DOCUMENT_IDS, CHUNKS, CHUNK_ORDER):
+                self.store.clear(namespace)
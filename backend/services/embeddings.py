@@ -4,7 +4,9 @@ Embeddings service using SentenceTransformers.
 
 from typing import List
 import asyncio
+import numpy as np
 from sentence_transformers import SentenceTransformer
+from utils import tracing
 
 
 class EmbeddingService:
@@ -19,19 +21,33 @@ class EmbeddingService:
         """
         self.model = SentenceTransformer(model_name)
 
-    def encode(self, texts: List[str]) -> List[List[float]]:
+    def encode(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """
         Generate embeddings for a list of texts.
 
         Args:
             texts: List of text strings to encode.
+            batch_size: Number of texts the model encodes per forward pass.
 
         Returns:
             List of embedding vectors.
         """
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        if tracing.is_tracing():
+            return self._encode_traced(texts, batch_size)
+        embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
         return embeddings.tolist()
 
+    def _encode_traced(self, texts: List[str], batch_size: int) -> List[List[float]]:
+        """Encode batch by batch so each batch shows up as a trace span."""
+        parts = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            with tracing.span("embed.batch", size=len(batch), chars=sum(len(t) for t in batch)):
+                parts.append(self.model.encode(batch, batch_size=batch_size, convert_to_numpy=True))
+        if not parts:
+            return []
+        return np.vstack(parts).tolist()
+
     def encode_single(self, text: str) -> List[float]:
         """
         Generate embedding for a single text.
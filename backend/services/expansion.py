@@ -0,0 +1,155 @@
+"""
+Adjacent-chunk context expansion.
+
+A hit that sits at a chunk boundary carries only half of the passage
+that answers the question. For the top hits, the neighbouring chunks
+(by chunk_index) are looked up in the registry's per-document chunk
+order and fetched by id, with no further similarity queries. Chunks are
+then stitched into one window per passage (chunk overlap removed),
+overlapping windows are merged, and everything is packed in rank order
+under the context budget.
+"""
+
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _stitch(document_id: str, pieces: List[Dict[str, Any]]) -> str:
+    """Join consecutive chunks of one document, dropping the text they share."""
+    text = ""
+    previous = None
+    for metadata in pieces:
+        content = metadata.get("content", "")
+        if previous is None:
+            text = content
+        elif (metadata.get("document_id") == previous.get("document_id") == document_id
+              and metadata.get("page_number") == previous.get("page_number")
+              and metadata.get("char_start") is not None and previous.get("char_end") is not None):
+            # Offsets are within the page: the overlap is exactly previous end - this start
+            overlap = previous["char_end"] - metadata["char_start"]
+            text += content[overlap:] if overlap > 0 else " " + content
+        else:
+            # Offsets belong to another document (shared chunk) or page
+            text += "\n\n" + content
+        previous = metadata
+    return text
+
+
+class ContextExpander:
+    """Expands top hits with their neighbouring chunks under a character budget."""
+
+    def __init__(self, db_service, registry, window: int = 1, top_n: int = 3):
+        """
+        Initialize the expander.
+
+        Args:
+            db_service: Vector database (fetch by id is used, never query).
+            registry: DedupRegistry holding each document's chunk order.
+            window: Neighbours to add on each side of a hit.
+            top_n: Number of top hits to expand.
+        """
+        self.db_service = db_service
+        self.registry = registry
+        self.window = window
+        self.top_n = top_n
+
+    def expand(self, matches: List[Dict[str, Any]], max_chars: int) -> List[Dict[str, Any]]:
+        """
+        Replace top hits with their surrounding windows.
+
+        Args:
+            matches: Vector database matches, best first.
+            max_chars: Context budget in characters.
+
+        Returns:
+            Matches in the same shape, best first, whose contents fit in
+            max_chars together. An expanded match keeps the hit's id and
+            score; its metadata content is the window and "window" holds
+            the [first, last] chunk_index it covers.
+        """
+        matches = [match for match in matches if match.get("metadata", {}).get("content")]
+        ranges = self._window_ranges(matches[:self.top_n])
+        if not ranges:
+            return self._pack([(match, None) for match in matches], max_chars)
+
+        # One fetch for every neighbour not already retrieved
+        known = {match["id"]: match["metadata"] for match in matches}
+        needed = {vector_id for *_, ids, _ in ranges for vector_id in ids if vector_id and vector_id not in known}
+        if needed:
+            fetched = self.db_service.fetch(list(needed))
+            known.update({vector_id: vector["metadata"] for vector_id, vector in fetched.items()})
+
+        # Every chunk a window covers maps to it, so retrieved copies are emitted once
+        windows: Dict[str, Dict[str, Any]] = {}
+        for document_id, first, last, ids, hit in ranges:
+            pieces = [known[vector_id] for vector_id in ids if vector_id in known]
+            window = {"id": hit["id"], "score": hit["score"], "metadata": {
+                **hit["metadata"], "content": _stitch(document_id, pieces), "window": [first, last]
+            }}
+            for vector_id in ids:
+                windows.setdefault(vector_id, window)
+
+        ordered = []
+        emitted = set()
+        for match in matches:
+            window = windows.get(match["id"])
+            if window is None:
+                ordered.append((match, None))
+            elif window["id"] not in emitted:
+                emitted.add(window["id"])
+                # If the window does not fit, the retrieved chunk alone may
+                ordered.append((window, match))
+        return self._pack(ordered, max_chars)
+
+    def _window_ranges(self, hits: List[Dict[str, Any]]) -> List[Tuple[str, int, int, List[Optional[str]], Dict]]:
+        """[document_id, first, last, ids, best hit] per merged window, best first."""
+        orders: Dict[str, Optional[List[Optional[str]]]] = {}
+        spans = []
+        for rank, hit in enumerate(hits):
+            metadata = hit["metadata"]
+            document_id, index = metadata.get("document_id"), metadata.get("chunk_index")
+            if document_id is None or index is None:
+                continue
+            if document_id not in orders:
+                orders[document_id] = self.registry.chunk_order(document_id)
+            order = orders[document_id]
+            # Stale or shared positions (the chunk moved) are not expanded
+            if not order or index >= len(order) or order[index] != hit["id"]:
+                continue
+            spans.append([document_id, max(0, index - self.window),
+                          min(len(order) - 1, index + self.window), rank, hit])
+
+        # Merge overlapping or touching windows of the same document; the better hit leads
+        spans.sort(key=lambda span: (span[0], span[1]))
+        merged = []
+        for span in spans:
+            last = merged[-1] if merged else None
+            if last and last[0] == span[0] and span[1] <= last[2] + 1:
+                last[2] = max(last[2], span[2])
+                if span[3] < last[3]:
+                    last[3], last[4] = span[3], span[4]
+            else:
+                merged.append(span)
+        merged.sort(key=lambda span: span[3])
+        return [
+            (document_id, first, last, orders[document_id][first:last + 1], hit)
+            for document_id, first, last, _, hit in merged
+        ]
+
+    @staticmethod
+    def _pack(ordered: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]], max_chars: int) -> List[Dict[str, Any]]:
+        """Keep matches in order while they fit; a window that doesn't fit falls back to its hit."""
+        packed = []
+        used = 0
+        for match, fallback in ordered:
+            for candidate in (match, fallback):
+                if candidate is None:
+                    continue
+                size = len(candidate["metadata"]["content"])
+                if used + size <= max_chars:
+                    packed.append(candidate)
+                    used += size
+                    break
+        return packed
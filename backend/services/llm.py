@@ -6,15 +6,58 @@ import os
 from groq import Groq
 
 
+def build_prompt(question: str, context: str) -> str:
+    """Strict RAG prompt: answer only from the given context."""
+    return f"""
+Answer the question using ONLY the information below.
+If the answer is not present, say:
+"I don't know based on the uploaded document."
+
+Context:
+{context}
+
+Question:
+{question}
+
+Instructions:
+- Answer in complete sentences
+- If summarizing, use bullet points
+"""
+
+
+def build_summary_prompt(text: str) -> str:
+    """Prompt for a short, factual summary of one section or document."""
+    return f"""
+Summarize the text below in at most 6 sentences.
+Keep names, numbers and conclusions; do not add anything that is not in the text.
+
+Text:
+{text}
+"""
+
+
+def build_rewrite_prompt(question: str, count: int) -> str:
+    """Prompt for alternative phrasings of a search question, one per line."""
+    return f"""
+Write {count} different search queries that would find the answer to the question below.
+Use other words and synonyms; keep each query short.
+Output only the queries, one per line, without numbering.
+
+Question:
+{question}
+"""
+
+
 class LLMService:
     def __init__(self, api_key: str):
         if not api_key:
             raise ValueError("GROQ_API_KEY not set")
 
-        self.client = Groq(api_key=api_key)
+        # GROQ_BASE_URL points the client at a proxy or local stand-in
+        self.client = Groq(api_key=api_key, base_url=os.getenv("GROQ_BASE_URL") or None)
         self.model = "llama-3.1-8b-instant"
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, max_tokens: int = 768) -> str:
         """
         Generate a full response from the LLM (non-streaming).
         """
@@ -26,7 +69,7 @@ class LLMService:
                 {"role": "user", "content": prompt},
             ],
             temperature=0.2,
-            max_tokens=768,   # safe for Windows / low RAM
+            max_tokens=max_tokens,   # 768 default: safe for Windows / low RAM
             stream=False      # 🔒 FORCE full response
         )
 
@@ -0,0 +1,291 @@
+"""
+Bounded conversation memory for RAG sessions.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from db.state_store import StateStore, MemoryStateStore, SQLiteStateStore
+
+logger = logging.getLogger(__name__)
+
+# State store namespace for spilled / shared sessions
+CONVERSATIONS = "conversations"
+# Shared sessions are swept (TTL and max_sessions) at most this often per worker
+SHARED_SWEEP_SECONDS = 60.0
+
+# Compact role codes
+ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+
+
+class _Session:
+    """One conversation: role codes in a str, texts in a parallel list."""
+
+    __slots__ = ("roles", "texts", "tokens", "last_access")
+
+    def __init__(self, roles: str = "", texts: Optional[List[str]] = None, last_access: float = 0.0):
+        self.roles = roles
+        self.texts = texts or []
+        self.tokens = sum(_count_tokens(text) for text in self.texts)
+        self.last_access = last_access
+
+    def to_record(self) -> Dict[str, Any]:
+        return {"r": self.roles, "t": self.texts, "a": self.last_access}
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "_Session":
+        return cls(record["r"], record["t"], record["a"])
+
+
+def _count_tokens(text: str) -> int:
+    """Cheap whitespace token estimate."""
+    return text.count(" ") + 1
+
+
+class ConversationMemory:
+    """
+    Per-session history with LRU and idle-TTL eviction and per-session caps.
+
+    Sessions are kept in a compact form (a role-code string plus a list of
+    texts) instead of a list of {"role", "content"} dicts. Only the newest
+    max_turns user/assistant pairs and at most max_tokens tokens are kept.
+
+    With a spill store, sessions evicted by LRU are written there and
+    restored on their next access instead of being lost. With shared=True
+    (several worker processes), the store is the only copy: every read and
+    write goes through it and nothing is cached in-process; the TTL and
+    max_sessions are then enforced by periodically sweeping the store.
+
+    Safe to call from several threads: in-process sessions and counters are
+    guarded by one lock, held for a whole read-modify-write of a session.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: float = 3600.0,
+        max_turns: int = 20,
+        max_tokens: int = 4000,
+        store: Optional[StateStore] = None,
+        shared: bool = False,
+    ):
+        """
+        Initialize the memory.
+
+        Args:
+            max_sessions: Sessions kept before LRU eviction (in the store, if shared).
+            ttl_seconds: Idle time after which a session expires.
+            max_turns: User/assistant pairs kept per session.
+            max_tokens: Approximate tokens kept per session.
+            store: Optional store for spilled (or, if shared, all) sessions.
+            shared: Keep sessions only in the store, for multi-worker serving.
+        """
+        if shared and store is None:
+            raise ValueError("Shared conversation memory needs a store")
+
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.store = store
+        self.shared = shared
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._counters = {"evicted_lru": 0, "evicted_ttl": 0, "spilled": 0, "restored": 0}
+        # Reentrant: _load and _remember count evictions under the caller's lock
+        self._lock = threading.RLock()
+        # Spilled sessions nobody comes back for are swept once per TTL;
+        # shared ones more often, as the sweep also enforces max_sessions there
+        self._sweep_seconds = min(ttl_seconds, SHARED_SWEEP_SECONDS) if shared else ttl_seconds
+        self._next_sweep = time.time() + self._sweep_seconds
+
+    @classmethod
+    def from_env(cls, state_store: StateStore) -> "ConversationMemory":
+        """
+        Build from CONVERSATION_* settings.
+
+        A shared (non in-process) state store means several workers, so
+        sessions live in it. Otherwise CONVERSATION_SPILL_PATH optionally
+        names a SQLite file for cold sessions.
+        """
+        shared = not isinstance(state_store, MemoryStateStore)
+        spill_path = os.getenv("CONVERSATION_SPILL_PATH")
+        store = state_store if shared else (SQLiteStateStore(spill_path) if spill_path else None)
+        return cls(
+            max_sessions=int(os.getenv("CONVERSATION_MAX_SESSIONS", 1000)),
+            ttl_seconds=float(os.getenv("CONVERSATION_TTL_SECONDS", 3600)),
+            max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", 20)),
+            max_tokens=int(os.getenv("CONVERSATION_MAX_TOKENS", 4000)),
+            store=store,
+            shared=shared,
+        )
+
+    def get(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Return a session's history as {"role", "content"} dicts (oldest first).
+
+        Args:
+            session_id: Conversation session id.
+        """
+        if self.shared:
+            session = self._load(session_id, time.time())
+        else:
+            with self._lock:
+                session = self._load(session_id, time.time())
+                if session is not None:
+                    self._remember(session_id, session)
+        if session is None:
+            return []
+        return [
+            {"role": ROLE_NAMES[code], "content": text}
+            for code, text in zip(session.roles, session.texts)
+        ]
+
+    def append(self, session_id: str, role: str, content: str):
+        """
+        Add one message to a session, enforcing the turn and token caps.
+
+        Args:
+            session_id: Conversation session id.
+            role: "user", "assistant" or "system".
+            content: Message text.
+        """
+        self.extend(session_id, [(role, content)])
+
+    def extend(self, session_id: str, messages: List[tuple]):
+        """Add several (role, content) messages to a session at once."""
+        now = time.time()
+        if self.shared:
+            with self.store.transaction():
+                session = self._load(session_id, now) or _Session()
+                self._add(session, messages, now)
+                self.store.set(CONVERSATIONS, session_id, session.to_record())
+            self.evict_expired()
+            return
+
+        with self._lock:
+            session = self._load(session_id, now) or _Session()
+            self._add(session, messages, now)
+            self._remember(session_id, session)
+
+    def _add(self, session: _Session, messages: List[tuple], now: float):
+        session.roles += "".join(ROLE_CODES[role] for role, _ in messages)
+        session.texts.extend(content for _, content in messages)
+        session.tokens += sum(_count_tokens(content) for _, content in messages)
+        session.last_access = now
+
+        # Drop the oldest messages beyond the caps (always keep the newest)
+        drop = max(len(session.texts) - 2 * self.max_turns, 0)
+        tokens = session.tokens - sum(_count_tokens(t) for t in session.texts[:drop])
+        while drop < len(session.texts) - 1 and tokens > self.max_tokens:
+            tokens -= _count_tokens(session.texts[drop])
+            drop += 1
+        if drop:
+            session.roles = session.roles[drop:]
+            del session.texts[:drop]
+            session.tokens = tokens
+
+    def _load(self, session_id: str, now: float) -> Optional[_Session]:
+        """Find a live session in memory or the store; expired ones are dropped."""
+        session = None if self.shared else self._sessions.pop(session_id, None)
+        stored = False
+        if session is None and self.store is not None:
+            record = self.store.get(CONVERSATIONS, session_id)
+            if record is not None:
+                session = _Session.from_record(record)
+                stored = True
+
+        if session is None:
+            return None
+        if now - session.last_access > self.ttl_seconds:
+            if stored:
+                self.store.delete(CONVERSATIONS, session_id)
+            with self._lock:
+                self._counters["evicted_ttl"] += 1
+            return None
+        if stored and not self.shared:
+            # Back in process: the in-memory copy is the only one again
+            self.store.delete(CONVERSATIONS, session_id)
+            with self._lock:
+                self._counters["restored"] += 1
+        session.last_access = now
+        return session
+
+    def _remember(self, session_id: str, session: _Session):
+        """Insert as most recently used, evicting expired then LRU sessions (caller holds the lock)."""
+        self._sessions[session_id] = session
+        self.evict_expired()
+        while len(self._sessions) > self.max_sessions:
+            cold_id, cold = self._sessions.popitem(last=False)
+            self._counters["evicted_lru"] += 1
+            if self.store is not None:
+                self.store.set(CONVERSATIONS, cold_id, cold.to_record())
+                self._counters["spilled"] += 1
+                logger.debug(f"Spilled conversation {cold_id} to the store")
+
+    def evict_expired(self) -> int:
+        """
+        Drop sessions idle longer than the TTL.
+
+        Sessions in the store are swept too, at most once per sweep
+        interval; in shared mode the sweep also drops the least recently
+        used stored sessions beyond max_sessions.
+
+        Returns:
+            Number of sessions evicted.
+        """
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            expired = []
+            # Oldest first: stop at the first session still alive
+            for session_id, session in self._sessions.items():
+                if session.last_access >= cutoff:
+                    break
+                expired.append(session_id)
+            for session_id in expired:
+                del self._sessions[session_id]
+
+            evicted_lru = []
+            if self.store is not None and now >= self._next_sweep:
+                self._next_sweep = now + self._sweep_seconds
+                # One transaction, so other workers' writes land before or after the sweep
+                with self.store.transaction():
+                    stored_expired, live = [], []
+                    for session_id, record in self.store.items(CONVERSATIONS):
+                        if record["a"] < cutoff:
+                            stored_expired.append(session_id)
+                        else:
+                            live.append((record["a"], session_id))
+                    if self.shared and len(live) > self.max_sessions:
+                        live.sort()
+                        evicted_lru = [session_id for _, session_id in live[:len(live) - self.max_sessions]]
+                    self.store.delete_many(CONVERSATIONS, stored_expired + evicted_lru)
+                expired.extend(stored_expired)
+
+            self._counters["evicted_ttl"] += len(expired)
+            self._counters["evicted_lru"] += len(evicted_lru)
+            return len(expired) + len(evicted_lru)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return session counts, approximate bytes held and eviction counters."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            counters = dict(self._counters)
+        approx_bytes = sum(
+            sys.getsizeof(s.roles) + sys.getsizeof(s.texts) + sum(sys.getsizeof(t) for t in s.texts)
+            for s in sessions
+        )
+        return {
+            "sessions": len(sessions),
+            "messages": sum(len(s.texts) for s in sessions),
+            "tokens": sum(s.tokens for s in sessions),
+            "approx_bytes": approx_bytes,
+            "max_sessions": self.max_sessions,
+            "shared": self.shared,
+            **counters,
+        }
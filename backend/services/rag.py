@@ -4,11 +4,15 @@ RAG (Retrieval-Augmented Generation) pipeline service.
 
 import logging
 import time
-from typing import List, Dict, Any, Optional
-from models.schemas import DocumentChunk, ChatRequest, ChatResponse, Source
+from typing import List, Dict, Any, Optional, Tuple
+from models.schemas import ChatRequest, ChatResponse, Source
+from models.records import Candidate
 from services.embeddings import EmbeddingService
 from services.retriever import RetrieverService
-from services.llm import LLMService
+from services.llm import LLMService, build_prompt
+from services.memory import ConversationMemory
+from db.state_store import StateStore, get_state_store
+from utils.metrics import CHAT_STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +20,8 @@ logger = logging.getLogger(__name__)
 class RAGService:
     """Service for RAG pipeline combining retrieval and generation."""
 
-    def __init__(self, embedding_service: EmbeddingService, db_service, llm_service: LLMService):
+    def __init__(self, embedding_service: EmbeddingService, db_service, llm_service: LLMService,
+                 state_store: Optional[StateStore] = None, memory: Optional[ConversationMemory] = None):
         """
         Initialize the RAG service.
 
@@ -24,11 +29,14 @@ class RAGService:
             embedding_service: Embedding service instance.
             db_service: Database service instance (Pinecone).
             llm_service: LLM service instance.
+            state_store: Shared state store (defaults to the process-wide store).
+            memory: Conversation memory (defaults to one configured from env).
         """
         self.embedding_service = embedding_service
         self.db_service = db_service
         self.llm_service = llm_service
-        self.conversation_memory: Dict[str, List[Dict[str, str]]] = {}
+        self.state_store = state_store or get_state_store()
+        self.memory = memory or ConversationMemory.from_env(self.state_store)
 
     def process_query(self, request: ChatRequest) -> ChatResponse:
         """
@@ -40,75 +48,71 @@ class RAGService:
         Returns:
             Chat response with generated answer and sources.
         """
+        return self.process_query_timed(request)[0]
+
+    def process_query_timed(self, request: ChatRequest) -> Tuple[ChatResponse, Dict[str, float]]:
+        """
+        Process a chat query and report how long each stage took.
+
+        Args:
+            request: Chat request with message and session info.
+
+        Returns:
+            Tuple of (chat response, seconds per stage: embed, vector_query,
+            context_build, llm, total).
+        """
         start_time = time.time()
         session_id = request.session_id or self._generate_session_id()
 
-        # Get or initialize conversation memory
-        if session_id not in self.conversation_memory:
-            self.conversation_memory[session_id] = []
-
         logger.info(f"Processing query for session {session_id}: {request.message[:100]}...")
 
         # Generate embedding for the query
         embed_start = time.time()
         query_embedding = self.embedding_service.encode_single(request.message)
         embed_time = time.time() - embed_start
+        CHAT_STAGE_SECONDS.labels("embed").observe(embed_time)
         logger.debug(f"Embedding generated in {embed_time:.3f}s")
 
         # Retrieve relevant chunks with threshold
         retrieve_start = time.time()
         results = self.db_service.query(query_embedding, request.top_k)
-        
+        query_done = time.time()
+        CHAT_STAGE_SECONDS.labels("vector_query").observe(query_done - retrieve_start)
+
         # Filter by threshold
-        chunks = []
-        scores = []
-        for result in results:
-            if result["score"] >= request.similarity_threshold:
-                chunk = DocumentChunk(
-                    id=result["id"],
-                    document_id=result["metadata"]["document_id"],
-                    content=result["metadata"]["content"],
-                    metadata={
-                        "filename": result["metadata"]["filename"],
-                        "chunk_index": result["metadata"]["chunk_index"]
-                    },
-                    embedding=query_embedding
-                )
-                chunks.append(chunk)
-                scores.append(result["score"])
-        
+        chunks = [
+            Candidate.from_match(result) for result in results
+            if result["score"] >= request.similarity_threshold
+        ]
+        scores = [chunk.score for chunk in chunks]
+
         retrieve_time = time.time() - retrieve_start
         logger.info(f"Retrieved {len(chunks)} chunks in {retrieve_time:.3f}s")
 
         # Prepare context from retrieved chunks
-        context_texts = [chunk.content for chunk in chunks]
+        context = "\n\n".join(chunk.content for chunk in chunks)
+        context_time = time.time() - query_done
+        CHAT_STAGE_SECONDS.labels("context_build").observe(context_time)
 
         # Generate response using LLM
         llm_start = time.time()
-        if context_texts:
-            llm_result = self.llm_service.generate_response(
-                request.message, 
-                context_texts, 
-                role=request.role
-            )
-            response_text = llm_result["response"]
-            token_usage = llm_result["token_usage"]
+        if context:
+            response_text = self.llm_service.generate(build_prompt(request.message, context))
         else:
             response_text = "I don't know based on the uploaded documents."
-            token_usage = 0
-        
+
         llm_time = time.time() - llm_start
-        logger.info(f"LLM response generated in {llm_time:.3f}s, tokens: {token_usage}")
+        CHAT_STAGE_SECONDS.labels("llm").observe(llm_time)
+        logger.info(f"LLM response generated in {llm_time:.3f}s")
 
         # Update conversation memory
-        self.conversation_memory[session_id].append({"role": "user", "content": request.message})
-        self.conversation_memory[session_id].append({"role": "assistant", "content": response_text})
+        self.memory.extend(session_id, [("user", request.message), ("assistant", response_text)])
 
         # Prepare structured sources
         sources = []
         for chunk, score in zip(chunks, scores):
             source = Source(
-                document_name=chunk.metadata.get("filename", "Unknown Document"),
+                document_name=chunk.metadata.get("filename") or "Unknown Document",
                 page_number=chunk.metadata.get("page_number"),
                 content=chunk.content[:300] + "..." if len(chunk.content) > 300 else chunk.content,
                 score=round(score, 3)
@@ -116,13 +120,30 @@ class RAGService:
             sources.append(source)
 
         total_time = time.time() - start_time
+        CHAT_STAGE_SECONDS.labels("total").observe(total_time)
         logger.info(f"Query processed in {total_time:.3f}s total")
 
-        return ChatResponse(
+        response = ChatResponse(
             response=response_text,
             sources=sources,
             session_id=session_id
         )
+        timings = {
+            "embed": embed_time,
+            "vector_query": query_done - retrieve_start,
+            "context_build": context_time,
+            "llm": llm_time,
+            "total": total_time,
+        }
+        return response, timings
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the conversation history of a session."""
+        return self.memory.get(session_id)
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Return conversation memory usage and eviction stats."""
+        return self.memory.stats()
 
     def _generate_session_id(self) -> str:
         """Generate a unique session ID."""
@@ -3,26 +3,121 @@ Retriever service for Pinecone-based document retrieval.
 """
 
 import logging
-from typing import List, Tuple
-from models.schemas import DocumentChunk
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from models.records import Candidate
 from db.pinecone_db import PineconeDatabase
+from utils.metrics import CHAT_STAGE_SECONDS
+from utils.tracing import bind_context
 
 logger = logging.getLogger(__name__)
 
+# Reciprocal-rank fusion constant: damps the weight of the very first ranks
+RRF_K = 60
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "do", "does", "did", "can", "could",
+    "should", "would", "will", "what", "which", "who", "whom", "when", "where", "why", "how", "of",
+    "in", "on", "at", "to", "for", "from", "by", "with", "about", "as", "into", "this", "that",
+    "these", "those", "it", "its", "there", "they", "them", "their", "he", "she", "his", "her", "i", "me", "my", "we", "our", "you", "your",
+    "please", "tell", "explain", "describe", "give", "show", "list", "document", "paper",
+}
+_QUESTION = re.compile(
+    r"^(?:what|who|which|where|when|why|how)(?:\s+(?:is|are|was|were|does|do|did|can|could|should|would|many|much))?\s+(.+)$",
+    re.IGNORECASE,
+)
+# "1. ", "2) ", "- " in front of LLM-listed queries
+_LIST_MARKER = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s*")
+
+
+def rewrite_query(question: str) -> List[str]:
+    """
+    Rule-based variants of a question, the original first.
+
+    Adds the question without its question phrase ("what is the refund
+    policy" -> "the refund policy"), its keywords, and each part of a
+    compound question ("x and y").
+    """
+    question = question.strip()
+    variants = [question]
+    text = question.rstrip("?!. ")
+    match = _QUESTION.match(text)
+    if match:
+        variants.append(match.group(1))
+    keywords = [word for word in re.findall(r"[\w-]+", text.lower()) if word not in _STOPWORDS]
+    if keywords:
+        variants.append(" ".join(keywords))
+        if "and" in keywords:
+            variants.extend(" ".join(part) for part in _split_on(keywords, "and") if len(part) > 1)
+    return _unique(variants)
+
+
+def _split_on(words: List[str], separator: str) -> List[List[str]]:
+    parts = [[]]
+    for word in words:
+        if word == separator:
+            parts.append([])
+        else:
+            parts[-1].append(word)
+    return parts
+
+
+def _unique(queries: List[str]) -> List[str]:
+    seen = set()
+    unique = []
+    for query in queries:
+        key = " ".join(query.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge ranked match lists: each match scores sum(1 / (k + rank)).
+
+    Returns:
+        Matches ordered by fused score. "score" keeps the best similarity
+        the match had in any list, "fused_score" holds the fusion score.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            entry = fused.get(match["id"])
+            if entry is None:
+                entry = fused[match["id"]] = {
+                    "id": match["id"], "score": match["score"],
+                    "metadata": match.get("metadata") or {}, "fused_score": 0.0,
+                }
+            entry["fused_score"] += 1.0 / (k + rank)
+            entry["score"] = max(entry["score"], match["score"])
+    return sorted(fused.values(), key=lambda entry: entry["fused_score"], reverse=True)
+
 
 class RetrieverService:
     """Service for retrieving relevant documents using Pinecone."""
 
-    def __init__(self, pinecone_db: PineconeDatabase):
+    def __init__(self, pinecone_db: PineconeDatabase, embedding_service=None, llm_service=None,
+                 max_queries: int = 4, max_workers: int = 4):
         """
         Initialize the retriever service.
 
         Args:
             pinecone_db: Pinecone database instance.
+            embedding_service: Embedding service, needed by retrieve_multi.
+            llm_service: LLM service for generated query variants (optional).
+            max_queries: Cap on query variants per question, original included.
+            max_workers: Vector queries run concurrently.
         """
         self.pinecone_db = pinecone_db
+        self.embedding_service = embedding_service
+        self.llm_service = llm_service
+        self.max_queries = max_queries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retriever")
 
-    def retrieve(self, query_embedding: List[float], top_k: int = 5, similarity_threshold: float = 0.5) -> Tuple[List[DocumentChunk], List[float]]:
+    def retrieve(self, query_embedding: List[float], top_k: int = 5, similarity_threshold: float = 0.5) -> Tuple[List[Candidate], List[float]]:
         """
         Retrieve top-k relevant document chunks with similarity threshold filtering.
 
@@ -39,44 +134,100 @@ class RetrieverService:
         
         # Retrieve more candidates for re-ranking
         candidates_k = min(top_k * 2, 50)  # Retrieve up to 50 for re-ranking
-        results = self.pinecone_db.query(query_embedding, candidates_k)
-        
-        # Convert to DocumentChunk
-        all_chunks = []
-        all_scores = []
-        for result in results:
-            chunk = DocumentChunk(
-                id=result["id"],
-                document_id=result["metadata"]["document_id"],
-                content=result["metadata"]["content"],
-                metadata={
-                    "filename": result["metadata"]["filename"],
-                    "chunk_index": result["metadata"]["chunk_index"]
-                },
-                embedding=query_embedding  # Not needed, but schema requires
-            )
-            all_chunks.append(chunk)
-            all_scores.append(result["score"])
+        with CHAT_STAGE_SECONDS.labels("vector_query").time():
+            results = self.pinecone_db.query(query_embedding, candidates_k)
         
-        # Filter by threshold
-        filtered_chunks = []
-        filtered_scores = []
-        for chunk, score in zip(all_chunks, all_scores):
-            if score >= similarity_threshold:
-                filtered_chunks.append(chunk)
-                filtered_scores.append(score)
+        # Filter by threshold before building any records
+        kept = [result for result in results if result["score"] >= similarity_threshold]
         
-        # Re-rank: sort by score descending (already sorted by FAISS, but ensure)
-        combined = sorted(zip(filtered_chunks, filtered_scores), key=lambda x: x[1], reverse=True)
-        chunks, scores = zip(*combined) if combined else ([], [])
-        
-        # Take top_k
-        chunks = list(chunks)[:top_k]
-        scores = list(scores)[:top_k]
+        # Re-rank: sort by score descending (already sorted by the index, but ensure)
+        kept.sort(key=lambda result: result["score"], reverse=True)
+        chunks = [Candidate.from_match(result) for result in kept[:top_k]]
+        scores = [chunk.score for chunk in chunks]
         
         latency = time.time() - start_time
         logger.info(f"Retrieval completed in {latency:.3f}s. Retrieved {len(chunks)} chunks with threshold {similarity_threshold}")
         for i, (chunk, score) in enumerate(zip(chunks, scores)):
             logger.debug(f"Chunk {i+1}: score={score:.3f}, doc={chunk.metadata.get('filename', 'unknown')}")
         
-        return chunks, scores
\ No newline at end of file
+        return chunks, scores
+
+    def query_variants(self, question: str, use_llm: bool = False) -> List[str]:
+        """
+        Query variants of a question, the original first, at most max_queries.
+
+        Args:
+            question: User question.
+            use_llm: Also ask the LLM for rephrasings (one extra LLM call).
+
+        Returns:
+            Distinct query strings.
+        """
+        variants = rewrite_query(question)
+        if use_llm and self.llm_service is not None and self.max_queries > 1:
+            from services.llm import build_rewrite_prompt
+            try:
+                generated = self.llm_service.generate(
+                    build_rewrite_prompt(question, self.max_queries - 1), max_tokens=128
+                )
+                # LLM phrasings rank above the rule-based ones when the cap bites
+                lines = [_LIST_MARKER.sub("", line).strip() for line in generated.splitlines()]
+                variants = variants[:1] + [line for line in lines if line] + variants[1:]
+            except Exception as e:
+                logger.warning(f"Query rewriting by the LLM failed: {e}")
+        return _unique(variants)[:self.max_queries]
+
+    def search_many(self, query_embeddings: List[List[float]], top_k: int,
+                    filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Run one vector query per embedding concurrently; results in input order."""
+        if len(query_embeddings) == 1:
+            return [self.pinecone_db.query(query_embeddings[0], top_k, filter)]
+        futures = [
+            self._executor.submit(bind_context(self.pinecone_db.query, embedding, top_k, filter))
+            for embedding in query_embeddings
+        ]
+        return [future.result() for future in futures]
+
+    def search_fused(self, query_embeddings: List[List[float]], top_k: int,
+                     filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Concurrent queries for every variant embedding, merged by reciprocal-rank fusion."""
+        with CHAT_STAGE_SECONDS.labels("vector_query").time():
+            result_lists = self.search_many(query_embeddings, top_k, filter)
+        return reciprocal_rank_fusion(result_lists)[:top_k]
+
+    def retrieve_multi(self, question: str, top_k: int = 5, similarity_threshold: float = 0.5,
+                       use_llm: bool = False, filter: Optional[Dict[str, Any]] = None) -> Tuple[List[Candidate], List[float]]:
+        """
+        Multi-query retrieval: variants embedded in one batch, searched
+        concurrently, merged with reciprocal-rank fusion.
+
+        The queries run in parallel, so the added latency is about one
+        vector round-trip (plus one LLM call if use_llm).
+
+        Args:
+            question: User question.
+            top_k: Number of top results to return.
+            similarity_threshold: Minimum best similarity to include.
+            use_llm: Add LLM-generated variants.
+            filter: Metadata filter applied to every query.
+
+        Returns:
+            Tuple of (chunks, fused scores), best first. Each chunk's score
+            is its best similarity over the variants.
+        """
+        import time
+        start_time = time.time()
+
+        variants = self.query_variants(question, use_llm)
+        with CHAT_STAGE_SECONDS.labels("embed").time():
+            embeddings = self.embedding_service.encode(variants)
+
+        candidates_k = min(top_k * 2, 50)
+        fused = self.search_fused(embeddings, candidates_k, filter)
+        kept = [match for match in fused if match["score"] >= similarity_threshold][:top_k]
+        chunks = [Candidate.from_match(match) for match in kept]
+        scores = [match["fused_score"] for match in kept]
+
+        logger.info(f"Multi-query retrieval over {len(variants)} variants completed in "
+                    f"{time.time() - start_time:.3f}s. Retrieved {len(chunks)} chunks")
+        return chunks, scores
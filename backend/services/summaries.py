@@ -0,0 +1,238 @@
+"""
+Summary level of the index for long documents.
+
+After a document is ingested, its chunks are grouped into sections of
+consecutive chunks. Each section is summarized by the LLM, the section
+summaries are summarized again into one document summary, and all of
+them are embedded (one encode call) into a separate vector namespace.
+Broad questions ("summarize this document", "what are the key
+findings?") are answered from this level with one small prompt instead
+of ten arbitrary chunks. When such a question is clearly about one
+section rather than the whole document, it drills down: that section's
+chunks are added to the summaries.
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from db.state_store import StateStore, get_state_store
+from models.records import ChunkRecord
+
+logger = logging.getLogger(__name__)
+
+# State store namespace: document id -> {"ids", "sections", "built_at"}
+SUMMARIES = "summaries"
+
+# Text of one section sent to the LLM
+MAX_SECTION_CHARS = 6000
+
+_OVERVIEW = re.compile(
+    r"\b(summar\w*|overview|outline|tl;?dr|gist|recap"
+    r"|main (points?|ideas?|topics?|themes?|arguments?)"
+    r"|key (points?|takeaways?|findings?|ideas?)"
+    r"|what (is|are) (this|the) (document|paper|file|report|pdf)s? about"
+    r"|what does (this|the) (document|paper|file|report|pdf) (cover|discuss|say))\b",
+    re.IGNORECASE,
+)
+
+
+def is_overview_question(question: str) -> bool:
+    """Whether a question asks about a document as a whole."""
+    return bool(_OVERVIEW.search(question))
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / norm if norm else 0.0
+
+
+class SummaryIndex:
+    """Builds and queries section and document summaries in their own vector namespace."""
+
+    def __init__(self, embedding_service, db_service, llm_service, store: Optional[StateStore] = None,
+                 section_chunks: int = 6, max_workers: int = 2, chunk_db=None, registry=None):
+        """
+        Initialize the summary index.
+
+        Args:
+            embedding_service: Embedding service instance.
+            db_service: Vector database for summaries (separate from chunks).
+            llm_service: LLM service used to write the summaries.
+            store: State store tracking each document's summary vectors.
+            section_chunks: Consecutive chunks per section.
+            max_workers: Concurrent LLM calls while summarizing sections.
+            chunk_db: Vector database holding the chunks, for drill-down.
+            registry: DedupRegistry with each document's chunk order, for drill-down.
+        """
+        self.embedding_service = embedding_service
+        self.db_service = db_service
+        self.llm_service = llm_service
+        self.store = store or get_state_store()
+        self.section_chunks = section_chunks
+        self.max_workers = max_workers
+        self.chunk_db = chunk_db
+        self.registry = registry
+
+    def _summarize(self, text: str) -> str:
+        # Lazy: services.llm pulls in the Groq client, which chat's import must not
+        from services.llm import build_summary_prompt
+        return self.llm_service.generate(build_summary_prompt(text[:MAX_SECTION_CHARS]), max_tokens=256)
+
+    def build(self, document_id: str, filename: str, chunks: List[str]) -> int:
+        """
+        Summarize a document and index its summaries, replacing older ones.
+
+        Args:
+            document_id: Document id.
+            filename: Original filename.
+            chunks: Chunk texts in document order.
+
+        Returns:
+            Number of summary vectors written (0 if the document was
+            removed, e.g. by a reset, before they were ready).
+        """
+        if not self._exists(document_id):
+            return 0
+        start = time.time()
+        sections: List[Tuple[int, int]] = [
+            (first, min(first + self.section_chunks, len(chunks)) - 1)
+            for first in range(0, len(chunks), self.section_chunks)
+        ]
+        if not sections:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            section_summaries = list(executor.map(
+                lambda span: self._summarize("\n\n".join(chunks[span[0]:span[1] + 1])), sections
+            ))
+        # A single section already is the whole document
+        document_summary = (
+            self._summarize("\n\n".join(section_summaries)) if len(sections) > 1 else section_summaries[0]
+        )
+
+        texts = [document_summary] + section_summaries
+        embeddings = self.embedding_service.encode(texts)
+        base = {"document_id": document_id, "filename": filename}
+        records = [ChunkRecord(
+            f"{document_id}-summary", document_id, document_summary,
+            {**base, "content": document_summary, "scope": "document",
+             "chunk_start": 0, "chunk_end": len(chunks) - 1},
+            embeddings[0]
+        )]
+        for i, ((first, last), summary, embedding) in enumerate(zip(sections, section_summaries, embeddings[1:])):
+            records.append(ChunkRecord(
+                f"{document_id}-summary-{i}", document_id, summary,
+                {**base, "content": summary, "scope": "section", "section": i,
+                 "chunk_start": first, "chunk_end": last},
+                embedding
+            ))
+
+        # Summarizing takes a while: the document may be gone by now
+        if not self._exists(document_id):
+            logger.info(f"Dropped summaries of {document_id}: the document was removed meanwhile")
+            return 0
+        self.remove(document_id)
+        self.db_service.upsert_chunks(records)
+        self.store.set(SUMMARIES, document_id, {
+            "ids": [record.id for record in records],
+            "sections": len(sections),
+            "built_at": time.time(),
+        })
+        # A reset between the check and the upsert would leave them behind
+        if not self._exists(document_id):
+            self.remove(document_id)
+            return 0
+        logger.info(f"Summarized {document_id} into {len(sections)} sections in {time.time() - start:.1f}s")
+        return len(records)
+
+    def _exists(self, document_id: str) -> bool:
+        """Whether the document is still indexed (always, without a registry)."""
+        return self.registry is None or self.registry.get_document(document_id) is not None
+
+    def remove(self, document_id: str):
+        """Delete a document's summary vectors."""
+        previous = self.store.get(SUMMARIES, document_id)
+        if previous:
+            self.db_service.delete_vectors(previous["ids"])
+            self.store.delete(SUMMARIES, document_id)
+
+    def clear(self):
+        """Delete every summary (e.g. after the chunk index is wiped)."""
+        self.db_service.delete_all()
+        self.store.clear(SUMMARIES)
+
+    def query(self, query_embedding: List[float], top_k: int = 3,
+              document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find the summaries closest to a question.
+
+        For a single document, its document-level summary always leads,
+        followed by the best matching sections.
+
+        Args:
+            query_embedding: Question embedding.
+            top_k: Number of summaries to return.
+            document_id: Restrict to one document.
+
+        Returns:
+            Matches shaped like vector database matches; empty if no
+            summary exists yet.
+        """
+        if document_id is None:
+            return self.db_service.query(query_embedding, top_k)
+        if self.store.get(SUMMARIES, document_id) is None:
+            return []
+        matches = self.db_service.query(query_embedding, top_k, {"document_id": document_id})
+        leading = f"{document_id}-summary"
+        sections = [match for match in matches if match["id"] != leading]
+        # Fetched by id: it need not be among the closest summaries
+        document = self.db_service.fetch([leading]).get(leading)
+        if document is None:
+            return sections[:top_k]
+        return [{"id": leading, "score": _cosine(query_embedding, document["values"]),
+                 "metadata": document["metadata"]}] + sections[:top_k - 1]
+
+    def drill_down(self, query_embedding: List[float], matches: List[Dict[str, Any]],
+                   margin: float = 0.05) -> List[Dict[str, Any]]:
+        """
+        Chunks of the section a question is about, if it is about one.
+
+        The best matching section is drilled into when it matches the
+        question better than its document's summary by at least margin
+        ("summarize the evaluation"); a question about the whole document
+        is answered from the summaries alone.
+
+        Args:
+            query_embedding: Question embedding.
+            matches: Summary matches from query().
+            margin: Lead the section needs over the document summary.
+
+        Returns:
+            The section's chunks as vector database matches, best first;
+            empty if no drill-down is needed.
+        """
+        sections = [match for match in matches if match["metadata"].get("scope") == "section"]
+        if not sections or self.chunk_db is None or self.registry is None:
+            return []
+        best = max(sections, key=lambda match: match["score"])
+        document_id = best["metadata"]["document_id"]
+        document = next((match for match in matches if match["id"] == f"{document_id}-summary"), None)
+        if document is not None and best["score"] < document["score"] + margin:
+            return []
+
+        order = self.registry.chunk_order(document_id) or []
+        ids = [vector_id for vector_id in order[best["metadata"]["chunk_start"]:best["metadata"]["chunk_end"] + 1]
+               if vector_id]
+        chunks = [
+            {"id": vector_id, "score": _cosine(query_embedding, vector["values"]), "metadata": vector["metadata"]}
+            for vector_id, vector in self.chunk_db.fetch(ids).items()
+        ] if ids else []
+        chunks.sort(key=lambda match: match["score"], reverse=True)
+        logger.debug(f"Drilled down into section {best['metadata'].get('section')} of {document_id}: {len(chunks)} chunks")
+        return chunks
@@ -0,0 +1,221 @@
+"""
+Admission control and load shedding for expensive endpoints.
+
+Each limited endpoint gets a concurrency limit and a bounded FIFO queue.
+A request is shed up front instead of waiting without bound:
+- 429 when the queue is full,
+- 503 when the expected wait exceeds the client's time budget
+  (X-Request-Timeout header, in seconds, or the endpoint default).
+Both carry Retry-After. Cheap endpoints (/health, /ping, ...) are not
+limited, so they keep answering while /chat and /upload are saturated.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from utils import tracing
+
+_admission_controller = None
+
+# Weight of the newest request in the service-time moving average
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class EndpointLimiter:
+    """Concurrency limit plus bounded queue for one endpoint (event-loop local)."""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int,
+                 default_budget: Optional[float], initial_service_time: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_budget = default_budget
+        self.avg_service_time = initial_service_time
+        self.active = 0
+        self.waiters: deque = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+
+    def expected_wait(self, position: int) -> float:
+        """Expected seconds until the request at this queue position starts."""
+        return position * self.avg_service_time / self.max_concurrency
+
+    async def acquire(self, budget: Optional[float]):
+        """
+        Take a slot, queueing if needed.
+
+        Args:
+            budget: Seconds the client is willing to wait, or None for no limit.
+
+        Raises:
+            AdmissionRejected: If the request should be shed.
+        """
+        budget = self.default_budget if budget is None else budget
+
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        wait = self.expected_wait(len(self.waiters) + 1)
+        if len(self.waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise AdmissionRejected(429, f"Too many pending {self.name} requests", wait)
+        if budget is not None and wait > budget:
+            self.shed_deadline += 1
+            raise AdmissionRejected(503, f"{self.name} is overloaded; expected wait {wait:.1f}s", wait)
+
+        waiter = asyncio.get_event_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=budget)
+        except asyncio.TimeoutError:
+            self.shed_deadline += 1
+            raise AdmissionRejected(503, f"{self.name} queue wait exceeded budget", self.expected_wait(1))
+        except asyncio.CancelledError:
+            # Client went away; if a slot was handed over meanwhile, pass it on
+            if waiter.done() and not waiter.cancelled():
+                self._hand_off()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        self.admitted += 1
+
+    def release(self, service_time: float):
+        """Free a slot after a request finished."""
+        self.avg_service_time += EWMA_ALPHA * (service_time - self.avg_service_time)
+        self._hand_off()
+
+    def _hand_off(self):
+        """Give the slot straight to the next live waiter, or free it."""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": len(self.waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+            "avg_service_seconds": round(self.avg_service_time, 3),
+        }
+
+
+class AdmissionController:
+    """Maps request paths to endpoint limiters."""
+
+    def __init__(self, limiters: Dict[str, EndpointLimiter]):
+        """
+        Args:
+            limiters: Path prefix -> limiter. Paths matching no prefix are not limited.
+        """
+        self.limiters = limiters
+        # Longest prefix first so e.g. /upload/batch could get its own limiter
+        self._prefixes: List[str] = sorted(limiters, key=len, reverse=True)
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        def budget(name: str, default: str) -> Optional[float]:
+            value = float(os.getenv(name, default))
+            return value if value > 0 else None
+
+        return cls({
+            "/chat": EndpointLimiter(
+                "chat",
+                max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", 8)),
+                max_queue=int(os.getenv("CHAT_MAX_QUEUE", 32)),
+                default_budget=budget("CHAT_DEFAULT_BUDGET", "30"),
+                initial_service_time=2.0,
+            ),
+            "/upload": EndpointLimiter(
+                "upload",
+                max_concurrency=int(os.getenv("UPLOAD_MAX_CONCURRENCY", 2)),
+                max_queue=int(os.getenv("UPLOAD_MAX_QUEUE", 8)),
+                default_budget=budget("UPLOAD_DEFAULT_BUDGET", "120"),
+                initial_service_time=10.0,
+            ),
+        })
+
+    def limiter_for(self, path: str) -> Optional[EndpointLimiter]:
+        for prefix in self._prefixes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return self.limiters[prefix]
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {limiter.name: limiter.stats() for limiter in self.limiters.values()}
+
+
+def get_admission_controller() -> AdmissionController:
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController.from_env()
+    return _admission_controller
+
+
+def _client_budget(scope) -> Optional[float]:
+    for name, value in scope.get("headers", []):
+        if name == b"x-request-timeout":
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                return None
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission controller before routing."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or get_admission_controller()
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.controller.limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            with tracing.span("admission.wait", endpoint=limiter.name):
+                await limiter.acquire(_client_budget(scope))
+        except AdmissionRejected as e:
+            await send({
+                "type": "http.response.start",
+                "status": e.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(max(1, math.ceil(e.retry_after))).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": json.dumps({"detail": e.detail}).encode()})
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - start)
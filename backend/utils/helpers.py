@@ -4,7 +4,9 @@ Utility helper functions for document processing.
 
 import re
 import uuid
-from typing import List
+import itertools
+import hashlib
+from typing import List, Dict, Any, Tuple, Iterable, Iterator
 
 
 # -------------------------------------------------
@@ -14,44 +16,167 @@ def generate_unique_id() -> str:
     return str(uuid.uuid4())
 
 
+# -------------------------------------------------
+# Content hashing (deduplication)
+# -------------------------------------------------
+def hash_bytes(content: bytes) -> str:
+    """
+    Hash raw file bytes for whole-document deduplication.
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """
+    Hash chunk text for chunk-level deduplication.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 # -------------------------------------------------
 # Text cleaning (CRITICAL FIX HERE)
 # -------------------------------------------------
+# 🔒 Common UTF-8 / PDF encoding issues (mis-decoded sequence -> fix)
+_MOJIBAKE_TABLE = {
+    "â¢": "•",
+    "â€“": "-",
+    "â€”": "-",
+    "â€œ": '"',
+    "â€�": '"',
+    "â€™": "'",
+    "â€˜": "'",
+    "â€¦": "...",
+}
+_MOJIBAKE_RE = re.compile("|".join(map(re.escape, _MOJIBAKE_TABLE)))
+
+# Whitespace/null runs that are not already a single space (lone spaces
+# are left alone, so mostly-clean text is scanned without being rebuilt)
+_WHITESPACE_RE = re.compile(r"[^\S ][\s\x00]*|\x00[\s\x00]*| [\s\x00]+")
+
+
+def _fix_mojibake(match: "re.Match") -> str:
+    return _MOJIBAKE_TABLE[match.group()]
+
+
 def clean_text(text: str) -> str:
     """
     Clean extracted text and fix common PDF encoding issues.
+
+    Every mis-decoded sequence starts with "â", so the lookup pass only runs
+    when one can be present; whitespace and nulls are normalized in one
+    precompiled substitution. Safe to call per page while streaming.
     """
 
     if not text:
         return ""
 
-    # 🔒 Fix common UTF-8 / PDF encoding issues
-    replacements = {
-        "â¢": "•",
-        "â€“": "-",
-        "â€”": "-",
-        "â€œ": '"',
-        "â€�": '"',
-        "â€™": "'",
-        "â€˜": "'",
-        "â€¦": "...",
-    }
-
-    for bad, good in replacements.items():
-        text = text.replace(bad, good)
+    if "â" in text:
+        text = _MOJIBAKE_RE.sub(_fix_mojibake, text)
 
-    # Remove null chars
-    text = text.replace("\x00", " ")
+    return _WHITESPACE_RE.sub(" ", text).strip()
 
-    # Normalize whitespace
-    text = re.sub(r"\s+", " ", text)
 
-    return text.strip()
+def iter_clean_pages(pages: Iterable[str]) -> Iterator[str]:
+    """
+    Clean pages one at a time as they are produced.
+    """
+    for page in pages:
+        yield clean_text(page)
 
 
 # -------------------------------------------------
 # Chunking
 # -------------------------------------------------
+# Sentence terminator, closing quotes/brackets, and the single space after it
+_SENTENCE_BREAK_RE = re.compile(r"[.!?][\"'”’)\]]* ")
+
+
+def _sentence_spans(text: str, max_tokens: int) -> List[Tuple[int, int, int]]:
+    """
+    Find (start, end, token_count) spans of sentences in cleaned text.
+
+    Sentences longer than max_tokens are split at word boundaries.
+    Tokens are single-space separated words, as produced by clean_text.
+    """
+    spans = []
+    start = 0
+    breaks = (m.end() for m in _SENTENCE_BREAK_RE.finditer(text))
+
+    for next_start in itertools.chain(breaks, (len(text) + 1,)):
+        end = next_start - 1
+        tokens = text.count(" ", start, end) + 1
+        while tokens > max_tokens:
+            # Split an over-long sentence after max_tokens words
+            cut = start
+            for _ in range(max_tokens):
+                cut = text.find(" ", cut) + 1
+            spans.append((start, cut - 1, max_tokens))
+            start = cut
+            tokens -= max_tokens
+
+        spans.append((start, end, tokens))
+        start = next_start
+
+    return spans
+
+
+def chunk_document(
+    pages: List[str],
+    chunk_size: int = 500,
+    overlap: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Split cleaned pages into overlapping, sentence-aligned chunks.
+
+    Chunks are sized in tokens (words), never cross a page boundary and
+    are sliced straight out of the page by character offset.
+
+    Returns:
+        List of dicts with content, page_number (1-based), and the
+        char_start/char_end offsets of the chunk within its page.
+    """
+
+    chunks = []
+    # Over-long sentences are split into overlap-sized pieces so that
+    # unpunctuated text still gets the requested overlap.
+    piece_size = overlap if 0 < overlap < chunk_size else chunk_size
+
+    for page_number, page in enumerate(pages, start=1):
+        if not page:
+            continue
+
+        spans = _sentence_spans(page, piece_size)
+        count = len(spans)
+        i = 0
+        while i < count:
+            # Greedily pack whole sentences up to chunk_size tokens
+            j = i
+            tokens = 0
+            while j < count and (j == i or tokens + spans[j][2] <= chunk_size):
+                tokens += spans[j][2]
+                j += 1
+
+            char_start, char_end = spans[i][0], spans[j - 1][1]
+            chunks.append({
+                "content": page[char_start:char_end],
+                "page_number": page_number,
+                "char_start": char_start,
+                "char_end": char_end,
+            })
+            if j >= count:
+                break
+
+            # Step back over trailing sentences that fit in the overlap
+            k = j
+            carried = 0
+            while k - 1 > i and carried + spans[k - 1][2] <= overlap:
+                k -= 1
+                carried += spans[k][2]
+            i = k
+
+    return chunks
+
+
 def chunk_text(
     text: str,
     chunk_size: int = 500,
@@ -59,25 +184,32 @@ def chunk_text(
 ) -> List[str]:
     """
     Split text into overlapping chunks.
+
+    Any whitespace run separates words, as with str.split(); runs are
+    collapsed to single spaces (one regex pass, no word list) before the
+    sentence-aligned chunking.
     """
 
+    text = _WHITESPACE_RE.sub(" ", text).strip() if text else ""
     if not text:
         return []
 
-    words = text.split()
-    chunks = []
+    return [chunk["content"] for chunk in chunk_document([text], chunk_size, overlap)]
 
-    start = 0
-    while start < len(words):
-        end = start + chunk_size
-        chunk = words[start:end]
-        chunks.append(" ".join(chunk))
-        start = end - overlap
 
-        if start < 0:
-            start = 0
+def split_sentences(text: str, max_tokens: int = 60) -> List[str]:
+    """
+    Split chunk text into sentences, as the chunker sees them.
 
-    return chunks
+    Paragraph breaks (between stitched chunks) also end a sentence, and
+    sentences longer than max_tokens words are cut into pieces.
+    """
+    sentences = []
+    for block in text.split("\n\n"):
+        block = block.strip()
+        if block:
+            sentences.extend(block[start:end] for start, end, _ in _sentence_spans(block, max_tokens))
+    return [sentence for sentence in sentences if sentence.strip()]
 
 
 # -------------------------------------------------
@@ -100,21 +232,51 @@ def extract_text_from_file(filename: str, content: bytes) -> str:
         return ""
 
 
+def iter_pages_from_file(filename: str, content: bytes) -> Iterator[str]:
+    """
+    Extract text page by page. Non-paginated formats yield one page.
+    """
+
+    if is_paginated(filename):
+        yield from iter_pages_from_pdf(content)
+        return
+
+    text = extract_text_from_file(filename, content)
+    if text:
+        yield text
+
+
+def extract_pages_from_file(filename: str, content: bytes) -> List[str]:
+    """
+    Extract and clean all pages, dropping each raw page once it is cleaned.
+    """
+    return list(iter_clean_pages(iter_pages_from_file(filename, content)))
+
+
+def is_paginated(filename: str) -> bool:
+    """
+    Whether page numbers of this file type are meaningful.
+    """
+    return filename.lower().split(".")[-1] == "pdf"
+
+
 # -------------------------------------------------
 # PDF extraction
 # -------------------------------------------------
-def extract_text_from_pdf(content: bytes) -> str:
+def iter_pages_from_pdf(content: bytes) -> Iterator[str]:
     from io import BytesIO
     import pdfplumber
 
-    text = ""
     with pdfplumber.open(BytesIO(content)) as pdf:
         for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
+            # Keep empty pages so positions stay page numbers
+            yield page.extract_text() or ""
 
-    return text
+
+def extract_text_from_pdf(content: bytes) -> str:
+    return "".join(
+        page_text + "\n" for page_text in iter_pages_from_pdf(content) if page_text
+    )
 
 
 # -------------------------------------------------
@@ -127,3 +289,38 @@ def extract_text_from_docx(content: bytes) -> str:
     doc = Document(BytesIO(content))
     paragraphs = [p.text for p in doc.paragraphs]
     return "\n".join(paragraphs)
+
+
+# -------------------------------------------------
+# ZIP archive expansion (bulk upload)
+# -------------------------------------------------
+def extract_archive(
+    content: bytes,
+    max_files: int = 500,
+    max_bytes: int = 200 * 1024 * 1024
+) -> List[Tuple[str, bytes]]:
+    """
+    Expand a ZIP archive into (filename, content) pairs.
+
+    Directories and macOS resource forks are skipped. Raises ValueError if
+    the archive declares more files or uncompressed bytes than allowed.
+    """
+    import zipfile
+    from io import BytesIO
+    from pathlib import PurePosixPath
+
+    with zipfile.ZipFile(BytesIO(content)) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+
+        if len(members) > max_files:
+            raise ValueError(f"Archive contains more than {max_files} files")
+        if sum(info.file_size for info in members) > max_bytes:
+            raise ValueError(f"Archive expands to more than {max_bytes} bytes")
+
+        return [
+            (PurePosixPath(info.filename).name, archive.read(info))
+            for info in members
+        ]
@@ -0,0 +1,315 @@
+"""
+In-process metrics: latency histograms, counters and gauges with a
+Prometheus text exposition (GET /metrics).
+
+Recording is a bisect over fixed bucket bounds plus a few additions under
+a per-series lock, so it is cheap enough to leave on in production.
+Metrics are per process; with several workers each one reports its own.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from starlette.routing import Match, Route
+from utils import tracing
+
+# Seconds; spans a fast embedding call to a slow LLM / bulk ingestion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _HistogramSeries:
+    """One label combination of a histogram."""
+
+    __slots__ = ("bounds", "counts", "sum", "lock", "span_name")
+
+    def __init__(self, bounds: Tuple[float, ...], span_name: Optional[str] = None):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+        self.span_name = span_name
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the block, even if it raises (and trace it as a span)."""
+        start = time.perf_counter()
+        try:
+            if self.span_name:
+                with tracing.span(self.span_name):
+                    yield
+            else:
+                yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _CounterSeries:
+    """One label combination of a counter."""
+
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Return the series for these label values (created on first use)."""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series(values))
+        return series
+
+    @abstractmethod
+    def _new_series(self, values: Tuple[str, ...] = ()):
+        ...
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, series in sorted(self._series.items()):
+            lines.extend(self._render_series(values, series))
+        return lines
+
+    @abstractmethod
+    def _render_series(self, values, series) -> List[str]:
+        ...
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, span_prefix: Optional[str] = None):
+        """
+        Args:
+            span_prefix: If set, time() blocks also become trace spans
+                named "<span_prefix>.<label values>".
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.span_prefix = span_prefix
+
+    def _new_series(self, values: Tuple[str, ...] = ()):
+        span_name = ".".join((self.span_prefix, *values)) if self.span_prefix else None
+        return _HistogramSeries(self.buckets, span_name)
+
+    def _render_series(self, values, series) -> List[str]:
+        with series.lock:
+            counts = list(series.counts)
+            total = series.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self, values: Tuple[str, ...] = ()):
+        return _CounterSeries()
+
+    def _render_series(self, values, series) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}"]
+
+
+class GaugeCallback(_Metric):
+    """Gauge read from a callback at scrape time: label values tuple -> value."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _new_series(self, values: Tuple[str, ...] = ()):
+        raise TypeError(f"{self.name} is read from its callback and has no series to update")
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.callback().items()):
+            lines.extend(self._render_series(values, value))
+        return lines
+
+    def _render_series(self, values, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS, span_prefix: Optional[str] = None) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets, span_prefix))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                       callback: Callable[[], Dict[Tuple[str, ...], float]]) -> GaugeCallback:
+        return self.register(GaugeCallback(name, documentation, labelnames, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# -------------------------------------------------
+# Application metrics
+# -------------------------------------------------
+# Chat / RAG pipeline: embed, vector_query, summary_query, expand, compress, context_build, llm, total
+CHAT_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_chat_stage_seconds", "Latency of chat pipeline stages.", ("stage",), span_prefix="chat"
+)
+
+# Ingestion: extract, chunk, embed, upsert, total
+INGEST_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_ingest_stage_seconds", "Latency of document ingestion stages.", ("stage",), span_prefix="ingest"
+)
+
+# Prompt context kept by extractive compression (tokens after / before)
+CONTEXT_COMPRESSION_RATIO = REGISTRY.histogram(
+    "rag_context_compression_ratio", "Fraction of retrieved context tokens kept for the prompt.",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0)
+)
+
+# Cache lookups, e.g. ("dedup_document", "hit"), ("token", "miss")
+CACHE_EVENTS = REGISTRY.counter(
+    "rag_cache_events_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+
+# Loading an evicted per-tenant index back into memory
+INDEX_LOAD_SECONDS = REGISTRY.histogram(
+    "rag_index_load_seconds", "Latency of loading a per-tenant vector index."
+)
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_seconds", "HTTP request latency by endpoint.", ("method", "endpoint")
+)
+
+# Server errors (5xx responses and unhandled exceptions)
+ERRORS = REGISTRY.counter(
+    "rag_errors_total", "Server errors by endpoint and kind.", ("endpoint", "kind")
+)
+
+
+def record_cache(cache: str, hits: int, misses: int):
+    """Count a batch of cache lookups."""
+    if hits:
+        CACHE_EVENTS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_EVENTS.labels(cache, "miss").inc(misses)
+
+
+def _endpoint(scope) -> str:
+    """
+    Template of the route that matched ("/upload/{document_id}"), set by the
+    router while it handles the request. Requests answered before routing
+    (shed by admission control with 429/503) are matched against the app's
+    routes here, so shedding is attributed to the endpoint being shed.
+    Everything unmatched (404s, static routes) shares one label, so
+    arbitrary paths can't create new series.
+    """
+    route = scope.get("route")
+    if route is None:
+        route = next((
+            candidate for candidate in getattr(scope.get("app"), "routes", ())
+            if isinstance(candidate, Route) and candidate.matches(scope)[0] == Match.FULL
+        ), None)
+    return getattr(route, "path", None) or "other"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and server errors."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            ERRORS.labels(_endpoint(scope), "exception").inc()
+            raise
+        finally:
+            HTTP_REQUEST_SECONDS.labels(scope["method"], _endpoint(scope)).observe(time.perf_counter() - start)
+        if status[0] >= 500:
+            ERRORS.labels(_endpoint(scope), "http_5xx").inc()
@@ -0,0 +1,273 @@
+"""
+Opt-in per-request tracing and sampling CPU profiles.
+
+A request is traced when it carries X-Debug-Trace with the admin token
+(TRACE_ADMIN_TOKEN) or is picked by TRACE_SAMPLE_RATE. Traced requests
+record a tree of timed spans (extraction, chunking, embedding batches,
+vector query, LLM, ...). With X-Debug-Profile: 1 on an admin request, a
+sampling profiler also collects the hottest stacks. Finished traces go to
+a bounded ring buffer served at /debug/traces.
+
+When a request is not traced, span() is a ContextVar lookup that returns
+a shared no-op object, so instrumentation can stay in hot paths.
+Traces are per worker process.
+"""
+
+import contextvars
+import functools
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", 100))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+_recent_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+def admin_token() -> str:
+    return os.getenv("TRACE_ADMIN_TOKEN", "")
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.spans: List["_Span"] = []
+        self.profile: Optional[List[Dict[str, Any]]] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def new_span_id(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "spans": len(self.spans),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "spans": [span.to_dict(self.start) for span in sorted(self.spans, key=lambda s: s.start)],
+            "profile": self.profile,
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "id", "parent_id", "name", "attributes", "thread", "start", "duration", "_token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.id = trace.new_span_id()
+        self.parent_id = _current_span.get()
+        self.name = name
+        self.attributes = attributes
+        self.thread = threading.current_thread().name
+        self.start = 0.0
+        self.duration = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.id)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        # list.append is atomic, so spans from executor threads need no lock
+        self.trace.spans.append(self)
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, trace_start: float) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "thread": self.thread,
+            "start_ms": round((self.start - trace_start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Time a block as a child of the current span; a no-op when not tracing."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name, attributes)
+
+
+def is_tracing() -> bool:
+    return _current_trace.get() is not None
+
+
+def bind_context(func, *args, **kwargs):
+    """
+    Wrap a call so it runs in a copy of the current context.
+
+    run_in_executor does not carry ContextVars into the worker thread, so
+    blocking calls that should appear in the trace are submitted as
+    loop.run_in_executor(None, bind_context(func, *args)).
+    """
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def recent_traces() -> List[Trace]:
+    """Finished traces, newest first."""
+    return list(reversed(_recent_traces))
+
+
+def find_trace(trace_id: str) -> Optional[Trace]:
+    for trace in _recent_traces:
+        if trace.id == trace_id:
+            return trace
+    return None
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler: samples every thread's stack at a fixed interval.
+
+    Samples cover the whole process, so concurrent requests show up too;
+    profile a request on an otherwise quiet worker for a clean picture.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, top: int = 30):
+        self.interval = interval
+        self.top = top
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> List[Dict[str, Any]]:
+        """Stop sampling; return the hottest stacks, root first."""
+        self._stop.set()
+        self._thread.join()
+        total = sum(self.samples.values()) or 1
+        return [
+            {"stack": stack, "samples": count, "share": round(count / total, 4)}
+            for stack, count in self.samples.most_common(self.top)
+        ]
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < 64:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                # Idle pool threads and the event loop waiting on I/O are not CPU time
+                if stack and stack[0].split(":")[1] in ("wait", "select", "_worker", "poll", "get"):
+                    continue
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a trace for admin-flagged or sampled requests."""
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = admin_token()
+        # Constant-time, like the /debug token check: this header also enables profiling
+        supplied = (_header(scope, b"x-debug-trace") or "").encode("latin-1")
+        admin = bool(token) and hmac.compare_digest(supplied, token.encode())
+        if admin:
+            reason = "admin"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], scope["path"], reason)
+        profiler = SamplingProfiler() if admin and _header(scope, b"x-debug-profile") == "1" else None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace.id.encode())]
+            await send(message)
+
+        trace_token = _current_trace.set(trace)
+        if profiler:
+            profiler.start()
+        try:
+            with span("request", method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                trace.profile = profiler.stop()
+            trace.duration = time.perf_counter() - trace.start
+            _current_trace.reset(trace_token)
+            _recent_traces.append(trace)